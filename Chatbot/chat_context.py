@@ -0,0 +1,153 @@
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+from database import create_connection, close_connection
+from Chatbot.chat_history import load_history, load_history_page, load_summary, save_summary, save_message
+
+load_dotenv()
+
+CHAT_CONTEXT_TOKENS = int(os.getenv('CHAT_CONTEXT_TOKENS', 4000))  # Token budget for each request sent to the model
+CHAT_CONTEXT_KEEP = float(os.getenv('CHAT_CONTEXT_KEEP', 0.5))  # Share of the budget left for recent turns after summarizing
+
+def estimate_tokens(message):
+    """Approximate token count: about four characters per token plus per-message overhead."""
+    return len(message["content"] or "") // 4 + 4
+
+class ChatContext:
+    """
+    The messages sent to the model for one chat session, kept within a token budget.
+    Recent turns are sent verbatim. When they outgrow the budget, the oldest are folded into
+    a rolling summary with summarize(previous_summary, messages) and the summary is stored
+    in "ChatSummaries", so requests stay the same size however long the session runs.
+    Without `summarize`, turns that no longer fit are dropped.
+    """
+    def __init__(self, session_id, system_prompt, summarize=None, budget=CHAT_CONTEXT_TOKENS, keep=CHAT_CONTEXT_KEEP):
+        self.session_id = session_id
+        self.system = {"role": "system", "content": system_prompt}
+        self.summarize = summarize
+        self.budget = budget
+        self.keep = keep
+        self.summary, self.summarized_through = load_summary(session_id)
+        self.turns = self._load_recent()
+
+    def _summary_message(self):
+        return {"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"}
+
+    def _turn_budget(self):
+        used = estimate_tokens(self.system)
+        if self.summary:
+            used += estimate_tokens(self._summary_message())
+        return max(self.budget - used, 0)
+
+    def _load_recent(self):
+        """
+        Pages back from the newest stored turn until the budget is full. With `summarize`, the
+        older turns not yet in the summary are then folded into it, as they would have been
+        had the session stayed open, instead of being dropped.
+        """
+        budget = self._turn_budget()
+        turns = []
+        older = []
+        used = 0
+        before = None
+        while True:
+            page, before = load_history_page(self.session_id, before, self.summarized_through)
+            for message in reversed(page):
+                if older or used + estimate_tokens(message) > budget:
+                    older.append(message)
+                else:
+                    used += estimate_tokens(message)
+                    turns.append(message)
+            if before is None or (older and self.summarize is None):
+                break
+        turns.reverse()
+        if self.summarize is not None and older:
+            older.reverse()
+            self._fold(older, budget)
+        return turns
+
+    def add(self, role, content):
+        """Records a turn in the context and queues it for the chat history table."""
+        timestamp = save_message(self.session_id, role, content)
+        self.turns.append({"role": role, "content": content, "timestamp": timestamp})
+
+    def _compact(self, budget):
+        # Keep the newest turns within a share of the budget, so the next few turns fit without summarizing again
+        kept = 0
+        used = 0
+        for message in reversed(self.turns):
+            used += estimate_tokens(message)
+            if kept and used > budget * self.keep:
+                break
+            kept += 1
+        dropped, self.turns = self.turns[:-kept], self.turns[-kept:]
+        if self.summarize is not None and dropped:
+            self._fold(dropped, budget)
+
+    def _fold(self, dropped, budget):
+        """Folds turns into the summary, oldest first, in chunks that each fit the budget."""
+        chunk = []
+        used = 0
+        for message in dropped + [None]:
+            if chunk and (message is None or used + estimate_tokens(message) > budget):
+                self.summary = self.summarize(self.summary, [{"role": m["role"], "content": m["content"]} for m in chunk])
+                self.summarized_through = chunk[-1]["timestamp"]
+                save_summary(self.session_id, self.summary, self.summarized_through)
+                chunk = []
+                used = 0
+            if message is not None:
+                chunk.append(message)
+                used += estimate_tokens(message)
+
+    def messages(self):
+        """Returns the system prompt, the summary of older turns and the recent turns that fit the budget."""
+        if sum(estimate_tokens(message) for message in self.turns) > self._turn_budget():
+            self._compact(self._turn_budget())
+        messages = [self.system]
+        if self.summary:
+            messages.append(self._summary_message())
+        messages.extend({"role": message["role"], "content": message["content"]} for message in self.turns)
+        return messages
+
+def benchmark(lengths=(10, 100, 1_000, 10_000), message_chars=400):
+    """
+    Compares the per-turn cost of sending the whole history (load_history) with a
+    token-budgeted ChatContext, for sessions of increasing length seeded into "ChatHistory".
+    """
+    connection = create_connection()
+    cursor = connection.cursor()
+    session_ids = []
+    try:
+        print(f"{'messages':>9} {'full load ms':>13} {'full tokens':>12} {'context ms':>11} {'context tokens':>15}")
+        for length in lengths:
+            session_id = str(uuid.uuid4())
+            session_ids.append(session_id)
+            start = datetime.now() - timedelta(seconds=length)
+            rows = [(session_id, "user", "x" * message_chars, None, start + timedelta(seconds=i)) if i % 2 == 0
+                    else (session_id, "assistant", "", "y" * message_chars, start + timedelta(seconds=i))
+                    for i in range(length)]
+            execute_values(cursor, '''
+                INSERT INTO "ChatHistory" ("session_id", "role", "content", "response", "timestamp") VALUES %s
+            ''', rows, page_size=1000)
+            connection.commit()
+
+            started = time.perf_counter()
+            history = load_history(session_id)
+            full_tokens = sum(estimate_tokens(message) for message in history)
+            full_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            context_tokens = sum(estimate_tokens(message) for message in ChatContext(session_id, "").messages())
+            context_ms = (time.perf_counter() - started) * 1000
+            print(f"{length:>9} {full_ms:>13.2f} {full_tokens:>12} {context_ms:>11.2f} {context_tokens:>15}")
+    finally:
+        cursor.execute('DELETE FROM "ChatHistory" WHERE "session_id" = ANY(%s::uuid[])', (session_ids,))
+        connection.commit()
+        cursor.close()
+        close_connection(connection)
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,46 +1,42 @@
-import psycopg2
-from psycopg2 import Error
 import os
-from dotenv import load_dotenv
+from datetime import datetime
+from psycopg2 import Error
+from psycopg2.extras import execute_values
+from database import create_connection as create_pooled_connection, close_connection, WriteBehindBuffer
 
-load_dotenv()
+CHAT_HISTORY_MAX_PENDING = int(os.getenv('CHAT_HISTORY_MAX_PENDING', 10000))  # Unwritten messages before save_message blocks
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv('CHAT_HISTORY_PAGE_SIZE', 50))
 
 def create_connection():
     try:
-        connection = psycopg2.connect(
-            host=os.getenv('DB_HOST'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            database=os.getenv('DB_NAME')
-        )
-        return connection
+        return create_pooled_connection()
     except Error as e:
         print(f"Error: {e}")
         return None
 
-def close_connection(connection):
-    if connection:
-        connection.close()
+def _insert_messages(cursor, rows):
+    execute_values(cursor, '''
+        INSERT INTO "ChatHistory" ("session_id", "role", "content", "response", "timestamp") VALUES %s
+    ''', rows, page_size=len(rows))
+
+# Messages are written in batches by a background thread so the chat loop never waits on the database
+chat_history_writes = WriteBehindBuffer("chat_history", _insert_messages, max_pending=CHAT_HISTORY_MAX_PENDING)
 
 def save_message(session_id, role, content, response=None):
-    connection = create_connection()
-    if connection:
-        cursor = connection.cursor()
-        try:
-            if role == 'user':
-                query = 'INSERT INTO "ChatHistory" ("session_id", "role", "content") VALUES (%s, %s, %s)'
-                cursor.execute(query, (session_id, role, content))
-            elif role == 'assistant':
-                query = 'INSERT INTO "ChatHistory" ("session_id", "role", "content", "response") VALUES (%s, %s, %s, %s)'
-                cursor.execute(query, (session_id, role, "", content))
-            connection.commit()
-        except Error as e:
-            print(f"Error: {e}")
-        finally:
-            cursor.close()
-            close_connection(connection)
+    """
+    Queues a message for the background writer and returns its timestamp. The timestamp is
+    taken here rather than when the batch is written, so history keeps the order in which
+    messages were sent.
+    """
+    timestamp = datetime.now()
+    if role == 'user':
+        chat_history_writes.add((session_id, role, content, None, timestamp))
+    elif role == 'assistant':
+        chat_history_writes.add((session_id, role, "", content, timestamp))
+    return timestamp
 
 def load_history(session_id):
+    chat_history_writes.flush()  # Include messages still waiting to be written
     connection = create_connection()
     if connection:
         cursor = connection.cursor()
@@ -61,4 +57,80 @@ def load_history(session_id):
         finally:
             cursor.close()
             close_connection(connection)
-    return []
\ No newline at end of file
+    return []
+
+def load_history_page(session_id, before=None, after=None, limit=CHAT_HISTORY_PAGE_SIZE):
+    """
+    Keyset-paginated history, newest page first. Returns up to `limit` messages older than
+    the `before` cursor, in chronological order with their timestamps, and the cursor for
+    the next older page (None when there are no more). `after` skips messages at or before
+    that timestamp, e.g. turns already folded into the session summary.
+    """
+    chat_history_writes.flush()
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            query = 'SELECT "id", "timestamp", "role", "content", "response" FROM "ChatHistory" WHERE "session_id" = %s'
+            params = [session_id]
+            if before is not None:
+                query += ' AND ("timestamp", "id") < (%s, %s)'
+                params.extend(before)
+            if after is not None:
+                query += ' AND "timestamp" > %s'
+                params.append(after)
+            query += ' ORDER BY "timestamp" DESC, "id" DESC LIMIT %s'
+            params.append(limit)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            messages = []
+            for row in reversed(rows):
+                if row[2] == 'user':
+                    messages.append({"role": row[2], "content": row[3], "timestamp": row[1]})
+                elif row[2] == 'assistant':
+                    messages.append({"role": row[2], "content": row[4], "timestamp": row[1]})
+            next_page = (rows[-1][1], rows[-1][0]) if len(rows) == limit else None
+            return messages, next_page
+        except Error as e:
+            print(f"Error: {e}")
+            return [], None
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return [], None
+
+def load_summary(session_id):
+    """Returns the session's rolling summary and the timestamp of the last turn it covers."""
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT "summary", "summarized_through" FROM "ChatSummaries" WHERE "session_id" = %s', (session_id,))
+            record = cursor.fetchone()
+            if record:
+                return record[0], record[1]
+        except Error as e:
+            print(f"Error: {e}")
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return None, None
+
+def save_summary(session_id, summary, summarized_through):
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('''
+                INSERT INTO "ChatSummaries" ("session_id", "summary", "summarized_through") VALUES (%s, %s, %s)
+                ON CONFLICT ("session_id") DO UPDATE SET
+                    "summary" = EXCLUDED."summary",
+                    "summarized_through" = EXCLUDED."summarized_through",
+                    "updated_at" = CURRENT_TIMESTAMP
+            ''', (session_id, summary, summarized_through))
+            connection.commit()
+        except Error as e:
+            print(f"Error: {e}")
+        finally:
+            cursor.close()
+            close_connection(connection)
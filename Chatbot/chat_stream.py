@@ -0,0 +1,293 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from Chatbot.response_cache import CHAT_MODEL, cache_key
+
+class ChatStream:
+    """
+    Iterates over a chat completion as the model produces it, yielding text fragments.
+    Once the stream ends, the full response is stored in `cache` (if given) and passed to
+    on_complete(response), e.g. to save it to the chat history. cancel() may be called from
+    any thread: it closes the HTTP response, iteration stops and nothing is cached or saved.
+    A cached response is yielded whole, without calling the model.
+    With `tools`, tool calls streamed by the model are answered with run_tool(name, arguments)
+    and the model is asked again, up to `max_tool_rounds` times, so only text is yielded.
+    """
+    def __init__(self, client, messages, model=CHAT_MODEL, cache=None, scope=None, on_complete=None,
+                 tools=None, run_tool=None, max_tool_rounds=0, **kwargs):
+        self.client = client
+        self.messages = messages
+        self.model = model
+        self.cache = cache
+        self.scope = scope
+        self.on_complete = on_complete
+        self.tools = tools
+        self.run_tool = run_tool
+        self.max_tool_rounds = max_tool_rounds
+        self.kwargs = kwargs
+        self.parts = []
+        self.cancelled = False
+        self.completed = False
+        self.first_token_seconds = None
+        self._response = None
+        self._lock = threading.Lock()
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    def __iter__(self):
+        started = time.perf_counter()
+        key = None
+        if self.cache is not None:
+            key = cache_key(self.messages, self.model, self.scope)
+            response = self.cache.get(key)
+            if response is not None:
+                self.first_token_seconds = time.perf_counter() - started
+                self.parts.append(response)
+                yield response
+                self._finish(response)
+                return
+
+        request = list(self.messages)
+        rounds = self.max_tool_rounds if self.tools else 0
+        for attempt in range(rounds + 1):
+            kwargs = dict(self.kwargs)
+            if self.tools:
+                # On the last round the model has to answer with what it has
+                kwargs.update(tools=self.tools, tool_choice="auto" if attempt < rounds else "none")
+            calls = {}
+            yield from self._stream_round(request, calls, started, **kwargs)
+            if self.cancelled:
+                return
+            if not calls:
+                break
+            calls = [calls[index] for index in sorted(calls)]
+            request.append({"role": "assistant", "content": None,
+                            "tool_calls": [{"id": call["id"], "type": "function", "function": call["function"]}
+                                           for call in calls]})
+            for call in calls:
+                output = self.run_tool(call["function"]["name"], call["function"]["arguments"])
+                request.append({"role": "tool", "tool_call_id": call["id"], "content": json.dumps(output)})
+        if self.cache is not None:
+            self.cache.model_seconds += time.perf_counter() - started
+        response = self.text.strip()
+        if response and key is not None:
+            self.cache.set(key, response)
+        self._finish(response)
+
+    def _stream_round(self, request, calls, started, **kwargs):
+        """Streams one completion, yielding its text and collecting tool call fragments into `calls` by index."""
+        response = self.client.chat.completions.create(model=self.model, messages=request, stream=True, **kwargs)
+        with self._lock:
+            self._response = response
+            cancelled = self.cancelled
+        if cancelled:
+            self._close()
+            return
+        try:
+            for chunk in response:
+                if self.cancelled:
+                    break
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                for fragment in delta.tool_calls or []:
+                    call = calls.setdefault(fragment.index, {"id": None, "function": {"name": "", "arguments": ""}})
+                    call["id"] = fragment.id or call["id"]
+                    if fragment.function is not None:
+                        call["function"]["name"] += fragment.function.name or ""
+                        call["function"]["arguments"] += fragment.function.arguments or ""
+                if delta.content:
+                    if self.first_token_seconds is None:
+                        self.first_token_seconds = time.perf_counter() - started
+                    self.parts.append(delta.content)
+                    yield delta.content
+        except Exception:
+            # Closing the response from another thread interrupts the read
+            if not self.cancelled:
+                raise
+        finally:
+            self._close()
+
+    def _finish(self, response):
+        self.completed = True
+        if self.on_complete is not None:
+            self.on_complete(response)
+
+    def _close(self):
+        with self._lock:
+            response, self._response = self._response, None
+        if response is not None:
+            response.close()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+        self._close()
+
+class FakeStreamingServer:
+    """
+    Local HTTP server speaking the OpenAI chat completions API, streamed (server-sent events)
+    or not. It answers with `tokens` words, one every `token_delay` seconds, so the chatbot can
+    be exercised against it with OpenAI(base_url=server.base_url, api_key="test"). With `tool`,
+    a request offering tools is first answered with a call to that tool, without arguments.
+    `messages` holds the messages of the last request.
+    """
+    def __init__(self, tokens=200, token_delay=0.01, tool=None, host="127.0.0.1", port=0):
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.tool = tool
+        self.messages = []
+        self.requests = 0
+        self.disconnects = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                server.requests += 1
+                server.messages = request.get("messages", [])
+                words = [f"token{i} " for i in range(server.tokens)]
+                wants_tool = (server.tool and request.get("tools") and request.get("tool_choice") != "none"
+                              and server.messages[-1]["role"] != "tool")
+                if wants_tool and request.get("stream"):
+                    self._stream_tool_call(request.get("model", CHAT_MODEL))
+                elif wants_tool:
+                    self._send_json(200, {
+                        "id": "chatcmpl-local", "object": "chat.completion", "created": int(time.time()),
+                        "model": request.get("model", CHAT_MODEL),
+                        "choices": [{"index": 0, "finish_reason": "tool_calls",
+                                     "message": {"role": "assistant", "content": None,
+                                                 "tool_calls": [self._tool_call(server.requests)]}}]
+                    })
+                elif request.get("stream"):
+                    self._stream(request.get("model", CHAT_MODEL), words)
+                else:
+                    time.sleep(server.token_delay * len(words))
+                    self._send_json(200, {
+                        "id": "chatcmpl-local", "object": "chat.completion", "created": int(time.time()),
+                        "model": request.get("model", CHAT_MODEL),
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": "".join(words)}}]
+                    })
+
+            def _send_json(self, status, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _tool_call(self, number):
+                return {"id": f"call_{number}", "type": "function", "function": {"name": server.tool, "arguments": "{}"}}
+
+            def _stream_tool_call(self, model):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                call = dict(self._tool_call(server.requests), index=0)
+                deltas = [({"role": "assistant", "tool_calls": [call]}, None), ({}, "tool_calls")]
+                for delta, finish_reason in deltas:
+                    chunk = {"id": "chatcmpl-local", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _stream(self, model, words):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for i, word in enumerate(words + [None]):
+                        delta = {"content": word} if word is not None else {}
+                        if i == 0:
+                            delta["role"] = "assistant"
+                        chunk = {"id": "chatcmpl-local", "object": "chat.completion.chunk", "created": int(time.time()),
+                                 "model": model, "choices": [{"index": 0, "delta": delta,
+                                                              "finish_reason": None if word is not None else "stop"}]}
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        if word is not None:
+                            time.sleep(server.token_delay)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    server.disconnects += 1
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def benchmark(tokens=200, token_delay=0.01):
+    """
+    Compares time to first token and total time for a blocking and a streamed completion
+    against FakeStreamingServer, then cancels a stream half way and checks that nothing
+    was saved and the server saw the client disconnect.
+    """
+    from openai import OpenAI
+
+    messages = [{"role": "system", "content": "You are a financial assistant."},
+                {"role": "user", "content": "What is the Sharpe ratio?"}]
+    with FakeStreamingServer(tokens, token_delay) as server:
+        client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+
+        started = time.perf_counter()
+        client.chat.completions.create(model=CHAT_MODEL, messages=messages)
+        blocking = time.perf_counter() - started
+        print(f"{tokens} tokens, {token_delay * 1000:.0f} ms per token")
+        print(f"Blocking:  first text after {blocking * 1000:.0f} ms, complete after {blocking * 1000:.0f} ms")
+
+        saved = []
+        stream = ChatStream(client, messages, on_complete=saved.append)
+        started = time.perf_counter()
+        for _ in stream:
+            pass
+        total = time.perf_counter() - started
+        print(f"Streamed:  first text after {stream.first_token_seconds * 1000:.0f} ms, complete after {total * 1000:.0f} ms, "
+              f"saved {len(saved)} message of {len(saved[0].split())} tokens")
+
+        saved = []
+        stream = ChatStream(client, messages, on_complete=saved.append)
+        threading.Timer(tokens * token_delay / 2, stream.cancel).start()
+        started = time.perf_counter()
+        received = sum(1 for _ in stream)
+        cancelled = time.perf_counter() - started
+        time.sleep(token_delay * 5)  # Give the server a few writes to notice the closed connection
+        print(f"Cancelled: stopped after {cancelled * 1000:.0f} ms and {received} tokens, saved {len(saved)} messages, "
+              f"server saw {server.disconnects} disconnect")
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,36 +1,77 @@
+import argparse
 import os
 import uuid
 from openai import OpenAI
 from dotenv import load_dotenv
-from chat_history import save_message, load_history
+from Chatbot.chat_context import ChatContext
+from Chatbot.chat_stream import ChatStream
+from Chatbot.portfolio_tools import PORTFOLIO_PROMPT, PortfolioChat
+from Chatbot.response_cache import ResponseCache, CHAT_MODEL
 
 load_dotenv()
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+CHAT_SUMMARY_TOKENS = int(os.getenv('CHAT_SUMMARY_TOKENS', 300))  # Length limit for the rolling conversation summary
 
-def chat_with_gpt(message_history):
-    response = client.chat.completions.create(model="gpt-4o-mini",
-    messages=message_history)
+SYSTEM_PROMPT = "You are a financial assistant specializing in financial terms, market data, and portfolio management. Provide clear, accurate, and concise financial information."
+
+response_cache = ResponseCache()
+
+
+def chat_with_gpt(message_history, model_client=None):
+    """Answers from the response cache when the same question was asked recently, otherwise asks the model."""
+    return response_cache.complete(model_client or client, message_history, model=CHAT_MODEL)
+
+def stream_chat_with_gpt(message_history, on_complete=None, model_client=None):
+    """
+    Streaming counterpart of chat_with_gpt: returns a ChatStream that yields the answer as it
+    is generated and calls on_complete(response) once it has finished. Cancelled streams are
+    neither cached nor passed to on_complete.
+    """
+    return ChatStream(model_client or client, message_history, model=CHAT_MODEL, cache=response_cache, on_complete=on_complete)
+
+def portfolio_chat(user_id):
+    """Returns a PortfolioChat for the user, sharing the response cache, and starts building their snapshot."""
+    chat = PortfolioChat(user_id, cache=response_cache, model=CHAT_MODEL)
+    chat.snapshots.warm(user_id)
+    return chat
+
+def summarize_messages(summary, messages):
+    """Folds older turns into the running summary used by ChatContext."""
+    prompt = [{"role": "system", "content": "Summarize the conversation between a user and a financial assistant in one short paragraph. Keep tickers, figures and decisions the assistant may need later."}]
+    if summary:
+        prompt.append({"role": "user", "content": f"Summary so far: {summary}"})
+    prompt.append({"role": "user", "content": "\n".join(f"{message['role']}: {message['content']}" for message in messages)})
+    response = client.chat.completions.create(model=CHAT_MODEL, messages=prompt, max_tokens=CHAT_SUMMARY_TOKENS)
     return response.choices[0].message.content.strip()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat with the financial assistant.")
+    parser.add_argument("--user-id", type=int, help="Let the assistant look up this user's portfolios")
+    args = parser.parse_args()
+
     session_id = str(uuid.uuid4())
-    message_history = load_history(session_id)
-    
-    if not message_history:
-        message_history = [{"role": "system", "content": "You are a financial assistant specializing in financial terms, market data, and portfolio management. Provide clear, accurate, and concise financial information."}]
+    chat = portfolio_chat(args.user_id) if args.user_id is not None else None
+    system_prompt = f"{SYSTEM_PROMPT} {PORTFOLIO_PROMPT}" if chat is not None else SYSTEM_PROMPT
+    context = ChatContext(session_id, system_prompt, summarize=summarize_messages)
     
     while True:
         user_input = input("You: ")
         if user_input.lower() in ["quit", "exit", "bye"]:
             break
         
-        message_history.append({"role": "user", "content": user_input})
-        response = chat_with_gpt(message_history)
-        message_history.append({"role": "assistant", "content": response})
-        
-        save_message(session_id, "user", user_input)
-        save_message(session_id, "assistant", response)
-        
-        print("Chatbot: ", response)
\ No newline at end of file
+        context.add("user", user_input)
+        save = lambda response: context.add("assistant", response)
+        if chat is not None:
+            stream = chat.stream(client, context.messages(), on_complete=save)
+        else:
+            stream = stream_chat_with_gpt(context.messages(), on_complete=save)
+        print("Chatbot: ", end="", flush=True)
+        try:
+            for text in stream:
+                print(text, end="", flush=True)
+            print()
+        except KeyboardInterrupt:  # Ctrl+C stops the answer but not the chat
+            stream.cancel()
+            print(" [cancelled]")
@@ -0,0 +1,220 @@
+import json
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from dotenv import load_dotenv
+from Chatbot.chat_stream import ChatStream
+from Chatbot.response_cache import CHAT_MODEL, cache_key
+from PortfolioManagement.portfolio_snapshot import PortfolioSnapshots, portfolio_snapshots
+
+load_dotenv()
+
+PORTFOLIO_TOOL_ROUNDS = int(os.getenv('PORTFOLIO_TOOL_ROUNDS', 3))  # Tool calls the model may chain before it has to answer
+
+PORTFOLIO_PROMPT = ("You can look up the user's own portfolios with the provided tools. Use them for any question about "
+                    "the user's holdings, values, returns or exposure, and mention the as_of time of the figures.")
+
+PORTFOLIO_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_portfolio_summary",
+            "description": "Market value, cost basis, unrealized P&L and sector weights of all the user's portfolios, "
+                           "or of one portfolio. Weights are percentages of market value.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "portfolio_name": {"type": "string", "description": "Limit the summary to this portfolio."}
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_positions",
+            "description": "The user's individual holdings with shares, prices, value, P&L, sector and weights, "
+                           "optionally filtered by portfolio, sector (e.g. 'tech' matches Technology) or symbol.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "portfolio_name": {"type": "string"},
+                    "sector": {"type": "string"},
+                    "symbol": {"type": "string"}
+                },
+                "required": []
+            }
+        }
+    }
+]
+
+def _find_portfolio(snapshot, portfolio_name):
+    for portfolio in snapshot["portfolios"]:
+        if portfolio["name"].lower() == portfolio_name.strip().lower():
+            return portfolio
+    return None
+
+def get_portfolio_summary(snapshot, portfolio_name=None):
+    if portfolio_name:
+        portfolio = _find_portfolio(snapshot, portfolio_name)
+        if portfolio is None:
+            return {"error": f"No portfolio named {portfolio_name}.", "portfolios": [p["name"] for p in snapshot["portfolios"]]}
+        return {"as_of": snapshot["as_of"], "portfolio": {key: value for key, value in portfolio.items() if key != "positions"}}
+    return {
+        "as_of": snapshot["as_of"],
+        "total": snapshot["total"],
+        "sectors": snapshot["sectors"],
+        "portfolios": [{key: value for key, value in portfolio.items() if key not in ("positions", "sectors")}
+                       for portfolio in snapshot["portfolios"]]
+    }
+
+def get_positions(snapshot, portfolio_name=None, sector=None, symbol=None):
+    portfolios = snapshot["portfolios"]
+    if portfolio_name:
+        portfolio = _find_portfolio(snapshot, portfolio_name)
+        if portfolio is None:
+            return {"error": f"No portfolio named {portfolio_name}.", "portfolios": [p["name"] for p in portfolios]}
+        portfolios = [portfolio]
+    positions = []
+    for portfolio in portfolios:
+        for position in portfolio["positions"]:
+            if sector and sector.strip().lower() not in position["sector"].lower():
+                continue
+            if symbol and symbol.strip().upper() != position["symbol"]:
+                continue
+            positions.append(dict(position, portfolio=portfolio["name"]))
+    return {"as_of": snapshot["as_of"], "positions": positions}
+
+TOOL_FUNCTIONS = {
+    "get_portfolio_summary": get_portfolio_summary,
+    "get_positions": get_positions
+}
+
+def run_tool(snapshot, name, arguments):
+    """Runs a tool call against a snapshot. Errors are returned to the model rather than raised."""
+    function = TOOL_FUNCTIONS.get(name)
+    if function is None:
+        return {"error": f"Unknown tool {name}."}
+    try:
+        kwargs = json.loads(arguments or "{}")
+        return function(snapshot, **kwargs)
+    except (ValueError, TypeError) as e:
+        return {"error": f"Invalid arguments for {name}: {e}"}
+
+class PortfolioChat:
+    """
+    Answers chat messages for one user with the portfolio tools available to the model.
+    Tool calls are served from the user's cached snapshot, so a question about holdings costs
+    one cache read rather than database queries and quote requests. Answers are cached per
+    snapshot version, so they are reused only until the user's holdings change or the
+    snapshot expires.
+    """
+    def __init__(self, user_id, snapshots=portfolio_snapshots, cache=None, model=CHAT_MODEL, max_tool_rounds=PORTFOLIO_TOOL_ROUNDS):
+        self.user_id = user_id
+        self.snapshots = snapshots
+        self.cache = cache
+        self.model = model
+        self.max_tool_rounds = max_tool_rounds
+        self.tool_calls = 0
+
+    def _scope(self, snapshot):
+        return f"portfolio:{self.user_id}:{snapshot['version']}"
+
+    def _run_tool(self, snapshot, name, arguments):
+        self.tool_calls += 1
+        return run_tool(snapshot, name, arguments)
+
+    def complete(self, client, messages, **kwargs):
+        snapshot = self.snapshots.get(self.user_id)
+        key = None
+        if self.cache is not None:
+            key = cache_key(messages, self.model, scope=self._scope(snapshot))
+            response = self.cache.get(key)
+            if response is not None:
+                return response
+
+        request = list(messages)
+        for attempt in range(self.max_tool_rounds + 1):
+            # On the last round the model has to answer with what it has
+            tool_choice = "auto" if attempt < self.max_tool_rounds else "none"
+            result = client.chat.completions.create(model=self.model, messages=request, tools=PORTFOLIO_TOOLS,
+                                                    tool_choice=tool_choice, **kwargs)
+            message = result.choices[0].message
+            if not message.tool_calls:
+                break
+            request.append({
+                "role": "assistant",
+                "content": message.content,
+                "tool_calls": [{"id": call.id, "type": "function",
+                                "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                               for call in message.tool_calls]
+            })
+            for call in message.tool_calls:
+                output = self._run_tool(snapshot, call.function.name, call.function.arguments)
+                request.append({"role": "tool", "tool_call_id": call.id, "content": json.dumps(output)})
+
+        response = (message.content or "").strip()
+        if response and key is not None:
+            self.cache.set(key, response)
+        return response
+
+    def stream(self, client, messages, on_complete=None, **kwargs):
+        """Streaming counterpart of complete(): returns a ChatStream that runs the tool rounds and streams the answer."""
+        snapshot = self.snapshots.get(self.user_id)
+        return ChatStream(client, messages, self.model, cache=self.cache, scope=self._scope(snapshot), on_complete=on_complete,
+                          tools=PORTFOLIO_TOOLS, run_tool=lambda name, arguments: self._run_tool(snapshot, name, arguments),
+                          max_tool_rounds=self.max_tool_rounds, **kwargs)
+
+class ToolStubClient:
+    """
+    Local stand-in for the OpenAI client that asks for get_portfolio_summary once per question
+    and then answers from the tool result, for exercising the tool loop without an API key.
+    """
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, tools=None, tool_choice="auto", **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if messages[-1]["role"] != "tool" and tools and tool_choice != "none":
+            call = SimpleNamespace(id=f"call_{self.calls}", type="function",
+                                   function=SimpleNamespace(name="get_portfolio_summary", arguments="{}"))
+            message = SimpleNamespace(content=None, tool_calls=[call])
+        else:
+            summary = json.loads(messages[-1]["content"]) if messages[-1]["role"] == "tool" else {}
+            value = summary.get("total", {}).get("market_value")
+            message = SimpleNamespace(content=f"Your portfolios are worth {value} as of {summary.get('as_of')}.", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def benchmark(user_id, questions=20, latency=0.05):
+    """
+    Answers the same portfolio questions for a user with the snapshot rebuilt for every
+    question (queries and quote requests each time) and with the cached snapshot.
+    """
+    asked = [[{"role": "system", "content": PORTFOLIO_PROMPT}, {"role": "user", "content": f"How are my portfolios doing? ({i})"}]
+             for i in range(questions)]
+
+    def replay(snapshots):
+        chat = PortfolioChat(user_id, snapshots=snapshots)
+        client = ToolStubClient(latency)
+        started = time.perf_counter()
+        for messages in asked:
+            chat.complete(client, messages)
+        return time.perf_counter() - started, snapshots.stats()
+
+    uncached, stats = replay(PortfolioSnapshots(ttl=0))
+    print(f"{questions} questions, {latency * 1000:.0f} ms model latency")
+    print(f"Rebuilt per question: {uncached:.2f} s, {stats['builds']} snapshot builds ({stats['build_seconds']:.2f} s)")
+    cached, stats = replay(PortfolioSnapshots())
+    print(f"Cached snapshot:      {cached:.2f} s, {stats['builds']} snapshot builds ({stats['build_seconds']:.2f} s), "
+          f"{stats['hits']} cache reads")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]))
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from dotenv import load_dotenv
+from psycopg2 import Error
+from cache import TTLCache
+from database import create_connection, close_connection
+
+load_dotenv()
+
+CHAT_MODEL = os.getenv('CHAT_MODEL', 'gpt-4o-mini')
+CHAT_CACHE_SIZE = int(os.getenv('CHAT_CACHE_SIZE', 1024))  # Responses kept in memory
+CHAT_CACHE_TTL = float(os.getenv('CHAT_CACHE_TTL', 300))  # Seconds a cached response is served
+CHAT_CACHE_PERSIST = os.getenv('CHAT_CACHE_PERSIST', '').lower() in ('1', 'true', 'yes')  # Also keep responses in "ChatResponseCache"
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize(text):
+    """Lowercases, collapses whitespace and drops trailing punctuation, so trivially different phrasings share a key."""
+    return _WHITESPACE.sub(' ', (text or '').lower()).strip().rstrip('?!. ')
+
+def cache_key(messages, model=CHAT_MODEL, scope=None):
+    """
+    Hashes the whole normalized conversation, including any summary of earlier turns. A follow-up
+    such as "and its dividend?" only hits when everything before it matches too, so the hits
+    come from questions asked at the start of a session.
+    `scope` separates answers that depend on more than the messages, e.g. a user's own data.
+    """
+    payload = [model, scope] + [[message["role"], normalize(message["content"])] for message in messages]
+    return hashlib.sha256(json.dumps(payload).encode('utf-8')).hexdigest()
+
+class PostgresResponseStore:
+    """Persistent response tier backed by the "ChatResponseCache" table (migration 0004)."""
+    def get(self, key):
+        connection = create_connection()
+        if connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('''
+                    SELECT "response", EXTRACT(EPOCH FROM "expires_at" - CURRENT_TIMESTAMP)
+                    FROM "ChatResponseCache" WHERE "key" = %s AND "expires_at" > CURRENT_TIMESTAMP
+                ''', (key,))
+                row = cursor.fetchone()
+                return (row[0], float(row[1])) if row else None
+            except Error as e:
+                print(f"Database Error: {e}")
+            finally:
+                cursor.close()
+                close_connection(connection)
+        return None
+
+    def set(self, key, response, ttl):
+        connection = create_connection()
+        if connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('''
+                    INSERT INTO "ChatResponseCache" ("key", "response", "expires_at")
+                    VALUES (%s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 second')
+                    ON CONFLICT ("key") DO UPDATE SET
+                        "response" = EXCLUDED."response", "created_at" = CURRENT_TIMESTAMP, "expires_at" = EXCLUDED."expires_at"
+                ''', (key, response, ttl))
+                connection.commit()
+            except Error as e:
+                print(f"Database Error: {e}")
+            finally:
+                cursor.close()
+                close_connection(connection)
+
+    def purge(self):
+        """Deletes expired responses and returns how many were removed."""
+        connection = create_connection()
+        if connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('DELETE FROM "ChatResponseCache" WHERE "expires_at" <= CURRENT_TIMESTAMP')
+                connection.commit()
+                return cursor.rowcount
+            except Error as e:
+                print(f"Database Error: {e}")
+            finally:
+                cursor.close()
+                close_connection(connection)
+        return 0
+
+    def delete(self, key):
+        self._delete('DELETE FROM "ChatResponseCache" WHERE "key" = %s', (key,))
+
+    def clear(self):
+        """Deletes every stored response, including those cached by other processes."""
+        self._delete('DELETE FROM "ChatResponseCache"')
+
+    def _delete(self, query, params=()):
+        connection = create_connection()
+        if connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(query, params)
+                connection.commit()
+            except Error as e:
+                print(f"Database Error: {e}")
+            finally:
+                cursor.close()
+                close_connection(connection)
+
+class ResponseCache:
+    """
+    Caches model responses by a hash of the normalized conversation: an in-process LRU with
+    a TTL in front of an optional Postgres tier. Disk hits are promoted into memory for their
+    remaining TTL. The model client is passed to each call, so any object with the OpenAI
+    client.chat.completions.create interface can be used, including StubClient below.
+    """
+    def __init__(self, maxsize=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL, persist=CHAT_CACHE_PERSIST):
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk = PostgresResponseStore() if persist else None
+        self.disk_hits = 0
+        self.model_seconds = 0.0
+
+    def get(self, key):
+        response = self.memory.get(key)
+        if response is not None or self.disk is None:
+            return response
+        cached = self.disk.get(key)
+        if cached is None:
+            return None
+        response, remaining = cached
+        self.disk_hits += 1
+        self.memory.set(key, response, ttl=remaining)
+        return response
+
+    def set(self, key, response):
+        self.memory.set(key, response)
+        if self.disk is not None:
+            self.disk.set(key, response, self.ttl)
+
+    def complete(self, client, messages, model=CHAT_MODEL, scope=None, **kwargs):
+        """Returns the cached response for this conversation, asking the model on a miss."""
+        key = cache_key(messages, model, scope)
+        response = self.get(key)
+        if response is not None:
+            return response
+        started = time.perf_counter()
+        result = client.chat.completions.create(model=model, messages=messages, **kwargs)
+        self.model_seconds += time.perf_counter() - started
+        response = result.choices[0].message.content.strip()
+        if response:
+            self.set(key, response)
+        return response
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        """Forgets every cached response, in memory and in the shared "ChatResponseCache" table."""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["misses"] -= self.disk_hits
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["model_seconds"] = self.model_seconds
+        return stats
+
+class StubClient:
+    """
+    Local stand-in for the OpenAI client: answers after a fixed delay and counts calls,
+    for exercising the cache without network access or an API key.
+    """
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        content = f"Answer to: {messages[-1]['content']}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def benchmark(requests=500, latency=0.05, persist=CHAT_CACHE_PERSIST, seed=0):
+    """
+    Replays a skewed mix of definitional questions, each with a few phrasings, against the stub
+    client with and without the cache. With `persist`, the memory tier is then emptied, as after
+    a restart, and the questions are replayed against the Postgres tier.
+    """
+    topics = ["P/E ratio", "market capitalization", "dividend yield", "beta", "EBITDA", "free cash flow",
+              "a bond's duration", "the Sharpe ratio", "dollar-cost averaging", "an ETF", "short selling",
+              "a stop-loss order", "the yield curve", "book value", "return on equity", "an index fund"]
+    phrasings = ["What is {}?", "what is {}", "What is  {} ?", "WHAT IS {}?"]
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(topics))]  # A few questions are asked far more often
+    questions = [rng.choice(phrasings).format(rng.choices(topics, weights)[0]) for _ in range(requests)]
+    system = {"role": "system", "content": "You are a financial assistant."}
+
+    def replay(ask):
+        started = time.perf_counter()
+        for question in questions:
+            ask([system, {"role": "user", "content": question}])
+        return time.perf_counter() - started
+
+    stub = StubClient(latency)
+    uncached = replay(lambda messages: stub.create(CHAT_MODEL, messages))
+    print(f"{requests} questions, {latency * 1000:.0f} ms model latency")
+    print(f"Without cache: {uncached:.2f} s, {stub.calls} model calls")
+
+    stub = StubClient(latency)
+    response_cache = ResponseCache(persist=persist)
+    cached = replay(lambda messages: response_cache.complete(stub, messages))
+    stats = response_cache.stats()
+    print(f"With cache: {cached:.2f} s, {stub.calls} model calls, hit rate {stats['hit_rate']:.1%} ({uncached / cached:.1f}x)")
+
+    if persist:
+        stub = StubClient(latency)
+        response_cache.memory.clear()
+        restarted = replay(lambda messages: response_cache.complete(stub, messages))
+        stats = response_cache.stats()
+        print(f"After restart: {restarted:.2f} s, {stub.calls} model calls, {stats['disk_hits']} Postgres hits")
+
+if __name__ == "__main__":
+    benchmark()
@@ -3,6 +3,8 @@ CREATE DATABASE "PortfolioTrackingDB";
 
 \c "PortfolioTrackingDB";  -- Connect to the database
 
+-- Indexes and later schema changes live in migrations/; apply them with: python migrate.py apply
+
 CREATE TABLE IF NOT EXISTS "Users" (
     "user_id" SERIAL PRIMARY KEY,
     "username" VARCHAR(50) UNIQUE NOT NULL,
@@ -30,7 +32,8 @@ CREATE TABLE IF NOT EXISTS "Stocks" (
     "purchase_price" NUMERIC(10, 2) NOT NULL,
     "avg_purchase_price" NUMERIC(10, 2) DEFAULT 0,
     "total_value" NUMERIC(10, 2) GENERATED ALWAYS AS ("shares" * "purchase_price") STORED,
-    "purchase_date" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    "purchase_date" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE ("portfolio_id", "symbol")
 );
 
 CREATE TABLE IF NOT EXISTS "ChatHistory" (
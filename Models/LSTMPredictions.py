@@ -1,9 +1,13 @@
+import time
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import TimeSeriesSplit
-import yfinance as yf
+from PortfolioManagement.price_history import get_price_matrix
+from Models.windowing import make_loader, sliding_windows, valid_window_indices
+from Models.training import fit, predict
+from Models.scheduler import run_jobs
 
 import torch
 import torch.nn as nn
@@ -15,18 +19,29 @@ START_DATE = '2020-01-01'
 END_DATE = '2024-01-01'
 TIME_STEP = 100
 TRAIN_RATIO = 0.8
-EPOCHS = 100
+EPOCHS = 100  # Upper bound when early stopping is on
+PATIENCE = None  # Epochs without improvement on the held-out window before a fold stops; None trains all EPOCHS on every window
+EARLY_STOPPING_RATIO = 0.1  # Share of each fold's training windows held out to stop on, and never trained on, when PATIENCE is set
+WARM_START = False  # Start each fold from the previous fold's weights
 BATCH_SIZE = 64
+ACCUMULATION_STEPS = 1  # Batches whose gradients are summed before each optimizer step
+NUM_WORKERS = 0  # DataLoader worker processes; 0 gathers batches in the training process
+TRAIN_WORKERS = None  # Processes training folds in parallel; None uses every core
+THREADS_PER_WORKER = 1  # Torch threads per training process
 LEARNING_RATE = 0.01
 WEIGHT_DECAY = 0.001
 HIDDEN_DIM = 32
 NUM_LAYERS = 2
 N_SPLITS = 5 
+MULTI_SERIES = False  # Train one model shared by every ticker instead of one model per ticker
+EMBEDDING_DIM = 8  # Size of the learned ticker embedding fed to the shared model
+MULTI_SERIES_BATCH_SIZE = 256  # Windows per batch for the shared model, which sees every ticker's windows each epoch
 DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
 # Function to download and preprocess data
 def download_and_preprocess(tickers, start, end):
-    data = yf.download(tickers, start=start, end=end)['Adj Close']
+    # Reads from the local price-history store, downloading only dates it does not have yet
+    data = get_price_matrix(tickers, start, end, field='adj_close')
     data = data.resample('D').mean().ffill()
     scaler = StandardScaler()
     scaled_data = scaler.fit_transform(data)
@@ -49,12 +64,8 @@ def calculate_metrics(y_true, y_pred):
     return mae, mse, rmse, mape, mpe
 
 # Function to evaluate the model
-def evaluate_model(model, X, y):
-    model.eval()
-    with torch.no_grad():
-        outputs = model(X).squeeze()
-    y_pred = outputs.cpu().numpy()
-    y_true = y.cpu().numpy()
+def evaluate_model(model, loader):
+    y_pred, y_true = predict(model, loader, DEVICE)
     return calculate_metrics(y_true, y_pred)
 
 class LSTMModel(nn.Module):
@@ -81,6 +92,146 @@ class LSTMModel(nn.Module):
         out = self.fc(out)
         return out
 
+class MultiSeriesLSTMModel(nn.Module):
+    """
+    One LSTM for many tickers. Each series is standardized on its own (download_and_preprocess),
+    and a learned embedding of the ticker is fed alongside the price at every time step, so the
+    shared weights can still tell the tickers apart.
+    """
+    def __init__(self, n_series, embedding_dim, hidden_dim, num_layers, output_dim, dropout_prob=0.2):
+        super(MultiSeriesLSTMModel, self).__init__()
+        self.hidden_dim = hidden_dim
+        self.num_layers = num_layers
+        self.embedding = nn.Embedding(n_series, embedding_dim)
+        self.lstm = nn.LSTM(1 + embedding_dim, hidden_dim, num_layers, batch_first=True, dropout=dropout_prob)
+        self.dropout = nn.Dropout(dropout_prob)
+        self.fc = nn.Linear(hidden_dim, output_dim)
+
+    def forward(self, x, series_ids):
+        # Repeat each window's ticker embedding at every time step next to the price
+        embedded = self.embedding(series_ids).unsqueeze(1).expand(-1, x.size(1), -1)
+        x = torch.cat([x, embedded], dim=-1)
+        
+        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_dim).to(DEVICE)
+        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_dim).to(DEVICE)
+        out, _ = self.lstm(x, (h0, c0))
+        out = self.dropout(out[:, -1, :])
+        return self.fc(out)
+
+def cross_validation_jobs(series_by_ticker, warm_start=WARM_START):
+    """
+    Jobs of (ticker, series, folds) for train_folds, where folds lists (fold, train_index,
+    val_index) from TimeSeriesSplit. Each fold is its own job, longest training window first so
+    the pool does not end up waiting on one big fold; with `warm_start` a ticker's folds depend
+    on each other, so they form one job.
+    """
+    jobs = []
+    tscv = TimeSeriesSplit(n_splits=N_SPLITS)
+    for ticker, series in series_by_ticker.items():
+        X, _ = sliding_windows(series, TIME_STEP)
+        folds = [(fold, train_index, val_index) for fold, (train_index, val_index) in enumerate(tscv.split(X))]
+        if warm_start:
+            jobs.append((ticker, series, folds))
+        else:
+            jobs.extend((ticker, series, [fold]) for fold in folds)
+    jobs.sort(key=lambda job: -sum(len(train_index) for _, train_index, _ in job[2]))
+    return jobs
+
+def multi_series_jobs(tickers, data, warm_start=WARM_START):
+    """
+    Jobs of (tickers, data, folds) for train_multi_series_folds, where `data` is the (dates x
+    tickers) matrix and each fold's indices are the flat positions of its windows without NaN.
+    Folds split on time, as in cross_validation_jobs, so every ticker is in every fold.
+    """
+    tscv = TimeSeriesSplit(n_splits=N_SPLITS)
+    samples = np.arange(len(data) - TIME_STEP)
+    folds = [(fold, valid_window_indices(data, TIME_STEP, train_samples), valid_window_indices(data, TIME_STEP, val_samples))
+             for fold, (train_samples, val_samples) in enumerate(tscv.split(samples))]
+    if warm_start:
+        return [(tickers, data, folds)]
+    folds.sort(key=lambda fold: -len(fold[1]))
+    return [(tickers, data, [fold]) for fold in folds]
+
+def _train_folds(name, X, y, folds, new_model, batch_size, epochs, patience, warm_start, verbose):
+    """
+    Trains and evaluates each fold in turn, yielding (fold, val_index, predictions, targets,
+    epochs trained, seconds). The last EARLY_STOPPING_RATIO of each fold's training windows is
+    held out to stop on when `patience` is set; with `warm_start`, each fold starts from the
+    previous fold's weights, since the training windows only grow.
+    """
+    pin_memory = DEVICE.type == 'cuda'
+    criterion = nn.MSELoss()
+    state = None
+    for fold, train_index, val_index in folds:
+        if verbose:
+            print(f"Training fold {fold + 1}/{N_SPLITS} for {name}...")
+        started = time.perf_counter()
+        torch.manual_seed(fold)  # Same result whichever worker runs the fold
+        stop_loader = None
+        if patience:
+            held_out = max(int(len(train_index) * EARLY_STOPPING_RATIO), 1)
+            train_index, stop_index = train_index[:-held_out], train_index[-held_out:]
+            stop_loader = make_loader(X, y, stop_index, batch_size, num_workers=NUM_WORKERS, pin_memory=pin_memory)
+        
+        # Mini-batch loaders over the window views, so memory stays at one batch as history grows
+        train_loader = make_loader(X, y, train_index, batch_size, shuffle=True, num_workers=NUM_WORKERS, pin_memory=pin_memory,
+                                   generator=torch.Generator().manual_seed(fold))
+        val_loader = make_loader(X, y, val_index, batch_size, num_workers=NUM_WORKERS, pin_memory=pin_memory)
+        
+        # Initialize model, loss, and optimizer
+        model = new_model().to(DEVICE)
+        if warm_start and state is not None:
+            model.load_state_dict(state)
+        optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE, weight_decay=WEIGHT_DECAY)
+        
+        def log(epoch, loss, stop_loss):
+            if verbose and (epoch % 10 == 0 or epoch == 1):
+                stopping = f', Early-stopping loss: {stop_loss:.4f}' if stop_loss is not None else ''
+                print(f'{name} - Fold {fold + 1} - Epoch [{epoch}/{epochs}], Loss: {loss:.4f}{stopping}')
+        
+        trained = fit(model, train_loader, criterion, optimizer, DEVICE, epochs, stop_loader, patience, ACCUMULATION_STEPS, log)
+        state = model.state_dict()
+        
+        # Evaluate the model on the validation set
+        predictions, targets = predict(model, val_loader, DEVICE)
+        yield fold, val_index, predictions, targets, trained, time.perf_counter() - started
+
+def _fold_result(ticker, fold, predictions, targets, trained, seconds, verbose):
+    metrics = calculate_metrics(targets, predictions)
+    if verbose:
+        mae, mse, rmse, mape, mpe = metrics
+        print(f'{ticker} - Fold {fold + 1} - {trained} epochs - Validation MAE: {mae:.4f}, MSE: {mse:.4f}, RMSE: {rmse:.4f}, MAPE: {mape:.2f}%, MPE: {mpe:.2f}%')
+    return {"ticker": ticker, "fold": fold, "metrics": list(metrics), "predictions": predictions,
+            "epochs": trained, "seconds": seconds}
+
+def train_folds(ticker, series, folds, epochs=EPOCHS, patience=PATIENCE, warm_start=WARM_START, verbose=True):
+    """
+    Trains one ticker's model on each of `folds` and returns one result per fold. Runs in a
+    worker process, so it only takes picklable arguments.
+    """
+    X, y = sliding_windows(series, TIME_STEP)
+    new_model = lambda: LSTMModel(input_dim=1, hidden_dim=HIDDEN_DIM, num_layers=NUM_LAYERS, output_dim=1)
+    return [_fold_result(ticker, fold, predictions, targets, trained, seconds, verbose)
+            for fold, _, predictions, targets, trained, seconds
+            in _train_folds(ticker, X, y, folds, new_model, BATCH_SIZE, epochs, patience, warm_start, verbose)]
+
+def train_multi_series_folds(tickers, data, folds, epochs=EPOCHS, patience=PATIENCE, warm_start=WARM_START, verbose=True):
+    """
+    Trains one model shared by all `tickers` on each of `folds` and returns one result per
+    ticker and fold, in the same form as train_folds.
+    """
+    X, y = sliding_windows(data, TIME_STEP)
+    new_model = lambda: MultiSeriesLSTMModel(len(tickers), EMBEDDING_DIM, HIDDEN_DIM, NUM_LAYERS, output_dim=1)
+    results = []
+    for fold, val_index, predictions, targets, trained, seconds in _train_folds(
+            "all tickers", X, y, folds, new_model, MULTI_SERIES_BATCH_SIZE, epochs, patience, warm_start, verbose):
+        series = val_index % len(tickers)
+        for i, ticker in enumerate(tickers):
+            mask = series == i
+            if mask.any():
+                results.append(_fold_result(ticker, fold, predictions[mask], targets[mask], trained, seconds, verbose))
+    return results
+
 # Main Execution
 def main():
     # Download and preprocess data
@@ -90,64 +241,27 @@ def main():
     model_perf_df = pd.DataFrame(columns=['MAE', 'MSE', 'RMSE', 'MAPE', 'MPE'])
     all_predictions = {}
     
-    # Iterate over each ticker
+    # Train every fold of every ticker, or of the shared model, on the process pool
+    if MULTI_SERIES:
+        train = train_multi_series_folds
+        jobs = multi_series_jobs(TICKER_SYMBOLS, historical_data[TICKER_SYMBOLS].to_numpy(dtype=np.float32))
+    else:
+        train = train_folds
+        series_by_ticker = {ticker: historical_data[ticker].to_numpy(dtype=np.float32) for ticker in TICKER_SYMBOLS}
+        jobs = cross_validation_jobs(series_by_ticker)
+    fold_metrics = {ticker: [None] * N_SPLITS for ticker in TICKER_SYMBOLS}
+    for _, results in run_jobs(train, jobs, TRAIN_WORKERS, THREADS_PER_WORKER):
+        for result in results:
+            fold_metrics[result["ticker"]][result["fold"]] = result["metrics"]
+            # Optional: Store predictions for the last fold for visualization purposes
+            if result["fold"] == N_SPLITS - 1:
+                all_predictions[result["ticker"]] = result["predictions"]
+    
     for ticker in TICKER_SYMBOLS:
-        # Create datasets
-        X, y = create_xy(historical_data[ticker].values, TIME_STEP)
-        
-        # Initialize TimeSeriesSplit for cross-validation
-        tscv = TimeSeriesSplit(n_splits=N_SPLITS)
-        
-        # Store fold metrics for averaging
-        fold_metrics = []
-        
-        for fold, (train_index, val_index) in enumerate(tscv.split(X)):
-            print(f"Training fold {fold + 1}/{N_SPLITS} for ticker {ticker}...")
-            
-            # Split data into training and validation sets
-            X_train, X_val = X[train_index], X[val_index]
-            y_train, y_val = y[train_index], y[val_index]
-            
-            # Convert to tensors
-            X_train = torch.tensor(X_train, dtype=torch.float32).unsqueeze(-1).to(DEVICE)
-            y_train = torch.tensor(y_train, dtype=torch.float32).to(DEVICE)
-            X_val = torch.tensor(X_val, dtype=torch.float32).unsqueeze(-1).to(DEVICE)
-            y_val = torch.tensor(y_val, dtype=torch.float32).to(DEVICE)
-            
-            # Initialize model, loss, and optimizer
-            model = LSTMModel(input_dim=1, hidden_dim=HIDDEN_DIM, num_layers=NUM_LAYERS, output_dim=1).to(DEVICE)
-            criterion = nn.MSELoss()
-            optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE, weight_decay=WEIGHT_DECAY)
-            
-            # Training loop
-            model.train()
-            for epoch in range(1, EPOCHS + 1):
-                optimizer.zero_grad()
-                outputs = model(X_train).squeeze()
-                loss = criterion(outputs, y_train)
-                loss.backward()
-                optimizer.step()
-                
-                if epoch % 10 == 0 or epoch == 1:
-                    print(f'{ticker} - Fold {fold + 1} - Epoch [{epoch}/{EPOCHS}], Loss: {loss.item():.4f}')
-            
-            # Evaluate the model on the validation set
-            mae, mse, rmse, mape, mpe = evaluate_model(model, X_val, y_val)
-            print(f'{ticker} - Fold {fold + 1} - Validation MAE: {mae:.4f}, MSE: {mse:.4f}, RMSE: {rmse:.4f}, MAPE: {mape:.2f}%, MPE: {mpe:.2f}%')
-            
-            # Store metrics for this fold
-            fold_metrics.append([mae, mse, rmse, mape, mpe])
-        
         # Calculate average metrics across all folds
-        avg_metrics = np.mean(fold_metrics, axis=0)
+        avg_metrics = np.mean([metrics for metrics in fold_metrics[ticker] if metrics is not None], axis=0)
         model_perf_df.loc[ticker] = avg_metrics
         print(f'\n{ticker} - Average CV MAE: {avg_metrics[0]:.4f}, MSE: {avg_metrics[1]:.4f}, RMSE: {avg_metrics[2]:.4f}, MAPE: {avg_metrics[3]:.2f}%, MPE: {avg_metrics[4]:.2f}%')
-        
-        # Optional: Store predictions for the last fold for visualization purposes
-        model.eval()
-        with torch.no_grad():
-            predictions = model(X_val).squeeze().cpu().numpy()
-        all_predictions[ticker] = predictions
 
     # Display performance metrics
     print("\nCross-Validation Model Performance Metrics:")
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+import numpy as np
+import torch
+
+def _init_worker(threads):
+    # Each worker gets a fixed share of the cores instead of every process starting one thread per core
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+def run_jobs(fn, jobs, workers=None, threads_per_worker=1):
+    """
+    Runs fn(*job) for every job and yields (job index, result) as they finish. Jobs run on a
+    pool of `workers` processes (default: cores // threads_per_worker), each limited to
+    `threads_per_worker` torch threads. Workers are spawned rather than forked, since forking a
+    process that has already started torch's thread pools can deadlock. With one worker, jobs
+    run in this process, and its torch thread settings are left as they are.
+    """
+    if workers is None:
+        workers = max((os.cpu_count() or 1) // threads_per_worker, 1)
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        for index, job in enumerate(jobs):
+            yield index, fn(*job)
+        return
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(threads_per_worker,)) as executor:
+        futures = {executor.submit(fn, *job): index for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def benchmark(n_tickers=4, days=1500, epochs=5, workers=None):
+    """
+    Cross-validates synthetic tickers with every fold in this process and then on the process
+    pool, and checks that both give the same metrics.
+    """
+    from Models.LSTMPredictions import cross_validation_jobs, train_folds
+
+    rng = np.random.default_rng(0)
+    series = {f"T{i}": rng.standard_normal(days).cumsum().astype(np.float32) for i in range(n_tickers)}
+    for ticker, values in series.items():
+        series[ticker] = (values - values.mean()) / values.std()
+    jobs = cross_validation_jobs(series, warm_start=False)
+    train = partial(train_folds, epochs=epochs, patience=None, verbose=False)
+    workers = workers or os.cpu_count() or 1
+
+    def run(workers):
+        started = time.perf_counter()
+        results = dict(run_jobs(train, jobs, workers))
+        return time.perf_counter() - started, [results[index][0]["metrics"] for index in range(len(jobs))]
+
+    print(f"{n_tickers} tickers x {len(jobs) // n_tickers} folds, {epochs} epochs, {os.cpu_count()} cores")
+    serial, serial_metrics = run(1)
+    print(f"1 worker:   {serial:.1f} s")
+    parallel, parallel_metrics = run(workers)
+    print(f"{workers} workers: {parallel:.1f} s ({serial / parallel:.1f}x), "
+          f"same metrics: {np.allclose(serial_metrics, parallel_metrics)}")
+
+if __name__ == "__main__":
+    benchmark()
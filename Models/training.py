@@ -0,0 +1,232 @@
+import argparse
+import copy
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+def train_epoch(model, loader, criterion, optimizer, device, accumulation_steps=1):
+    """
+    One pass over `loader` in mini-batches. Gradients are accumulated over `accumulation_steps`
+    batches before each optimizer step, for a larger effective batch at the memory cost of one.
+    Batches are (inputs..., targets); the inputs are passed to the model in order.
+    Returns the mean loss per sample.
+    """
+    model.train()
+    optimizer.zero_grad()
+    total_loss = 0.0
+    samples = 0
+    for step, (*inputs, y_batch) in enumerate(loader, 1):
+        inputs = [tensor.to(device, non_blocking=True) for tensor in inputs]
+        y_batch = y_batch.to(device, non_blocking=True)
+        loss = criterion(model(*inputs).squeeze(-1), y_batch)
+        (loss / accumulation_steps).backward()
+        if step % accumulation_steps == 0:
+            optimizer.step()
+            optimizer.zero_grad()
+        # item() also waits for the batch to be used before its buffer is refilled
+        total_loss += loss.item() * len(y_batch)
+        samples += len(y_batch)
+    if step % accumulation_steps != 0:
+        optimizer.step()
+        optimizer.zero_grad()
+    return total_loss / samples
+
+def predict(model, loader, device):
+    """Returns predictions and targets for every batch in `loader` as numpy arrays."""
+    model.eval()
+    predictions, targets = [], []
+    with torch.no_grad():
+        for *inputs, y_batch in loader:
+            inputs = [tensor.to(device, non_blocking=True) for tensor in inputs]
+            predictions.append(model(*inputs).squeeze(-1).cpu().numpy())
+            targets.append(y_batch.numpy().copy())
+    return np.concatenate(predictions), np.concatenate(targets)
+
+def evaluate_loss(model, loader, criterion, device):
+    """Mean loss per sample over `loader`, without updating the model."""
+    model.eval()
+    total_loss = 0.0
+    samples = 0
+    with torch.no_grad():
+        for *inputs, y_batch in loader:
+            inputs = [tensor.to(device, non_blocking=True) for tensor in inputs]
+            y_batch = y_batch.to(device, non_blocking=True)
+            loss = criterion(model(*inputs).squeeze(-1), y_batch)
+            total_loss += loss.item() * len(y_batch)
+            samples += len(y_batch)
+    return total_loss / samples
+
+class EarlyStopping:
+    """
+    Stops training once the validation loss has not improved by more than `min_delta` for
+    `patience` epochs in a row, and keeps a copy of the weights from the best epoch.
+    """
+    def __init__(self, patience, min_delta=0.0):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best_loss = float('inf')
+        self.best_epoch = 0
+        self.best_state = None
+        self.bad_epochs = 0
+
+    def step(self, epoch, loss, model):
+        """Records an epoch's validation loss and returns True when training should stop."""
+        if loss < self.best_loss - self.min_delta:
+            self.best_loss = loss
+            self.best_epoch = epoch
+            self.best_state = copy.deepcopy(model.state_dict())
+            self.bad_epochs = 0
+            return False
+        self.bad_epochs += 1
+        return self.bad_epochs >= self.patience
+
+    def restore(self, model):
+        if self.best_state is not None:
+            model.load_state_dict(self.best_state)
+
+def fit(model, train_loader, criterion, optimizer, device, epochs, stop_loader=None, patience=None,
+        accumulation_steps=1, log=None):
+    """
+    Trains for up to `epochs`. With a `stop_loader` and `patience`, training stops early once
+    the loss on that validation window stops improving, and the best weights are restored.
+    log(epoch, train_loss, validation_loss) is called after every epoch. Returns the number
+    of epochs run.
+    """
+    stopper = EarlyStopping(patience) if stop_loader is not None and patience else None
+    epoch = 0
+    for epoch in range(1, epochs + 1):
+        loss = train_epoch(model, train_loader, criterion, optimizer, device, accumulation_steps)
+        stop_loss = evaluate_loss(model, stop_loader, criterion, device) if stopper is not None else None
+        if log is not None:
+            log(epoch, loss, stop_loss)
+        if stopper is not None and stopper.step(epoch, stop_loss, model):
+            break
+    if stopper is not None:
+        stopper.restore(model)
+    return epoch
+
+def benchmark(days=3000, epochs=20, batch_size=64, time_step=100):
+    """
+    Trains the same LSTM for the same number of epochs full-batch, as main() used to, and
+    in shuffled mini-batches, on a synthetic series; reports time and validation MSE.
+    """
+    from Models.LSTMPredictions import HIDDEN_DIM, LEARNING_RATE, NUM_LAYERS, WEIGHT_DECAY, LSTMModel
+    from Models.windowing import make_loader, sliding_windows
+
+    rng = np.random.default_rng(0)
+    series = rng.standard_normal(days).cumsum()
+    series = ((series - series.mean()) / series.std()).astype(np.float32)
+    X, y = sliding_windows(series, time_step)
+    split = int(len(X) * 0.8)
+    train_index, val_index = np.arange(split), np.arange(split, len(X))
+    device = torch.device('cpu')
+    val_loader = make_loader(X, y, val_index, batch_size=1024)
+
+    def run(train_loader):
+        torch.manual_seed(0)
+        model = LSTMModel(input_dim=1, hidden_dim=HIDDEN_DIM, num_layers=NUM_LAYERS, output_dim=1)
+        optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE, weight_decay=WEIGHT_DECAY)
+        started = time.perf_counter()
+        for _ in range(epochs):
+            train_epoch(model, train_loader, nn.MSELoss(), optimizer, device)
+        seconds = time.perf_counter() - started
+        y_pred, y_true = predict(model, val_loader, device)
+        return seconds, float(np.mean((y_pred - y_true) ** 2))
+
+    print(f"{len(train_index)} training windows of {time_step}, {epochs} epochs")
+    seconds, mse = run(make_loader(X, y, train_index, batch_size=len(train_index)))
+    print(f"Full batch:         {seconds:.1f} s, validation MSE {mse:.4f}")
+    seconds, mse = run(make_loader(X, y, train_index, batch_size=batch_size, shuffle=True))
+    print(f"Mini-batches of {batch_size}: {seconds:.1f} s, validation MSE {mse:.4f}")
+
+def benchmark_early_stopping(n_tickers=2, days=1500, epochs=100, patience=10):
+    """
+    Cross-validates synthetic tickers for a fixed number of epochs, with early stopping, and
+    with early stopping plus warm-starting each fold from the previous one; reports wall-clock
+    time, epochs trained and the mean validation MSE across folds.
+    """
+    from Models.LSTMPredictions import cross_validation_jobs, train_folds
+
+    rng = np.random.default_rng(0)
+    series = {}
+    for i in range(n_tickers):
+        values = rng.standard_normal(days).cumsum()
+        series[f"T{i}"] = ((values - values.mean()) / values.std()).astype(np.float32)
+
+    def run(patience, warm_start):
+        started = time.perf_counter()
+        results = []
+        for job in cross_validation_jobs(series, warm_start):
+            results.extend(train_folds(*job, epochs=epochs, patience=patience, warm_start=warm_start, verbose=False))
+        seconds = time.perf_counter() - started
+        return seconds, sum(result["epochs"] for result in results), np.mean([result["metrics"][1] for result in results])
+
+    print(f"{n_tickers} tickers x {days} days, up to {epochs} epochs per fold, patience {patience}")
+    baseline, baseline_epochs, baseline_mse = run(None, False)
+    print(f"Fixed epochs:               {baseline:6.1f} s, {baseline_epochs:4d} epochs, validation MSE {baseline_mse:.4f}")
+    for label, warm_start in (("Early stopping:", False), ("Early stopping, warm start:", True)):
+        seconds, trained, mse = run(patience, warm_start)
+        print(f"{label:<27} {seconds:6.1f} s, {trained:4d} epochs, validation MSE {mse:.4f} "
+              f"({1 - seconds / baseline:.0%} less time, MSE {mse - baseline_mse:+.4f})")
+
+def benchmark_multi_series(n_tickers=20, days=1000, epochs=30, patience=5, inference_tickers=500):
+    """
+    Trains one model per ticker and one model shared by every ticker on the same synthetic
+    series and split, with early stopping, and compares training time and validation MSE.
+    Then times a next-day forecast for `inference_tickers` tickers: one forward pass per
+    ticker's model against a single batched pass of the shared model.
+    """
+    from Models.LSTMPredictions import (EMBEDDING_DIM, HIDDEN_DIM, NUM_LAYERS, TIME_STEP, LSTMModel,
+                                        MultiSeriesLSTMModel, train_folds, train_multi_series_folds)
+    from Models.windowing import valid_window_indices
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((days, n_tickers)).cumsum(axis=0)
+    data = ((data - data.mean(axis=0)) / data.std(axis=0)).astype(np.float32)
+    tickers = [f"T{i}" for i in range(n_tickers)]
+    samples = np.arange(days - TIME_STEP)
+    split = int(len(samples) * 0.8)
+
+    started = time.perf_counter()
+    per_ticker = []
+    for i, ticker in enumerate(tickers):
+        per_ticker.extend(train_folds(ticker, data[:, i], [(0, samples[:split], samples[split:])], epochs, patience, verbose=False))
+    per_ticker_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fold = (0, valid_window_indices(data, TIME_STEP, samples[:split]), valid_window_indices(data, TIME_STEP, samples[split:]))
+    shared = train_multi_series_folds(tickers, data, [fold], epochs, patience, verbose=False)
+    shared_seconds = time.perf_counter() - started
+
+    print(f"{n_tickers} tickers x {days} days, up to {epochs} epochs, patience {patience}")
+    print(f"One model per ticker: {per_ticker_seconds:6.1f} s, {sum(result['epochs'] for result in per_ticker)} epochs "
+          f"over {n_tickers} models, validation MSE {np.mean([result['metrics'][1] for result in per_ticker]):.4f}")
+    print(f"Shared model:         {shared_seconds:6.1f} s, {shared[0]['epochs']} epochs, "
+          f"validation MSE {np.mean([result['metrics'][1] for result in shared]):.4f} ({per_ticker_seconds / shared_seconds:.1f}x faster)")
+
+    windows = torch.randn(inference_tickers, TIME_STEP, 1)
+    models = [LSTMModel(input_dim=1, hidden_dim=HIDDEN_DIM, num_layers=NUM_LAYERS, output_dim=1).eval() for _ in range(inference_tickers)]
+    shared_model = MultiSeriesLSTMModel(inference_tickers, EMBEDDING_DIM, HIDDEN_DIM, NUM_LAYERS, output_dim=1).eval()
+    with torch.no_grad():
+        started = time.perf_counter()
+        for model, window in zip(models, windows):
+            model(window.unsqueeze(0))
+        loop_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        shared_model(windows, torch.arange(inference_tickers))
+        batched_seconds = time.perf_counter() - started
+    print(f"Next-day forecast for {inference_tickers} tickers: {loop_seconds * 1000:.0f} ms with one model each, "
+          f"{batched_seconds * 1000:.0f} ms batched ({loop_seconds / batched_seconds:.0f}x faster)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LSTM training benchmarks.")
+    parser.add_argument("benchmark", nargs="?", choices=["batching", "early-stopping", "multi-series"], default="batching")
+    args = parser.parse_args()
+    if args.benchmark == "early-stopping":
+        benchmark_early_stopping()
+    elif args.benchmark == "multi-series":
+        benchmark_multi_series()
+    else:
+        benchmark()
@@ -0,0 +1,158 @@
+import time
+import numpy as np
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, SequentialSampler
+
+def sliding_windows(series, time_step):
+    """
+    Returns X and y for next-step forecasting as read-only views of `series`, without copying:
+    X[i] is series[i:i + time_step] and y[i] is series[i + time_step], the same samples as
+    create_xy. Indexing X with an array of positions copies only those windows.
+    For a 2D (dates x tickers) array, X has shape (samples, tickers, time_step) and y (samples, tickers).
+    """
+    series = np.asarray(series)
+    X = sliding_window_view(series[:-1], time_step, axis=0)
+    y = series[time_step:]
+    return X, y
+
+def iter_windows(X, y, indices=None, batch_size=64):
+    """
+    Yields (X_batch, y_batch) copies of `batch_size` windows at a time, in the order of
+    `indices` (all samples by default). Peak memory is one batch rather than the full X array.
+    """
+    if indices is None:
+        indices = np.arange(len(X))
+    for start in range(0, len(indices), batch_size):
+        batch = indices[start:start + batch_size]
+        yield X[batch], y[batch]
+
+class WindowBatches(Dataset):
+    """
+    Map-style dataset whose items are whole batches: dataset[positions] gathers those windows
+    from the sliding_windows views and returns (X, y) float32 tensors with X shaped
+    (batch, time_step, 1). Used with a BatchSampler and batch_size=None, so windows are
+    gathered with one fancy index per batch rather than collated one sample at a time.
+    With `reuse_buffers` and float32 views, batches are written into preallocated (pinned if
+    `pin_memory`) tensors; only safe in the main process, where each batch is consumed before the next.
+    """
+    def __init__(self, X, y, indices, batch_size, reuse_buffers=False, pin_memory=False):
+        self.X = X
+        self.y = y
+        self.indices = np.asarray(indices)
+        self.x_buffer = self.y_buffer = None
+        if reuse_buffers and X.dtype == y.dtype == np.float32:
+            self.x_buffer = torch.empty((batch_size, X.shape[1], 1), dtype=torch.float32, pin_memory=pin_memory)
+            self.y_buffer = torch.empty(batch_size, dtype=torch.float32, pin_memory=pin_memory)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, positions):
+        samples = self.indices[positions]
+        if self.x_buffer is None:
+            X = torch.from_numpy(self.X[samples].astype(np.float32, copy=False)).unsqueeze(-1)
+            y = torch.from_numpy(self.y[samples].astype(np.float32, copy=False))
+            return X, y
+        X = self.x_buffer[:len(samples)]
+        y = self.y_buffer[:len(samples)]
+        np.take(self.X, samples, axis=0, out=X.numpy()[..., 0])
+        np.take(self.y, samples, axis=0, out=y.numpy())
+        return X, y
+
+class MultiSeriesBatches(Dataset):
+    """
+    Batches of windows across many series, for one model shared by every ticker. X and y are
+    the sliding_windows views of a (dates x tickers) matrix and `indices` are flat positions
+    sample * n_series + series (see valid_window_indices). dataset[positions] returns
+    (X, series_ids, y) with X shaped (batch, time_step, 1).
+    """
+    def __init__(self, X, y, indices):
+        self.X = X
+        self.y = y
+        self.indices = np.asarray(indices)
+        self.n_series = X.shape[1]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, positions):
+        samples, series = np.divmod(self.indices[positions], self.n_series)
+        X = torch.from_numpy(self.X[samples, series].astype(np.float32, copy=False)).unsqueeze(-1)
+        y = torch.from_numpy(self.y[samples, series].astype(np.float32, copy=False))
+        return X, torch.from_numpy(series), y
+
+def valid_window_indices(data, time_step, samples=None):
+    """
+    Flat sample * n_series + series positions of the windows of a (dates x tickers) matrix that
+    contain no NaN, e.g. before a ticker listed, optionally limited to the given sample
+    positions. A running count of NaNs per series checks every window without building X.
+    """
+    missing = np.isnan(data)
+    counts = np.vstack([np.zeros((1, data.shape[1]), dtype=np.int64), missing.cumsum(axis=0)])
+    # Sample i reads rows i to i + time_step, the last one being its target
+    valid = counts[time_step + 1:] - counts[:len(data) - time_step] == 0
+    if samples is not None:
+        valid = valid[samples]
+        samples = np.asarray(samples)
+    else:
+        samples = np.arange(len(valid))
+    rows, series = np.nonzero(valid)
+    return samples[rows] * data.shape[1] + series
+
+def make_loader(X, y, indices, batch_size=64, shuffle=False, num_workers=0, pin_memory=False, generator=None):
+    """
+    DataLoader over the windows at `indices` of the sliding_windows views X, y. Batches are
+    shuffled each epoch when `shuffle` is set. With num_workers=0, batches reuse preallocated
+    buffers; with worker processes, each batch is a new tensor and pinning is left to the loader.
+    Views of a (dates x tickers) matrix give MultiSeriesBatches, which are pinned by the loader.
+    """
+    if X.ndim == 3:
+        dataset = MultiSeriesBatches(X, y, indices)
+        pin_batches = pin_memory
+    else:
+        dataset = WindowBatches(X, y, indices, batch_size, reuse_buffers=num_workers == 0, pin_memory=pin_memory)
+        pin_batches = pin_memory and num_workers > 0
+    sampler = RandomSampler(dataset, generator=generator) if shuffle else SequentialSampler(dataset)
+    return DataLoader(dataset, sampler=BatchSampler(sampler, batch_size, drop_last=False), batch_size=None,
+                      num_workers=num_workers, pin_memory=pin_batches, persistent_workers=num_workers > 0)
+
+def benchmark(years=20, n_tickers=500, time_step=100, batch_size=64):
+    """
+    Builds windows for `n_tickers` synthetic daily series with create_xy and with
+    sliding_windows, and reads every window once in batches from the views.
+    """
+    from Models.LSTMPredictions import create_xy
+
+    rng = np.random.default_rng(0)
+    days = years * 365  # main() resamples to calendar days
+    data = rng.standard_normal((days, n_tickers)).cumsum(axis=0)
+
+    started = time.perf_counter()
+    loop_bytes = 0
+    for ticker in range(n_tickers):
+        X, y = create_xy(data[:, ticker], time_step)
+        loop_bytes += X.nbytes + y.nbytes
+    loop_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    views = [sliding_windows(data[:, ticker], time_step) for ticker in range(n_tickers)]
+    view_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    checksum = 0.0
+    for X, y in views:
+        for X_batch, y_batch in iter_windows(X, y, batch_size=batch_size):
+            checksum += X_batch[-1, -1]
+    batch_seconds = time.perf_counter() - started
+    batch_bytes = batch_size * time_step * data.itemsize
+
+    samples = days - time_step
+    print(f"{n_tickers} tickers x {days} days, {samples} windows of {time_step} per ticker")
+    print(f"create_xy:       {loop_seconds:.2f} s, {loop_bytes / 2 ** 30:.2f} GiB of windows copied")
+    print(f"sliding_windows: {view_seconds * 1000:.1f} ms, no copy ({loop_seconds / view_seconds:.0f}x faster)")
+    print(f"Reading every window in batches of {batch_size}: {batch_seconds:.2f} s, "
+          f"{batch_bytes / 2 ** 10:.0f} KiB per batch")
+
+if __name__ == "__main__":
+    benchmark()
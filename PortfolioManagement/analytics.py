@@ -0,0 +1,129 @@
+import os
+import time
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from PortfolioManagement.price_history import get_price_matrix
+from PortfolioManagement.valuation import load_holdings
+
+load_dotenv()
+
+TRADING_DAYS = 252
+RISK_FREE_RATE = float(os.getenv('RISK_FREE_RATE', 0.0))  # Annual rate used for Sharpe and Sortino
+ANALYTICS_LOOKBACK_DAYS = int(os.getenv('ANALYTICS_LOOKBACK_DAYS', 365))
+ROLLING_WINDOWS = {"return_1m": 21, "return_3m": 63, "return_6m": 126}
+METRICS = ("twr", "annualized_return", "annualized_volatility", "sharpe", "sortino", "max_drawdown") + tuple(ROLLING_WINDOWS)
+
+def holdings_matrix(portfolio_ids, symbols, shares):
+    """Pivots holdings into a (portfolios x symbols) matrix of share counts."""
+    portfolio_keys, portfolio_index = np.unique(np.asarray(portfolio_ids, dtype=str), return_inverse=True)
+    symbol_keys, symbol_index = np.unique(np.asarray(symbols, dtype=str), return_inverse=True)
+    matrix = np.zeros((len(portfolio_keys), len(symbol_keys)))
+    np.add.at(matrix, (portfolio_index, symbol_index), np.asarray(shares, dtype=float))
+    return portfolio_keys, symbol_keys, matrix
+
+def portfolio_values(price_matrix, share_matrix):
+    """
+    Multiplies a (dates x symbols) price matrix by a (portfolios x symbols) share matrix,
+    giving a (dates x portfolios) matrix of portfolio values. Gaps in a symbol's prices are
+    forward filled, and dates before its first price use that first price.
+    """
+    prices = pd.DataFrame(price_matrix).ffill().bfill().fillna(0.0).to_numpy()
+    return prices @ share_matrix.T
+
+def simple_returns(values):
+    """Period-over-period returns for each column of a values matrix (NaN where undefined)."""
+    returns = np.full((max(values.shape[0] - 1, 0), values.shape[1]), np.nan)
+    np.divide(values[1:], values[:-1], out=returns, where=values[:-1] > 0)
+    return returns - 1
+
+def rolling_returns(values, window):
+    """Trailing `window`-period returns for each column; row i covers values[i] to values[i + window]."""
+    returns = np.full((max(values.shape[0] - window, 0), values.shape[1]), np.nan)
+    np.divide(values[window:], values[:-window], out=returns, where=values[:-window] > 0)
+    return returns - 1
+
+def max_drawdowns(values):
+    """Largest peak-to-trough decline of each column, as a negative fraction."""
+    running_max = np.maximum.accumulate(values, axis=0)
+    drawdowns = np.zeros_like(values)
+    np.divide(values, running_max, out=drawdowns, where=running_max > 0)
+    drawdowns = np.where(running_max > 0, drawdowns - 1, 0.0)
+    return drawdowns.min(axis=0)
+
+def compute_metrics(values, risk_free_rate=RISK_FREE_RATE, periods_per_year=TRADING_DAYS):
+    """
+    Computes performance statistics for every column of a (dates x portfolios) values
+    matrix at once. Returns a dict of arrays, one value per portfolio. With fewer than two
+    dates, e.g. an empty price store or a failed download, every metric is NaN.
+    """
+    if values.shape[0] < 2:
+        return {name: np.full(values.shape[1], np.nan) for name in METRICS}
+    returns = simple_returns(values)
+    periods = np.sum(~np.isnan(returns), axis=0)
+    growth = np.nanprod(1 + returns, axis=0)
+
+    # Chain-linked period returns give the time-weighted return
+    twr = growth - 1
+    annualized_return = np.full_like(twr, np.nan)
+    np.power(growth, periods_per_year / np.maximum(periods, 1), out=annualized_return, where=periods > 0)
+    annualized_return -= 1
+
+    excess = returns - risk_free_rate / periods_per_year
+    mean_excess = np.nanmean(excess, axis=0)
+    std = np.nanstd(returns, axis=0, ddof=1)
+    downside = np.sqrt(np.nanmean(np.minimum(excess, 0) ** 2, axis=0))
+    sharpe = np.full_like(mean_excess, np.nan)
+    np.divide(mean_excess, std, out=sharpe, where=std > 0)
+    sortino = np.full_like(mean_excess, np.nan)
+    np.divide(mean_excess, downside, out=sortino, where=downside > 0)
+
+    metrics = {
+        "twr": twr,
+        "annualized_return": annualized_return,
+        "annualized_volatility": std * np.sqrt(periods_per_year),
+        "sharpe": sharpe * np.sqrt(periods_per_year),
+        "sortino": sortino * np.sqrt(periods_per_year),
+        "max_drawdown": max_drawdowns(values)
+    }
+    for name, window in ROLLING_WINDOWS.items():
+        trailing = rolling_returns(values, window)
+        metrics[name] = trailing[-1] if len(trailing) else np.full(values.shape[1], np.nan)
+    return metrics
+
+def analyze_portfolios(user_id=None, start=None, end=None):
+    """
+    Computes performance metrics for every portfolio of a user, or of all users when
+    user_id is None, over a shared price matrix from the local price-history store.
+    The schema keeps current holdings rather than a trade history, so each portfolio is
+    measured as its current holdings held over the whole period.
+    """
+    end = end or date.today() + timedelta(days=1)
+    start = start or pd.Timestamp(end).date() - timedelta(days=ANALYTICS_LOOKBACK_DAYS)
+
+    holdings = load_holdings(user_id)
+    if not len(holdings["symbol"]):
+        return pd.DataFrame()
+    portfolio_keys, symbol_keys, share_matrix = holdings_matrix(
+        holdings["portfolio_id"], holdings["symbol"], holdings["shares"]
+    )
+    prices = get_price_matrix(list(symbol_keys), start, end, field='adj_close')
+    values = portfolio_values(prices[list(symbol_keys)].to_numpy(), share_matrix)
+
+    metrics = pd.DataFrame(compute_metrics(values), index=pd.Index(portfolio_keys, name="portfolio_id"))
+    _, first = np.unique(np.asarray(holdings["portfolio_id"], dtype=str), return_index=True)
+    metrics.insert(0, "user_id", holdings["user_id"][first])
+    metrics.insert(1, "portfolio_name", holdings["portfolio_name"][first])
+    return metrics
+
+def run_nightly():
+    """Computes metrics for all portfolios of all users in one pass and prints them."""
+    start = time.perf_counter()
+    metrics = analyze_portfolios()
+    print(metrics.to_string())
+    print(f"\nAnalyzed {len(metrics)} portfolios in {time.perf_counter() - start:.2f} seconds")
+    return metrics
+
+if __name__ == "__main__":
+    run_nightly()
@@ -0,0 +1,184 @@
+import asyncio
+import os
+import random
+import threading
+import numpy as np
+import yfinance as yf
+from PortfolioManagement.stock_price import get_quote_cache, publish_prices
+
+PRICE_FETCH_CONCURRENCY = int(os.getenv('PRICE_FETCH_CONCURRENCY', 8))  # Quote requests in flight at once
+PRICE_FETCH_RATE = float(os.getenv('PRICE_FETCH_RATE', 10))  # Sustained quote requests per second
+PRICE_FETCH_BURST = int(os.getenv('PRICE_FETCH_BURST', 10))  # Requests allowed back to back before throttling
+PRICE_FETCH_RETRIES = int(os.getenv('PRICE_FETCH_RETRIES', 3))
+PRICE_FETCH_BACKOFF = float(os.getenv('PRICE_FETCH_BACKOFF', 0.5))  # Base delay in seconds between retries
+
+class TokenBucket:
+    """Asyncio token-bucket rate limiter: `rate` tokens per second, holding at most `capacity`."""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated_at is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+def _fetch_quote_blocking(symbol):
+    history = yf.Ticker(symbol).history(period="1d")
+    if history.empty:
+        raise LookupError(f"No price data found for {symbol}.")
+    return float(history['Close'].iloc[-1])
+
+async def fetch_quote_yfinance(symbol):
+    """Default quote source: runs the blocking yfinance lookup on the loop's executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _fetch_quote_blocking, symbol)
+
+class AsyncPriceFetcher:
+    """
+    Fetches quotes concurrently with a bounded number of workers, a shared token-bucket
+    rate limit and retries with jittered exponential backoff. `fetch_quote` is any
+    coroutine function taking a symbol and returning its price, so other quote sources
+    can be plugged in. cancel() may be called from any thread to stop a running fetch.
+    """
+    def __init__(self, fetch_quote=fetch_quote_yfinance, concurrency=PRICE_FETCH_CONCURRENCY,
+                 rate=PRICE_FETCH_RATE, burst=PRICE_FETCH_BURST, retries=PRICE_FETCH_RETRIES,
+                 backoff=PRICE_FETCH_BACKOFF, use_cache=True):
+        self.fetch_quote = fetch_quote
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.use_cache = use_cache
+        self._loop = None
+        self._task = None
+        self._cancelled = False
+
+    async def _fetch_with_retries(self, symbol, limiter):
+        for attempt in range(self.retries + 1):
+            await limiter.acquire()
+            try:
+                return await self.fetch_quote(symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if attempt == self.retries:
+                    raise
+            delay = self.backoff * (2 ** attempt)
+            await asyncio.sleep(random.uniform(delay / 2, delay * 1.5))
+
+    async def _worker(self, queue, limiter, prices, failures):
+        while True:
+            symbol = await queue.get()
+            try:
+                if symbol is None:
+                    return
+                try:
+                    prices[symbol] = float(await self._fetch_with_retries(symbol, limiter))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    failures[symbol] = str(e) or type(e).__name__
+            finally:
+                queue.task_done()
+
+    async def _run(self, symbols):
+        cache = get_quote_cache() if self.use_cache else None
+        prices = {}
+        failures = {}
+        pending = []
+        for symbol in symbols:
+            cached_price = cache.get(symbol) if cache is not None else None
+            if cached_price is not None:
+                prices[symbol] = cached_price
+            else:
+                pending.append(symbol)
+
+        if pending:
+            limiter = TokenBucket(self.rate, self.burst)
+            # The bounded queue applies backpressure: symbols are handed out only as workers free up
+            queue = asyncio.Queue(maxsize=self.concurrency)
+            worker_count = min(self.concurrency, len(pending))
+            workers = [asyncio.ensure_future(self._worker(queue, limiter, prices, failures))
+                       for _ in range(worker_count)]
+            try:
+                for symbol in pending:
+                    await queue.put(symbol)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+
+        fetched = {symbol: prices[symbol] for symbol in pending if symbol in prices}
+        if cache is not None:
+            for symbol, price in fetched.items():
+                cache.set(symbol, price)
+        publish_prices(fetched)
+        return prices, failures
+
+    async def fetch_all(self, symbols):
+        """
+        Prices a list of symbols. Returns a float array aligned with the input
+        (NaN where no price was found) and a dict of failed symbols to reasons.
+        """
+        normalized = [symbol.strip().upper() for symbol in symbols]
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.ensure_future(self._run(list(dict.fromkeys(normalized))))
+        # Also honours a cancel() made before this fetch started, e.g. right after fetch_prices_in_thread
+        if self._cancelled:
+            self._task.cancel()
+        try:
+            prices, failures = await self._task
+        finally:
+            # A cancel() only applies to the fetch it interrupted, so the fetcher can be reused
+            self._task = None
+            self._loop = None
+            self._cancelled = False
+        return np.array([prices.get(symbol, np.nan) for symbol in normalized], dtype=float), failures
+
+    def cancel(self):
+        """Cancels the fetch in progress. Safe to call from any thread."""
+        self._cancelled = True
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+def fetch_prices(symbols, fetcher=None):
+    """
+    Blocking entry point for code that is not already running an event loop, such as the
+    CLI or a GUI worker thread. Raises asyncio.CancelledError if the fetcher is cancelled.
+    """
+    fetcher = fetcher or AsyncPriceFetcher()
+    return asyncio.run(fetcher.fetch_all(symbols))
+
+def fetch_prices_in_thread(symbols, on_done, fetcher=None):
+    """
+    Runs fetch_prices on a daemon thread and calls on_done(prices, failures, error) from
+    that thread when it finishes. Returns the fetcher so the caller can cancel() it.
+    """
+    fetcher = fetcher or AsyncPriceFetcher()
+
+    def run():
+        try:
+            prices, failures = fetch_prices(symbols, fetcher)
+        except BaseException as e:
+            on_done(None, None, e)
+        else:
+            on_done(prices, failures, None)
+
+    threading.Thread(target=run, daemon=True).start()
+    return fetcher
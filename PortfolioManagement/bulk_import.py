@@ -0,0 +1,225 @@
+import argparse
+import csv
+import io
+import time
+from decimal import Decimal, InvalidOperation
+from psycopg2 import Error
+from database import create_connection, close_connection
+from PortfolioManagement.stock_price import get_current_prices
+from PortfolioManagement.portfolio_snapshot import portfolio_snapshots
+
+MAX_REPORTED_ERRORS = 20
+MERGE_ROUNDS = 10  # Upsert rounds in a row that may merge nothing, because every new stock_id clashed, before the import fails
+
+# Header names accepted for each column, so common brokerage exports load without editing
+COLUMN_ALIASES = {
+    "portfolio": ("portfolio", "portfolio_name", "account"),
+    "symbol": ("symbol", "ticker"),
+    "shares": ("shares", "quantity", "qty"),
+    "price": ("price", "purchase_price", "trade_price")
+}
+
+class _CopyStream(io.TextIOBase):
+    """Read-only text stream over an iterator of lines, used to feed COPY without buffering the file."""
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+def _resolve_columns(fieldnames):
+    normalized = {name.strip().lower(): name for name in fieldnames or []}
+    columns = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        columns[column] = next((normalized[alias] for alias in aliases if alias in normalized), None)
+    missing = [column for column in ("portfolio", "symbol", "shares") if columns[column] is None]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    return columns
+
+def _staging_lines(reader, columns, report):
+    """Validates trade rows one at a time and yields them as CSV lines for the staging table."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for line_no, row in enumerate(reader, start=2):
+        try:
+            portfolio = (row[columns["portfolio"]] or "").strip()
+            symbol = (row[columns["symbol"]] or "").strip().upper()
+            shares = int(row[columns["shares"]])
+            price = (row[columns["price"]] or "").strip().lstrip("$") if columns["price"] else ""
+            if not portfolio or not symbol or len(symbol) > 10:
+                raise ValueError("missing portfolio or invalid symbol")
+            if shares <= 0:
+                raise ValueError("shares must be a positive integer")
+            if price and Decimal(price) <= 0:
+                raise ValueError("price must be positive")
+        except (ValueError, TypeError, KeyError, InvalidOperation) as e:
+            report["rejected_rows"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append(f"Line {line_no}: {e}")
+            continue
+        writer.writerow((line_no, portfolio, symbol, shares, price))
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+
+def import_holdings(user_id, path):
+    """
+    Loads a CSV of trades (portfolio, symbol, shares and optional price columns) into
+    "Stocks" for a user. Rows are streamed into a temporary staging table with COPY,
+    symbols are validated with one batch quote request, and all trades are merged in
+    set-based statements that accumulate shares and recompute avg_purchase_price.
+    Rows without a price use the current price. Everything commits in one transaction.
+    """
+    report = {"success": False, "imported_rows": 0, "rejected_rows": 0, "errors": [],
+              "invalid_symbols": [], "unknown_portfolios": [], "holdings_updated": 0, "holdings_added": 0}
+    connection = create_connection()
+    if not connection:
+        report["errors"].append("Could not connect to the database.")
+        return report
+    cursor = connection.cursor()
+    try:
+        cursor.execute('''
+            CREATE TEMP TABLE "import_staging" (
+                "line_no" BIGINT, "portfolio_name" VARCHAR(255), "symbol" VARCHAR(10),
+                "shares" INT, "price" NUMERIC(10, 2)
+            ) ON COMMIT DROP
+        ''')
+        with open(path, newline='') as f:
+            reader = csv.DictReader(f)
+            columns = _resolve_columns(reader.fieldnames)
+            cursor.copy_expert(
+                'COPY "import_staging" ("line_no", "portfolio_name", "symbol", "shares", "price") FROM STDIN WITH (FORMAT csv)',
+                _CopyStream(_staging_lines(reader, columns, report))
+            )
+
+        cursor.execute('''
+            WITH "deleted" AS (
+                DELETE FROM "import_staging" s
+                WHERE NOT EXISTS (SELECT 1 FROM "Portfolios" p WHERE p."user_id" = %s AND p."name" = s."portfolio_name")
+                RETURNING s."portfolio_name"
+            )
+            SELECT "portfolio_name", COUNT(*) FROM "deleted" GROUP BY "portfolio_name" ORDER BY "portfolio_name"
+        ''', (user_id,))
+        unknown = cursor.fetchall()
+        report["rejected_rows"] += sum(count for _, count in unknown)
+        report["unknown_portfolios"] = [name for name, _ in unknown]
+
+        # Validate every distinct symbol with a single batch quote request
+        cursor.execute('SELECT DISTINCT "symbol" FROM "import_staging"')
+        symbols = [row[0] for row in cursor.fetchall()]
+        prices, failures = get_current_prices(symbols)
+        valid = [(symbol, float(price)) for symbol, price in zip(symbols, prices) if symbol not in failures]
+        report["invalid_symbols"] = sorted(failures)
+        if failures:
+            cursor.execute('DELETE FROM "import_staging" WHERE "symbol" = ANY(%s)', (list(failures),))
+            report["rejected_rows"] += cursor.rowcount
+        cursor.execute('''
+            UPDATE "import_staging" s SET "price" = q."price"
+            FROM unnest(%s::varchar[], %s::numeric[]) AS q("symbol", "price")
+            WHERE s."symbol" = q."symbol" AND s."price" IS NULL
+        ''', ([symbol for symbol, _ in valid], [price for _, price in valid]))
+
+        cursor.execute('''
+            CREATE TEMP TABLE "import_trades" ON COMMIT DROP AS
+            SELECT p."portfolio_id", s."symbol", SUM(s."shares") AS "shares",
+                   SUM(s."shares" * s."price") AS "cost",
+                   (ARRAY_AGG(s."price" ORDER BY s."line_no" DESC))[1] AS "last_price",
+                   COUNT(*) AS "rows", FALSE AS "merged"
+            FROM "import_staging" s
+            JOIN "Portfolios" p ON p."user_id" = %s AND p."name" = s."portfolio_name"
+            GROUP BY p."portfolio_id", s."symbol"
+        ''', (user_id,))
+        cursor.execute('SELECT COALESCE(SUM("rows"), 0) FROM "import_trades"')
+        report["imported_rows"] = int(cursor.fetchone()[0])
+
+        # One upsert on ("portfolio_id", "symbol") adds to existing holdings and inserts new ones, so a
+        # holding inserted concurrently, e.g. by add_stock, is merged rather than raising. New rows get
+        # fresh random stock_ids that are not taken yet; a row whose id clashes is retried next round.
+        idle_rounds = 0
+        while True:
+            cursor.execute('''
+                WITH "candidates" AS (
+                    SELECT i."portfolio_id", i."symbol", i."shares", i."cost", i."last_price",
+                           LEFT(gen_random_uuid()::text, 6) AS "stock_id"
+                    FROM "import_trades" i
+                    WHERE NOT i."merged"
+                ), "upserted" AS (
+                    INSERT INTO "Stocks" ("stock_id", "user_id", "portfolio_id", "symbol", "shares", "purchase_price", "avg_purchase_price")
+                    SELECT DISTINCT ON (c."stock_id") c."stock_id", %s, c."portfolio_id", c."symbol", c."shares",
+                           c."last_price", c."cost" / c."shares"
+                    FROM "candidates" c
+                    WHERE NOT EXISTS (SELECT 1 FROM "Stocks" t WHERE t."stock_id" = c."stock_id")
+                    ON CONFLICT ("portfolio_id", "symbol") DO UPDATE SET
+                        "shares" = "Stocks"."shares" + EXCLUDED."shares",
+                        "purchase_price" = EXCLUDED."purchase_price",
+                        "avg_purchase_price" = ("Stocks"."avg_purchase_price" * "Stocks"."shares"
+                                                + EXCLUDED."avg_purchase_price" * EXCLUDED."shares")
+                                               / ("Stocks"."shares" + EXCLUDED."shares")
+                    RETURNING "portfolio_id", "symbol", (xmax = 0) AS "inserted"
+                )
+                UPDATE "import_trades" i SET "merged" = TRUE
+                FROM "upserted" u
+                WHERE i."portfolio_id" = u."portfolio_id" AND i."symbol" = u."symbol"
+                RETURNING u."inserted"
+            ''', (user_id,))
+            merged = [row[0] for row in cursor.fetchall()]
+            report["holdings_added"] += sum(merged)
+            report["holdings_updated"] += len(merged) - sum(merged)
+            cursor.execute('SELECT COUNT(*) FROM "import_trades" WHERE NOT "merged"')
+            unmerged = cursor.fetchone()[0]
+            if not unmerged:
+                break
+            # A round where every new stock_id clashed merges nothing; give up, and roll back, if that keeps happening
+            idle_rounds = 0 if merged else idle_rounds + 1
+            if idle_rounds >= MERGE_ROUNDS:
+                raise ValueError(f"{unmerged} holdings could not be given a free stock_id after {MERGE_ROUNDS} attempts")
+
+        connection.commit()
+        portfolio_snapshots.invalidate(user_id)
+        report["success"] = True
+    except (Error, OSError, ValueError, csv.Error) as e:
+        connection.rollback()
+        report["errors"].append(str(e))
+    finally:
+        cursor.close()
+        close_connection(connection)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import trades from a CSV file into a user's portfolios.")
+    parser.add_argument("user_id", type=int)
+    parser.add_argument("path", help="CSV file with portfolio, symbol, shares and optional price columns")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = import_holdings(args.user_id, args.path)
+    elapsed = time.perf_counter() - start
+    if report["success"]:
+        print(f"Imported {report['imported_rows']} trades in {elapsed:.1f} seconds "
+              f"({report['holdings_added']} holdings added, {report['holdings_updated']} updated).")
+    else:
+        print("Import failed.")
+    if report["rejected_rows"]:
+        print(f"Rejected {report['rejected_rows']} rows.")
+    if report["invalid_symbols"]:
+        print(f"Invalid symbols: {', '.join(report['invalid_symbols'])}")
+    if report["unknown_portfolios"]:
+        print(f"Unknown portfolios: {', '.join(report['unknown_portfolios'])}")
+    for error in report["errors"]:
+        print("Error:", error)
+
+if __name__ == "__main__":
+    main()
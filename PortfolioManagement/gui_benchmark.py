@@ -0,0 +1,143 @@
+# gui_benchmark.py
+import io
+import statistics
+import time
+from contextlib import redirect_stdout
+from database import get_connection
+from PortfolioManagement.port_mgmt import format_portfolio, format_valuation
+from PortfolioManagement.portfolio_service import (add_stock, create_portfolio, get_portfolio, list_portfolios,
+                                                   list_stocks, remove_stock, update_portfolio)
+from PortfolioManagement.stock_price import get_quote_cache
+from PortfolioManagement.valuation import value_portfolios
+
+def benchmark(portfolios=10, holdings=20, repeats=50):
+    """
+    Median latency of the GUI's portfolio actions through portfolio_service against the way the
+    GUI ran them before it existed: driving the CLI handlers with scripted input and captured
+    output, which listed the user's portfolios before every action, looked rows up by name and
+    updated one column per statement. Uses a throwaway user; quotes are served from the cache.
+    """
+    username = "gui_benchmark_user"
+    symbols = [f"S{i}" for i in range(holdings)]
+    for symbol in symbols:
+        get_quote_cache().set(symbol, 100.0)
+    with get_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute('DELETE FROM "Users" WHERE "username" = %s', (username,))
+        cursor.execute('INSERT INTO "Users" ("username", "email", "password_hash") VALUES (%s, %s, %s) RETURNING "user_id"',
+                       (username, f"{username}@example.com", ""))
+        user_id = cursor.fetchone()[0]
+        connection.commit()
+        cursor.close()
+    for p in range(portfolios):
+        create_portfolio(user_id, f"P{p}", "benchmark")
+        for symbol in symbols:
+            add_stock(user_id, f"P{p}", symbol, 1000)
+
+    def statements(*queries, commit=False):
+        """Runs (query, params) pairs on one checkout, as each old helper did."""
+        rows = None
+        with get_connection() as connection:
+            cursor = connection.cursor()
+            for query, params in queries:
+                cursor.execute(query, params)
+                rows = cursor.fetchall() if cursor.description else rows
+            if commit:
+                connection.commit()
+            cursor.close()
+        return rows
+
+    # The queries the GUI's name picker and the CLI handler's listing ran before every action
+    picker = ('SELECT "name" FROM "Portfolios" WHERE "user_id" = %s', (user_id,))
+    listing = ('SELECT "name", "description" FROM "Portfolios" WHERE "user_id" = %s', (user_id,))
+    by_name = 'SELECT "portfolio_id" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s'
+    stocks = 'SELECT "symbol", "shares", "purchase_price", "avg_purchase_price" FROM "Stocks" WHERE "portfolio_id" = %s'
+
+    def legacy_view(name):
+        with redirect_stdout(io.StringIO()):
+            statements(picker)
+            statements(listing)
+            portfolio_id = statements(('SELECT "portfolio_id", "name", "description" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s',
+                                       (user_id, name)))[0][0]
+            statements((stocks, (portfolio_id,)))
+            print(format_valuation(value_portfolios(portfolio_id=portfolio_id)))
+
+    def legacy_add(name):
+        with redirect_stdout(io.StringIO()):
+            statements(picker)
+            statements(listing)
+            add_stock(user_id, name, symbols[0], 1)
+
+    # Edits alternate each portfolio between two names
+    renamed = {}
+
+    def new_name(name):
+        current = renamed.get(name, name)
+        renamed[name] = name + "x" if current == name else name
+        return current, renamed[name]
+
+    def legacy_edit(name):
+        name, target = new_name(name)
+        with redirect_stdout(io.StringIO()):
+            statements(picker)
+            statements(listing)
+            portfolio_id = statements((by_name, (user_id, name)))[0][0]
+            statements((by_name, (user_id, target)),
+                       ('UPDATE "Portfolios" SET "name" = %s WHERE "portfolio_id" = %s', (target, portfolio_id)),
+                       ('UPDATE "Portfolios" SET "description" = %s WHERE "portfolio_id" = %s', ("edited", portfolio_id)),
+                       commit=True)
+
+    def legacy_delete_stock(name):
+        with redirect_stdout(io.StringIO()):
+            statements(picker)
+            portfolio_id = statements((by_name, (user_id, name)))[0][0]
+            statements((stocks, (portfolio_id,)))
+            statements(listing)
+            portfolio_id = statements((by_name, (user_id, name)))[0][0]
+            statements((stocks, (portfolio_id,)))
+            statements(('SELECT "shares" FROM "Stocks" WHERE "portfolio_id" = %s AND "symbol" = %s', (portfolio_id, symbols[0])),
+                       ('UPDATE "Stocks" SET "shares" = "shares" - 1 WHERE "portfolio_id" = %s AND "symbol" = %s',
+                        (portfolio_id, symbols[0])), commit=True)
+
+    def view(name):
+        list_portfolios(user_id)
+        response = get_portfolio(user_id, name)
+        format_portfolio(response["portfolio"], response["stocks"])
+
+    def add(name):
+        list_portfolios(user_id)
+        add_stock(user_id, name, symbols[0], 1)
+
+    def edit(name):
+        name, target = new_name(name)
+        list_portfolios(user_id)
+        update_portfolio(user_id, name, target, "edited")
+
+    def delete_stock(name):
+        list_portfolios(user_id)
+        list_stocks(user_id, name)
+        remove_stock(user_id, name, symbols[0], 1)
+
+    def median_ms(action):
+        times = []
+        for i in range(repeats):
+            started = time.perf_counter()
+            action(f"P{i % portfolios}")
+            times.append(time.perf_counter() - started)
+        return statistics.median(times) * 1000
+
+    try:
+        print(f"{portfolios} portfolios x {holdings} holdings, median of {repeats} runs, quotes cached")
+        for label, before, after in (("View portfolio", legacy_view, view), ("Add stock", legacy_add, add),
+                                     ("Edit portfolio", legacy_edit, edit), ("Delete stock", legacy_delete_stock, delete_stock)):
+            old, new = median_ms(before), median_ms(after)
+            print(f"{label + ':':<16} {old:6.2f} ms -> {new:6.2f} ms ({old / new:.1f}x)")
+    finally:
+        with get_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('DELETE FROM "Users" WHERE "user_id" = %s', (user_id,))
+            connection.commit()
+            cursor.close()
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,83 +1,112 @@
-import uuid
-from psycopg2 import Error
-from database import create_connection, close_connection
+import math
+from PortfolioManagement import portfolio_service
 from PortfolioManagement.stock_price import get_current_stock_price
-
-def generate_uuid():
-    return str(uuid.uuid4())[:6]
+from PortfolioManagement.async_prices import fetch_prices
+from PortfolioManagement.valuation import portfolio_holdings, value_portfolios, portfolio_totals
+
+# Formatting helpers shared by the CLI handlers below and the GUI in app.py
+def format_portfolios(portfolios):
+    lines = ["Your Portfolios:"]
+    for idx, portfolio in enumerate(portfolios, start=1):
+        lines.append(f"{idx}. Name: {portfolio['name']}, Description: {portfolio['description']}")
+    return "\n".join(lines)
+
+def format_stocks(stocks):
+    if not stocks:
+        return "No stocks found in this portfolio."
+    lines = ["Stocks in this Portfolio:"]
+    for idx, stock in enumerate(stocks, start=1):
+        lines.append(f"{idx}. Symbol: {stock['symbol']}, Shares: {stock['shares']}, "
+                     f"Latest Purchase Price: ${stock['purchase_price']:.2f}, Avg Purchase Price: ${stock['avg_purchase_price']:.2f}")
+    return "\n".join(lines)
+
+def format_valuation(valuation):
+    """Formats market value, unrealized P&L and weight for each stock of a one-portfolio valuation, and its totals."""
+    if valuation.empty:
+        return ""
+    lines = ["Performance:"]
+    for row in valuation.itertuples(index=False):
+        if math.isnan(row.current_price):
+            lines.append(f"{row.symbol}: Current price unavailable")
+            continue
+        lines.append(f"{row.symbol}: Current Price: ${row.current_price:.2f}, Market Value: ${row.market_value:.2f}, "
+                     f"Unrealized P&L: ${row.unrealized_pnl:.2f} ({row.pnl_pct:.2f}%), Weight: {row.weight * 100:.2f}%")
+    totals = portfolio_totals(valuation).iloc[0]
+    lines.append(f"Total Market Value: ${totals['market_value']:.2f}, "
+                 f"Total Unrealized P&L: ${totals['unrealized_pnl']:.2f} ({totals['pnl_pct']:.2f}%)")
+    return "\n".join(lines)
+
+def format_portfolio(portfolio, stocks):
+    """Formats a get_portfolio result: details, stocks and current valuation."""
+    sections = [
+        f"Portfolio Details:\nName: {portfolio['name']}\nDescription: {portfolio['description']}",
+        format_stocks(stocks)
+    ]
+    if stocks:
+        # The stocks are already loaded, so only their prices are fetched
+        sections.append(format_valuation(value_portfolios(holdings=portfolio_holdings(portfolio, stocks))))
+    return "\n\n".join(section for section in sections if section)
+
+def format_prices(symbols, prices, failures):
+    lines = ["Current Prices:"]
+    for symbol, price in zip(symbols, prices):
+        if symbol in failures:
+            lines.append(f"{symbol}: unavailable ({failures[symbol]})")
+        else:
+            lines.append(f"{symbol}: ${price:.2f}")
+    return "\n".join(lines)
+
+def format_live_metrics(snapshot):
+    """Formats a StreamingMetrics snapshot: value, volatility and drawdown per portfolio since tracking began."""
+    if snapshot.empty:
+        return ""
+    lines = ["Live Metrics (since login):"]
+    for row in snapshot.itertuples():
+        name = row.name if isinstance(row.name, str) else row.Index
+        if row.value is None or math.isnan(row.value):
+            lines.append(f"{name}: waiting for prices of every holding")
+            continue
+        line = f"{name}: Value: ${row.value:.2f}, Drawdown: {row.drawdown * 100:.2f}% (max {row.max_drawdown * 100:.2f}%)"
+        if row.observations > 1:
+            line += (f", Volatility: {row.volatility * 100:.2f}% per period (EWMA {row.ewma_volatility * 100:.2f}%) "
+                     f"over {row.observations} periods")
+        lines.append(line)
+    return "\n".join(lines)
 
 def list_user_portfolios(user_id):
-    """Fetches and prints all portfolios for a user."""
-    connection = create_connection()
-    portfolios = []
-    if connection:
-        cursor = connection.cursor()
-        try:
-            cursor.execute('SELECT "name", "description" FROM "Portfolios" WHERE "user_id" = %s', (user_id,))
-            portfolios = cursor.fetchall()
-            if portfolios:
-                print("\nYour Portfolios:")
-                for idx, portfolio in enumerate(portfolios, start=1):
-                    print(f"{idx}. Name: {portfolio[0]}, Description: {portfolio[1]}")
-            else:
-                print("No portfolios found.")
-        except Error as e:
-            print(f"Database Error: {e}")
-        finally:
-            cursor.close()
-            close_connection(connection)
-    return [portfolio[0] for portfolio in portfolios]  # Return a list of portfolio names for further use
-
-def list_portfolio_stocks(portfolio_id):
-    """Fetches and prints all stocks in a given portfolio."""
-    connection = create_connection()
-    stocks = []
-    if connection:
-        cursor = connection.cursor()
-        try:
-            cursor.execute('SELECT "symbol", "shares", "purchase_price", "avg_purchase_price" FROM "Stocks" WHERE "portfolio_id" = %s', (portfolio_id,))
-            stocks = cursor.fetchall()
-            if stocks:
-                print("\nStocks in this Portfolio:")
-                for idx, stock in enumerate(stocks, start=1):
-                    print(f"{idx}. Symbol: {stock[0]}, Shares: {stock[1]}, Latest Purchase Price: ${stock[2]:.2f}, Avg Purchase Price: ${stock[3]:.2f}")
-            else:
-                print("No stocks found in this portfolio.")
-        except Error as e:
-            print(f"Database Error: {e}")
-        finally:
-            cursor.close()
-            close_connection(connection)
-    return stocks
+    """Prints all portfolios for a user and returns their names."""
+    response = portfolio_service.list_portfolios(user_id)
+    if not response["success"]:
+        print("Error:", response["message"])
+        return []
+    portfolios = response["portfolios"]
+    if portfolios:
+        print("\n" + format_portfolios(portfolios))
+    else:
+        print("No portfolios found.")
+    return [portfolio["name"] for portfolio in portfolios]  # Return a list of portfolio names for further use
+
+def list_portfolio_stocks(user_id, portfolio_name):
+    """Prints all stocks in a given portfolio and returns them."""
+    response = portfolio_service.list_stocks(user_id, portfolio_name)
+    if not response["success"]:
+        print("Error:", response["message"])
+        return []
+    print("\n" + format_stocks(response["stocks"]))
+    return response["stocks"]
 
 def create_portfolio(user_id):
     name = input("Enter portfolio name: ")
     description = input("Enter portfolio description: ")
-    connection = create_connection()
-    if connection:
-        cursor = connection.cursor()
-        portfolio_id = generate_uuid()
-        try:
-            cursor.execute('SELECT "portfolio_id" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, name))
-            if cursor.fetchone():
-                print("Portfolio name must be unique within the same user.")
-                return
-            cursor.execute('INSERT INTO "Portfolios" ("portfolio_id", "user_id", "name", "description") VALUES (%s, %s, %s, %s)',
-                           (portfolio_id, user_id, name, description))
-            connection.commit()
-            print("Portfolio created successfully.")
-        except Error as e:
-            print(f"Database Error: {e}")
-        finally:
-            cursor.close()
-            close_connection(connection)
+    response = portfolio_service.create_portfolio(user_id, name, description)
+    print(response["message"])
 
 def edit_portfolio(user_id):
     portfolio_names = list_user_portfolios(user_id)
     if not portfolio_names:
         print("You have no portfolios to edit.")
         return
-    
+
     current_name = input("Enter current portfolio name: ")
     if current_name not in portfolio_names:
         print("Invalid portfolio name.")
@@ -85,98 +114,57 @@ def edit_portfolio(user_id):
 
     new_name = input("Enter new portfolio name (leave blank to keep current): ")
     new_description = input("Enter new description (leave blank to keep current): ")
-    connection = create_connection()
-    if connection:
-        cursor = connection.cursor()
-        try:
-            cursor.execute('SELECT "portfolio_id" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, current_name))
-            portfolio = cursor.fetchone()
-            if not portfolio:
-                print("Portfolio not found.")
-                return
-            portfolio_id = portfolio[0]
-            if new_name:
-                cursor.execute('SELECT "portfolio_id" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, new_name))
-                if cursor.fetchone():
-                    print("New portfolio name must be unique within the same user.")
-                    return
-                cursor.execute('UPDATE "Portfolios" SET "name" = %s WHERE "portfolio_id" = %s', (new_name, portfolio_id))
-            if new_description:
-                cursor.execute('UPDATE "Portfolios" SET "description" = %s WHERE "portfolio_id" = %s', (new_description, portfolio_id))
-            connection.commit()
-            print("Portfolio updated successfully.")
-        except Error as e:
-            print(f"Database Error: {e}")
-        finally:
-            cursor.close()
-            close_connection(connection)
+    response = portfolio_service.update_portfolio(user_id, current_name, new_name or None, new_description or None)
+    print(response["message"])
 
 def delete_portfolio(user_id):
     portfolio_names = list_user_portfolios(user_id)
     if not portfolio_names:
         print("You have no portfolios to delete.")
         return
-    
+
     name = input("Enter portfolio name to delete: ")
     if name not in portfolio_names:
         print("Invalid portfolio name.")
         return
 
-    connection = create_connection()
-    if connection:
-        cursor = connection.cursor()
-        try:
-            cursor.execute('SELECT "portfolio_id" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, name))
-            portfolio = cursor.fetchone()
-            if not portfolio:
-                print("Portfolio not found.")
-                return
-            portfolio_id = portfolio[0]
-            cursor.execute('DELETE FROM "Portfolios" WHERE "portfolio_id" = %s', (portfolio_id,))
-            connection.commit()
-            print("Portfolio deleted successfully.")
-        except Error as e:
-            print(f"Database Error: {e}")
-        finally:
-            cursor.close()
-            close_connection(connection)
+    response = portfolio_service.delete_portfolio(user_id, name)
+    print(response["message"])
 
 def view_portfolio_with_stocks(user_id):
     portfolio_names = list_user_portfolios(user_id)
     if not portfolio_names:
         print("You have no portfolios to view.")
         return
-    
+
     name = input("Enter portfolio name to view: ")
     if name not in portfolio_names:
         print("Invalid portfolio name.")
         return
 
-    connection = create_connection()
-    if connection:
-        cursor = connection.cursor()
-        try:
-            cursor.execute('SELECT "portfolio_id", "name", "description" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, name))
-            portfolio_record = cursor.fetchone()
-            if not portfolio_record:
-                print("Portfolio not found.")
-                return
-            print("Portfolio Details:")
-            print(f"Name: {portfolio_record[1]}")
-            print(f"Description: {portfolio_record[2]}")
-            
-            # Display stocks in the portfolio
-            list_portfolio_stocks(portfolio_record[0])
-            
-        except Error as e:
-            print(f"Database Error: {e}")
-        finally:
-            cursor.close()
-            close_connection(connection)
+    response = portfolio_service.get_portfolio(user_id, name)
+    if response["success"]:
+        print(format_portfolio(response["portfolio"], response["stocks"]))
+    else:
+        print(response["message"])
 
 def view_portfolios(user_id):
     list_user_portfolios(user_id)
 
+def view_current_prices(user_id):
+    """Fetches current prices for every stock the user holds, concurrently, and prints them."""
+    response = portfolio_service.list_user_symbols(user_id)
+    if not response["success"]:
+        print("Error:", response["message"])
+        return
+    symbols = response["symbols"]
+    if not symbols:
+        print("You have no stocks to price.")
+        return
+
+    prices, failures = fetch_prices(symbols)
+    print("\n" + format_prices(symbols, prices, failures))
+
 def add_stock(user_id):
     portfolio_names = list_user_portfolios(user_id)
     if not portfolio_names:
@@ -188,11 +176,10 @@ def add_stock(user_id):
         print("Invalid portfolio name.")
         return
 
-    # Loop until a valid stock symbol is entered
+    # Loop until a valid stock symbol is entered; the quote is cached for the purchase below
     while True:
         symbol = input("Enter stock symbol: ").upper()
-        current_price = get_current_stock_price(symbol)
-        if current_price is not None:
+        if get_current_stock_price(symbol) is not None:
             break
         print("Invalid stock symbol. Please try again.")
 
@@ -207,41 +194,8 @@ def add_stock(user_id):
         except ValueError:
             print("Invalid input for shares. Please enter a valid integer.")
 
-    connection = create_connection()
-    if connection:
-        cursor = connection.cursor()
-        try:
-            cursor.execute('SELECT "portfolio_id" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, portfolio_name))
-            portfolio = cursor.fetchone()
-            if not portfolio:
-                print("Portfolio not found.")
-                return
-            portfolio_id = portfolio[0]
-
-            # Check if the stock already exists
-            cursor.execute('SELECT "shares", "avg_purchase_price" FROM "Stocks" WHERE "portfolio_id" = %s AND "symbol" = %s', (portfolio_id, symbol))
-            existing_stock = cursor.fetchone()
-            if existing_stock:
-                # Update shares and calculate new average purchase price
-                existing_shares, avg_price = map(float, existing_stock)  # Ensure avg_price is float
-                total_cost = avg_price * existing_shares + current_price * shares
-                new_shares = existing_shares + shares
-                new_avg_price = total_cost / new_shares
-                cursor.execute('UPDATE "Stocks" SET "shares" = %s, "purchase_price" = %s, "avg_purchase_price" = %s WHERE "portfolio_id" = %s AND "symbol" = %s',
-                               (new_shares, current_price, new_avg_price, portfolio_id, symbol))
-                print("Stock updated successfully.")
-            else:
-                # Insert as a new stock
-                stock_id = generate_uuid()
-                cursor.execute('INSERT INTO "Stocks" ("stock_id", "user_id", "portfolio_id", "symbol", "shares", "purchase_price", "avg_purchase_price") VALUES (%s, %s, %s, %s, %s, %s, %s)',
-                               (stock_id, user_id, portfolio_id, symbol, shares, current_price, current_price))
-                print("Stock added successfully.")
-            connection.commit()
-        except Error as e:
-            print(f"Database Error: {e}")
-        finally:
-            cursor.close()
-            close_connection(connection)
+    response = portfolio_service.add_stock(user_id, portfolio_name, symbol, shares)
+    print(response["message"])
 
 def delete_stock(user_id):
     portfolio_names = list_user_portfolios(user_id)
@@ -254,50 +208,21 @@ def delete_stock(user_id):
         print("Invalid portfolio name.")
         return
 
-    connection = create_connection()
-    if connection:
-        cursor = connection.cursor()
-        try:
-            cursor.execute('SELECT "portfolio_id" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, portfolio_name))
-            portfolio = cursor.fetchone()
-            if not portfolio:
-                print("Portfolio not found.")
-                return
-            portfolio_id = portfolio[0]
-
-            # Display current stocks in the portfolio
-            stocks = list_portfolio_stocks(portfolio_id)
-            if not stocks:
-                print("No stocks found in this portfolio.")
-                return
-
-            symbol = input("Enter stock symbol to delete shares from: ").upper()
-            cursor.execute('SELECT "shares" FROM "Stocks" WHERE "portfolio_id" = %s AND "symbol" = %s', (portfolio_id, symbol))
-            stock = cursor.fetchone()
-            if not stock:
-                print("Stock not found in this portfolio.")
-                return
-
-            current_shares = stock[0]
-            delete_shares = int(input(f"Enter number of shares to delete (max {current_shares}): "))
-            if delete_shares > current_shares:
-                print("Cannot delete more shares than currently owned.")
-                return
+    # Display current stocks in the portfolio
+    stocks = list_portfolio_stocks(user_id, portfolio_name)
+    if not stocks:
+        return
 
-            if delete_shares < current_shares:
-                # Update shares if deleting part of the stock
-                new_shares = current_shares - delete_shares
-                cursor.execute('UPDATE "Stocks" SET "shares" = %s WHERE "portfolio_id" = %s AND "symbol" = %s',
-                               (new_shares, portfolio_id, symbol))
-                print(f"{delete_shares} shares deleted successfully.")
-            else:
-                # Delete stock entry if deleting all shares
-                cursor.execute('DELETE FROM "Stocks" WHERE "portfolio_id" = %s AND "symbol" = %s', (portfolio_id, symbol))
-                print("Stock deleted successfully.")
+    symbol = input("Enter stock symbol to delete shares from: ").upper()
+    current_shares = next((stock["shares"] for stock in stocks if stock["symbol"] == symbol), None)
+    if current_shares is None:
+        print("Stock not found in this portfolio.")
+        return
 
-            connection.commit()
-        except Error as e:
-            print(f"Database Error: {e}")
-        finally:
-            cursor.close()
-            close_connection(connection)
\ No newline at end of file
+    try:
+        delete_shares = int(input(f"Enter number of shares to delete (max {current_shares}): "))
+    except ValueError:
+        print("Invalid input for shares. Please enter a valid integer.")
+        return
+    response = portfolio_service.remove_stock(user_id, portfolio_name, symbol, delete_shares)
+    print(response["message"])
@@ -0,0 +1,237 @@
+# portfolio_service.py
+import uuid
+from psycopg2 import Error
+from psycopg2.errors import UniqueViolation
+from database import create_connection, close_connection
+from PortfolioManagement.stock_price import get_current_stock_price
+from PortfolioManagement.portfolio_snapshot import portfolio_snapshots
+
+STOCK_COLUMNS = ("symbol", "shares", "purchase_price", "avg_purchase_price")
+
+def generate_uuid():
+    return str(uuid.uuid4())[:6]
+
+def list_portfolios(user_id):
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT "portfolio_id", "name", "description" FROM "Portfolios" WHERE "user_id" = %s ORDER BY "created_at", "name"', (user_id,))
+            portfolios = [{"portfolio_id": row[0], "name": row[1], "description": row[2]} for row in cursor.fetchall()]
+            return {"success": True, "portfolios": portfolios}
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred while listing portfolios."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return {"success": False, "message": "Could not connect to the database."}
+
+def get_portfolio(user_id, name):
+    """Returns a portfolio's details together with its stocks."""
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT "portfolio_id", "name", "description" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, name))
+            record = cursor.fetchone()
+            if not record:
+                return {"success": False, "message": "Portfolio not found."}
+            cursor.execute('SELECT "symbol", "shares", "purchase_price", "avg_purchase_price" FROM "Stocks" WHERE "portfolio_id" = %s', (record[0],))
+            stocks = [dict(zip(STOCK_COLUMNS, row)) for row in cursor.fetchall()]
+            portfolio = {"portfolio_id": record[0], "name": record[1], "description": record[2]}
+            return {"success": True, "portfolio": portfolio, "stocks": stocks}
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred while retrieving the portfolio."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return {"success": False, "message": "Could not connect to the database."}
+
+def list_stocks(user_id, portfolio_name):
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('''
+                SELECT s."symbol", s."shares", s."purchase_price", s."avg_purchase_price"
+                FROM "Stocks" s JOIN "Portfolios" p ON p."portfolio_id" = s."portfolio_id"
+                WHERE p."user_id" = %s AND p."name" = %s
+            ''', (user_id, portfolio_name))
+            stocks = [dict(zip(STOCK_COLUMNS, row)) for row in cursor.fetchall()]
+            return {"success": True, "stocks": stocks}
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred while listing stocks."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return {"success": False, "message": "Could not connect to the database."}
+
+def list_user_symbols(user_id):
+    """Returns the distinct stock symbols held across all of a user's portfolios."""
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT DISTINCT "symbol" FROM "Stocks" WHERE "user_id" = %s ORDER BY "symbol"', (user_id,))
+            return {"success": True, "symbols": [row[0] for row in cursor.fetchall()]}
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred while listing stocks."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return {"success": False, "message": "Could not connect to the database."}
+
+def create_portfolio(user_id, name, description=None):
+    if not name:
+        return {"success": False, "message": "Portfolio name is required."}
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        portfolio_id = generate_uuid()
+        try:
+            cursor.execute('''
+                INSERT INTO "Portfolios" ("portfolio_id", "user_id", "name", "description") VALUES (%s, %s, %s, %s)
+                ON CONFLICT ("user_id", "name") DO NOTHING
+                RETURNING "portfolio_id"
+            ''', (portfolio_id, user_id, name, description))
+            if not cursor.fetchone():
+                return {"success": False, "message": "Portfolio name must be unique within the same user."}
+            connection.commit()
+            portfolio_snapshots.invalidate(user_id)
+            return {"success": True, "portfolio_id": portfolio_id, "message": "Portfolio created successfully."}
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred while creating the portfolio."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return {"success": False, "message": "Could not connect to the database."}
+
+def update_portfolio(user_id, name, new_name=None, new_description=None):
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            # The ("user_id", "name") constraint rejects a taken name, so there is no check-then-update race
+            cursor.execute('''
+                UPDATE "Portfolios" SET "name" = COALESCE(%s, "name"), "description" = COALESCE(%s, "description")
+                WHERE "user_id" = %s AND "name" = %s
+            ''', (new_name or None, new_description or None, user_id, name))
+            if cursor.rowcount == 0:
+                return {"success": False, "message": "Portfolio not found."}
+            connection.commit()
+            portfolio_snapshots.invalidate(user_id)
+            return {"success": True, "message": "Portfolio updated successfully."}
+        except UniqueViolation:
+            connection.rollback()
+            return {"success": False, "message": "New portfolio name must be unique within the same user."}
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred while updating the portfolio."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return {"success": False, "message": "Could not connect to the database."}
+
+def delete_portfolio(user_id, name):
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('DELETE FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, name))
+            if cursor.rowcount == 0:
+                return {"success": False, "message": "Portfolio not found."}
+            connection.commit()
+            portfolio_snapshots.invalidate(user_id)
+            return {"success": True, "message": "Portfolio deleted successfully."}
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred while deleting the portfolio."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return {"success": False, "message": "Could not connect to the database."}
+
+def add_stock(user_id, portfolio_name, symbol, shares):
+    """Buys shares at the current market price, adding to the holding if it already exists."""
+    symbol = symbol.strip().upper()
+    if shares <= 0:
+        return {"success": False, "message": "Shares must be a positive integer."}
+    current_price = get_current_stock_price(symbol)
+    if current_price is None:
+        return {"success": False, "message": "Invalid stock symbol. Please try again."}
+
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            # Insert the stock, or add to an existing holding and recompute the average purchase
+            # price in the same statement so concurrent purchases cannot overwrite each other
+            stock_id = generate_uuid()
+            cursor.execute('''
+                INSERT INTO "Stocks" ("stock_id", "user_id", "portfolio_id", "symbol", "shares", "purchase_price", "avg_purchase_price")
+                SELECT %s, %s, "portfolio_id", %s, %s, %s, %s FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s
+                ON CONFLICT ("portfolio_id", "symbol") DO UPDATE SET
+                    "shares" = "Stocks"."shares" + EXCLUDED."shares",
+                    "purchase_price" = EXCLUDED."purchase_price",
+                    "avg_purchase_price" = ("Stocks"."avg_purchase_price" * "Stocks"."shares" + EXCLUDED."purchase_price" * EXCLUDED."shares")
+                                           / ("Stocks"."shares" + EXCLUDED."shares")
+                RETURNING (xmax = 0) AS "inserted"
+            ''', (stock_id, user_id, symbol, shares, current_price, current_price, user_id, portfolio_name))
+            result = cursor.fetchone()
+            if not result:
+                return {"success": False, "message": "Portfolio not found."}
+            connection.commit()
+            portfolio_snapshots.invalidate(user_id)
+            if result[0]:
+                return {"success": True, "updated": False, "price": float(current_price), "message": "Stock added successfully."}
+            return {"success": True, "updated": True, "price": float(current_price), "message": "Stock updated successfully."}
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred while adding the stock."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return {"success": False, "message": "Could not connect to the database."}
+
+def remove_stock(user_id, portfolio_name, symbol, shares):
+    """Sells shares of a holding, deleting it when all shares are removed."""
+    symbol = symbol.strip().upper()
+    if shares <= 0:
+        return {"success": False, "message": "Number of shares to delete must be a positive integer."}
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('''
+                SELECT s."stock_id", s."shares"
+                FROM "Stocks" s JOIN "Portfolios" p ON p."portfolio_id" = s."portfolio_id"
+                WHERE p."user_id" = %s AND p."name" = %s AND s."symbol" = %s
+                FOR UPDATE OF s
+            ''', (user_id, portfolio_name, symbol))
+            stock = cursor.fetchone()
+            if not stock:
+                return {"success": False, "message": "Stock not found in this portfolio."}
+            stock_id, current_shares = stock
+            if shares > current_shares:
+                return {"success": False, "message": "Cannot delete more shares than currently owned."}
+            if shares < current_shares:
+                cursor.execute('UPDATE "Stocks" SET "shares" = "shares" - %s WHERE "stock_id" = %s', (shares, stock_id))
+                message = f"{shares} shares deleted successfully."
+            else:
+                cursor.execute('DELETE FROM "Stocks" WHERE "stock_id" = %s', (stock_id,))
+                message = "Stock deleted successfully."
+            connection.commit()
+            portfolio_snapshots.invalidate(user_id)
+            return {"success": True, "remaining_shares": current_shares - shares, "message": message}
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred while deleting the stock."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+    return {"success": False, "message": "Could not connect to the database."}
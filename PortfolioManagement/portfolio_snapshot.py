@@ -0,0 +1,164 @@
+import itertools
+import os
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from dotenv import load_dotenv
+from cache import TTLCache
+from PortfolioManagement.stock_price import get_sectors
+from PortfolioManagement.valuation import value_portfolios
+
+load_dotenv()
+
+PORTFOLIO_SNAPSHOT_TTL = float(os.getenv('PORTFOLIO_SNAPSHOT_TTL', 300))  # Seconds a user's snapshot is reused before it is rebuilt
+PORTFOLIO_SNAPSHOT_SIZE = int(os.getenv('PORTFOLIO_SNAPSHOT_SIZE', 1024))  # Users whose snapshots are kept in memory
+SNAPSHOT_LOCK_STRIPES = 64  # Users share this many build locks, so the locks don't grow with the number of users
+
+_versions = itertools.count(1)
+
+def _number(value):
+    """Rounds for display and turns NaN (unpriced holdings) into None, so snapshots serialize to JSON."""
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+def _totals(market_value, cost_basis, total_value, holdings, unpriced):
+    pnl = market_value - cost_basis
+    return {
+        "market_value": _number(market_value),
+        "cost_basis": _number(cost_basis),
+        "unrealized_pnl": _number(pnl),
+        "pnl_pct": _number(pnl / cost_basis * 100) if cost_basis else None,
+        "weight_pct": _number(market_value / total_value * 100) if total_value else None,
+        "holdings": int(holdings),
+        "unpriced_holdings": int(unpriced)
+    }
+
+def _sector_weights(valuation, total_value):
+    priced = valuation[valuation["current_price"].notna()]
+    sectors = []
+    for sector, rows in priced.groupby("sector"):
+        market_value = rows["market_value"].sum()
+        sectors.append({
+            "sector": sector,
+            "market_value": _number(market_value),
+            "weight_pct": _number(market_value / total_value * 100) if total_value else None,
+            "symbols": sorted(rows["symbol"].unique())
+        })
+    return sorted(sectors, key=lambda sector: -(sector["market_value"] or 0))
+
+def snapshot_from_valuation(user_id, valuation, sectors):
+    """
+    Builds a snapshot from a value_portfolios DataFrame and a {symbol: sector} dict: totals,
+    per-portfolio totals and holdings, and sector weights overall and per portfolio. Values
+    are rounded and plain Python types, so tool results can be sent to the model as they are.
+    """
+    valuation = valuation.assign(sector=[sectors.get(symbol, "Unknown") for symbol in valuation["symbol"]])
+    priced = valuation["current_price"].notna()
+    total_value = float(valuation["market_value"].where(priced, 0).sum())
+    total_cost = float(valuation["cost_basis"].where(priced, 0).sum())
+
+    portfolios = []
+    for name, rows in valuation.groupby("portfolio_name", sort=True):
+        rows_priced = rows["current_price"].notna()
+        market_value = float(rows["market_value"].where(rows_priced, 0).sum())
+        cost_basis = float(rows["cost_basis"].where(rows_priced, 0).sum())
+        portfolio = {"name": name}
+        portfolio.update(_totals(market_value, cost_basis, total_value, len(rows), (~rows_priced).sum()))
+        portfolio["sectors"] = _sector_weights(rows, market_value)
+        portfolio["positions"] = [{
+            "symbol": row.symbol,
+            "sector": row.sector,
+            "shares": _number(row.shares),
+            "avg_purchase_price": _number(row.avg_purchase_price),
+            "current_price": _number(row.current_price),
+            "market_value": _number(row.market_value),
+            "unrealized_pnl": _number(row.unrealized_pnl),
+            "pnl_pct": _number(row.pnl_pct),
+            "portfolio_weight_pct": _number(row.weight * 100),
+            "total_weight_pct": _number(row.market_value / total_value * 100) if total_value else None
+        } for row in rows.itertuples()]
+        portfolios.append(portfolio)
+
+    return {
+        "user_id": user_id,
+        "version": next(_versions),
+        "as_of": datetime.now().isoformat(timespec="seconds"),
+        "total": _totals(total_value, total_cost, total_value, len(valuation), (~priced).sum()),
+        "sectors": _sector_weights(valuation, total_value),
+        "portfolios": portfolios
+    }
+
+def build_snapshot(user_id):
+    """Values a user's holdings with one query and one batch quote request, and adds their sectors."""
+    valuation = value_portfolios(user_id)
+    return snapshot_from_valuation(user_id, valuation, get_sectors(valuation["symbol"]))
+
+class PortfolioSnapshots:
+    """
+    Per-user portfolio snapshots, built on first use and reused for PORTFOLIO_SNAPSHOT_TTL, so
+    repeated questions about the same holdings cost one cache read. Writes to a user's
+    portfolios call invalidate(); concurrent requests for a missing snapshot build it once.
+    A build that was running when invalidate() was called is returned to its caller but not
+    cached, as it may predate the write. Invalidation only reaches this process: a write made
+    by another instance of the app shows up once the snapshot expires, after at most `ttl`.
+    Each snapshot has a new `version`, which callers can use to scope anything derived from it.
+    """
+    def __init__(self, ttl=PORTFOLIO_SNAPSHOT_TTL, maxsize=PORTFOLIO_SNAPSHOT_SIZE, build=build_snapshot):
+        self.build = build
+        self.builds = 0
+        self.build_seconds = 0.0
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._locks = [threading.Lock() for _ in range(SNAPSHOT_LOCK_STRIPES)]
+        self._locks_lock = threading.Lock()
+        # Bumped by invalidate() for the user's stripe, so builds started before it are not cached. A user
+        # sharing the stripe only costs a build that is not cached.
+        self._generations = [0] * SNAPSHOT_LOCK_STRIPES
+        self._epoch = 0  # Bumped by clear()
+
+    def _stripe(self, user_id):
+        return hash(user_id) % SNAPSHOT_LOCK_STRIPES
+
+    def _generation(self, user_id):
+        with self._locks_lock:
+            return self._epoch, self._generations[self._stripe(user_id)]
+
+    def get(self, user_id):
+        snapshot = self._cache.get(user_id)
+        if snapshot is not None:
+            return snapshot
+        with self._locks[self._stripe(user_id)]:
+            snapshot = self._cache.get(user_id)
+            if snapshot is None:
+                generation = self._generation(user_id)
+                started = time.perf_counter()
+                snapshot = self.build(user_id)
+                self.build_seconds += time.perf_counter() - started
+                self.builds += 1
+                with self._locks_lock:
+                    if (self._epoch, self._generations[self._stripe(user_id)]) == generation:
+                        self._cache.set(user_id, snapshot)
+            return snapshot
+
+    def warm(self, user_id):
+        """Builds the user's snapshot on a background thread, e.g. right after login."""
+        thread = threading.Thread(target=self.get, args=(user_id,), name="portfolio-snapshot", daemon=True)
+        thread.start()
+        return thread
+
+    def invalidate(self, user_id):
+        with self._locks_lock:
+            self._generations[self._stripe(user_id)] += 1
+            self._cache.delete(user_id)
+
+    def clear(self):
+        with self._locks_lock:
+            self._epoch += 1
+            self._cache.clear()
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats["builds"] = self.builds
+        stats["build_seconds"] = self.build_seconds
+        return stats
+
+portfolio_snapshots = PortfolioSnapshots()
@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+from cache import TTLCache
+
+load_dotenv()
+
+QUOTE_CACHE_SIZE = int(os.getenv('QUOTE_CACHE_SIZE', 4096))
+QUOTE_CACHE_TTL = float(os.getenv('QUOTE_CACHE_TTL', 60))  # Seconds a quote is served without refetching
+QUOTE_CACHE_PATH = os.getenv('QUOTE_CACHE_PATH')  # Optional SQLite file so quotes survive restarts
+
+class SQLiteQuoteStore:
+    """On-disk quote tier backed by a single SQLite table."""
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS quotes (symbol TEXT PRIMARY KEY, price REAL NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self._connection.commit()
+
+    def get(self, symbol):
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT price, expires_at FROM quotes WHERE symbol = ?', (symbol,)
+            ).fetchone()
+        if row and row[1] > time.time():
+            return row[0], row[1] - time.time()
+        return None
+
+    def set(self, symbol, price, ttl):
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO quotes (symbol, price, expires_at) VALUES (?, ?, ?)',
+                (symbol, float(price), time.time() + ttl)
+            )
+            self._connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute('DELETE FROM quotes')
+            self._connection.commit()
+
+class QuoteCache:
+    """
+    Two-tier quote cache: an in-process LRU with per-symbol TTLs in front of an
+    optional on-disk store. Disk hits are promoted into memory for their remaining TTL.
+    """
+    def __init__(self, maxsize=QUOTE_CACHE_SIZE, ttl=QUOTE_CACHE_TTL, path=QUOTE_CACHE_PATH, symbol_ttls=None):
+        self.ttl = ttl
+        self.symbol_ttls = {symbol.upper(): value for symbol, value in (symbol_ttls or {}).items()}
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk = SQLiteQuoteStore(path) if path else None
+        self.disk_hits = 0
+
+    def ttl_for(self, symbol):
+        return self.symbol_ttls.get(symbol.upper(), self.ttl)
+
+    def set_ttl(self, symbol, ttl):
+        self.symbol_ttls[symbol.upper()] = ttl
+
+    def get(self, symbol):
+        symbol = symbol.upper()
+        price = self.memory.get(symbol)
+        if price is not None or self.disk is None:
+            return price
+        cached = self.disk.get(symbol)
+        if cached is None:
+            return None
+        price, remaining = cached
+        self.disk_hits += 1
+        self.memory.set(symbol, price, ttl=remaining)
+        return price
+
+    def set(self, symbol, price):
+        symbol = symbol.upper()
+        ttl = self.ttl_for(symbol)
+        self.memory.set(symbol, price, ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(symbol, price, ttl)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["misses"] -= self.disk_hits
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
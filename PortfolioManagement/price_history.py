@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+from datetime import date
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PRICE_HISTORY_DIR = os.path.expanduser(os.getenv('PRICE_HISTORY_DIR', '~/.portfolio_tracker/price_history'))
+
+# One fixed-size record per trading day; files are append-only and read through np.memmap
+RECORD_DTYPE = np.dtype([('date', '<i8'), ('close', '<f8'), ('adj_close', '<f8'), ('volume', '<f8')])
+FIELDS = ('close', 'adj_close', 'volume')
+
+_lock = threading.Lock()
+
+def _data_path(symbol):
+    return os.path.join(PRICE_HISTORY_DIR, f"{symbol}.bin")
+
+def _meta_path(symbol):
+    return os.path.join(PRICE_HISTORY_DIR, f"{symbol}.json")
+
+def _read_meta(symbol):
+    try:
+        with open(_meta_path(symbol)) as f:
+            meta = json.load(f)
+        return date.fromisoformat(meta["start"]), date.fromisoformat(meta["fetched_through"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_meta(symbol, start, fetched_through):
+    with open(_meta_path(symbol), 'w') as f:
+        json.dump({"start": start.isoformat(), "fetched_through": fetched_through.isoformat()}, f)
+
+def _read_records(symbol):
+    path = _data_path(symbol)
+    if not os.path.exists(path) or os.path.getsize(path) < RECORD_DTYPE.itemsize:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r')
+
+def _to_records(frame):
+    """Converts a yfinance frame with Close/Adj Close/Volume columns to store records."""
+    if 'Close' not in frame:  # Failed downloads can come back without any columns
+        return np.empty(0, dtype=RECORD_DTYPE)
+    frame = frame.dropna(subset=['Close'])
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    records = np.empty(len(frame), dtype=RECORD_DTYPE)
+    records['date'] = index.values.astype('datetime64[D]').astype(np.int64)
+    records['close'] = frame['Close'].to_numpy(dtype=float)
+    records['adj_close'] = frame['Adj Close'].to_numpy(dtype=float) if 'Adj Close' in frame else records['close']
+    records['volume'] = frame['Volume'].to_numpy(dtype=float) if 'Volume' in frame else np.nan
+    return records
+
+def _download(symbols, start, end):
+    """Downloads daily history for several symbols over [start, end) in one request."""
+    data = yf.download(symbols, start=start.isoformat(), end=end.isoformat(), group_by="column",
+                       auto_adjust=False, progress=False, threads=True)
+    frames = {}
+    for symbol in symbols:
+        if data.empty:
+            frames[symbol] = data
+        elif isinstance(data.columns, pd.MultiIndex):
+            frames[symbol] = data.xs(symbol, axis=1, level=1)
+        else:
+            frames[symbol] = data
+    return frames
+
+def update_history(symbols, start, end):
+    """
+    Makes sure the local store holds daily history for every symbol over [start, end).
+    Only the missing date ranges are downloaded; symbols needing the same range share a
+    single multi-ticker request. New days are appended to the symbol's file.
+    """
+    start = pd.Timestamp(start).date()
+    end = min(pd.Timestamp(end).date(), date.today())
+    os.makedirs(PRICE_HISTORY_DIR, exist_ok=True)
+
+    with _lock:
+        # Group symbols by the date range their download has to cover
+        fetches = {}
+        for symbol in dict.fromkeys(symbol.upper() for symbol in symbols):
+            meta = _read_meta(symbol)
+            if meta is None:
+                fetches.setdefault((start, end, True), []).append(symbol)
+            elif start < meta[0]:
+                # The request reaches further back than the file, so it is rebuilt from scratch
+                fetches.setdefault((start, max(end, meta[1]), True), []).append(symbol)
+            elif end > meta[1]:
+                fetches.setdefault((meta[1], end, False), []).append(symbol)
+
+        for (fetch_start, fetch_end, rebuild), group in fetches.items():
+            if fetch_start >= fetch_end:
+                continue
+            frames = _download(group, fetch_start, fetch_end)
+            for symbol in group:
+                records = _to_records(frames[symbol])
+                if not len(records):
+                    if not rebuild and not len(pd.bdate_range(fetch_start, fetch_end, inclusive="left")):
+                        # A weekend has no trading days: record it as fetched so the same range is not
+                        # downloaded again on every run. An empty weekday range may be a failed download,
+                        # so it is left to be retried.
+                        _write_meta(symbol, _read_meta(symbol)[0], fetch_end)
+                    continue
+                if rebuild:
+                    with open(_data_path(symbol), 'wb') as f:
+                        f.write(records.tobytes())
+                    _write_meta(symbol, fetch_start, fetch_end)
+                else:
+                    existing = _read_records(symbol)
+                    if len(existing):
+                        records = records[records['date'] > existing['date'][-1]]
+                    del existing
+                    with open(_data_path(symbol), 'ab') as f:
+                        f.write(records.tobytes())
+                    _write_meta(symbol, _read_meta(symbol)[0], fetch_end)
+
+def load_history(symbol, start, end, update=True):
+    """Returns daily close/adj_close/volume for a symbol over [start, end), indexed by date."""
+    symbol = symbol.upper()
+    if update:
+        update_history([symbol], start, end)
+    records = _read_records(symbol)
+    first = np.datetime64(pd.Timestamp(start).date(), 'D').astype(np.int64)
+    last = np.datetime64(pd.Timestamp(end).date(), 'D').astype(np.int64)
+    # Dates are stored in ascending order, so the window is a contiguous slice
+    lo, hi = np.searchsorted(records['date'], [first, last])
+    window = records[lo:hi]
+    index = pd.DatetimeIndex(window['date'].astype('datetime64[D]'), name='Date')
+    return pd.DataFrame({field: np.array(window[field]) for field in FIELDS}, index=index)
+
+def get_price_matrix(symbols, start, end, field='adj_close'):
+    """Returns one column of `field` per symbol over [start, end), aligned on trading dates."""
+    update_history(symbols, start, end)
+    columns = {symbol: load_history(symbol, start, end, update=False)[field] for symbol in symbols}
+    return pd.DataFrame(columns)
@@ -1,10 +1,144 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
 import yfinance as yf
+from cache import TTLCache
+from PortfolioManagement.price_cache import QuoteCache
+
+QUOTE_BATCH_SIZE = int(os.getenv('QUOTE_BATCH_SIZE', 100))  # Symbols per multi-ticker download
+SECTOR_CACHE_TTL = float(os.getenv('SECTOR_CACHE_TTL', 7 * 86400))  # Sectors rarely change, so they are kept for a week
+SECTOR_FETCH_WORKERS = 8
+
+_quote_cache = QuoteCache()
+_sector_cache = TTLCache(maxsize=16384, ttl=SECTOR_CACHE_TTL)
+_price_listeners = []
+
+def set_quote_cache(cache):
+    """Replaces the quote cache used by the price lookups. Pass None to disable caching."""
+    global _quote_cache
+    _quote_cache = cache
+
+def get_quote_cache():
+    return _quote_cache
+
+def add_price_listener(listener):
+    """Registers a callable that receives a {symbol: price} dict whenever fresh quotes are fetched."""
+    _price_listeners.append(listener)
+
+def remove_price_listener(listener):
+    if listener in _price_listeners:
+        _price_listeners.remove(listener)
+
+def publish_prices(prices):
+    """Passes freshly fetched quotes to every registered listener."""
+    if not prices:
+        return
+    for listener in list(_price_listeners):
+        try:
+            listener(prices)
+        except Exception as e:
+            print(f"Error in price listener: {e}")
 
 def get_current_stock_price(symbol):
+    if _quote_cache is not None:
+        cached_price = _quote_cache.get(symbol)
+        if cached_price is not None:
+            return cached_price
     try:
         stock = yf.Ticker(symbol)
         current_price = stock.history(period="1d")['Close'].iloc[0]
+        if _quote_cache is not None:
+            _quote_cache.set(symbol, current_price)
+        publish_prices({symbol.upper(): float(current_price)})
         return current_price
     except Exception as e:
         print(f"Error retrieving stock price for {symbol}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def _download_latest_closes(symbols):
+    """Fetches the latest close for a chunk of symbols in a single multi-ticker download."""
+    # A few days of history so symbols on exchanges that are closed today still have a last close
+    data = yf.download(symbols, period="5d", group_by="column", auto_adjust=False, progress=False, threads=True)
+    if data.empty:
+        return pd.Series(dtype=float)
+    if isinstance(data.columns, pd.MultiIndex):
+        closes = data['Close']
+    else:
+        closes = data[['Close']].set_axis(symbols, axis=1)
+    return closes.ffill().iloc[-1]
+
+def get_current_prices(symbols):
+    """
+    Prices many symbols with as few network round trips as possible.
+    Symbols are deduplicated, served from the quote cache where possible and the rest
+    are downloaded in chunks of QUOTE_BATCH_SIZE. Returns a float array aligned with
+    the input (NaN where no price was found) and a dict of failed symbols to reasons.
+    """
+    normalized = [symbol.strip().upper() for symbol in symbols]
+    prices = {}
+    failures = {}
+
+    missing = []
+    for symbol in dict.fromkeys(normalized):
+        cached_price = _quote_cache.get(symbol) if _quote_cache is not None else None
+        if cached_price is not None:
+            prices[symbol] = cached_price
+        else:
+            missing.append(symbol)
+
+    fetched = {}
+    for start in range(0, len(missing), QUOTE_BATCH_SIZE):
+        chunk = missing[start:start + QUOTE_BATCH_SIZE]
+        try:
+            closes = _download_latest_closes(chunk)
+        except Exception as e:
+            for symbol in chunk:
+                failures[symbol] = str(e)
+            continue
+        for symbol in chunk:
+            price = closes.get(symbol)
+            if price is None or pd.isna(price):
+                failures[symbol] = "No price data found."
+                continue
+            prices[symbol] = fetched[symbol] = float(price)
+            if _quote_cache is not None:
+                _quote_cache.set(symbol, prices[symbol])
+    publish_prices(fetched)
+
+    return np.array([prices.get(symbol, np.nan) for symbol in normalized], dtype=float), failures
+
+def _fetch_sector(symbol):
+    try:
+        info = yf.Ticker(symbol).info
+    except Exception as e:
+        print(f"Error retrieving sector for {symbol}: {e}")
+        return None
+    if info.get('sector'):
+        return info['sector']
+    if info.get('quoteType') in ('ETF', 'MUTUALFUND'):
+        return "Funds"
+    return "Unknown"
+
+def get_sectors(symbols):
+    """
+    Returns a {symbol: sector} dict. Sectors are cached for SECTOR_CACHE_TTL and the
+    missing ones are looked up concurrently; symbols whose lookup failed map to "Unknown"
+    and are retried next time.
+    """
+    normalized = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols))
+    sectors = {}
+    missing = []
+    for symbol in normalized:
+        sector = _sector_cache.get(symbol)
+        if sector is not None:
+            sectors[symbol] = sector
+        else:
+            missing.append(symbol)
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(SECTOR_FETCH_WORKERS, len(missing))) as executor:
+            for symbol, sector in zip(missing, executor.map(_fetch_sector, missing)):
+                if sector is not None:
+                    _sector_cache.set(symbol, sector)
+                sectors[symbol] = sector or "Unknown"
+    return sectors
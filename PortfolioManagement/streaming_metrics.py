@@ -0,0 +1,154 @@
+import os
+import threading
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from PortfolioManagement.analytics import TRADING_DAYS
+from PortfolioManagement.stock_price import add_price_listener, remove_price_listener
+from PortfolioManagement.valuation import load_holdings
+
+load_dotenv()
+
+EWMA_LAMBDA = float(os.getenv('EWMA_LAMBDA', 0.94))  # RiskMetrics decay factor for EWMA volatility
+
+class PortfolioMetricsState:
+    """
+    Running statistics for one portfolio, updated one observation at a time.
+    Returns use Welford's running mean/variance, drawdown a running peak, and volatility
+    an exponentially weighted moving average of squared returns.
+    """
+    def __init__(self, symbols, shares, ewma_lambda=EWMA_LAMBDA, name=None):
+        symbols = list(symbols)
+        self.name = name
+        self.symbols = list(dict.fromkeys(symbols))
+        self._position = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.shares = np.zeros(len(self.symbols))
+        np.add.at(self.shares, [self._position[symbol] for symbol in symbols], np.asarray(shares, dtype=float))
+        self.prices = np.full(len(self.symbols), np.nan)
+        self._fresh = np.zeros(len(self.symbols), dtype=bool)
+        self._stale = len(self.symbols)
+        self.ewma_lambda = ewma_lambda
+        self.value = None
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma_variance = None
+        self.peak = None
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+
+    def update_prices(self, prices):
+        """
+        Applies a {symbol: price} tick, costing O(symbols in the tick). One return observation
+        is recorded each time every holding has received a fresh price since the previous one,
+        so quotes published one symbol at a time make up a single period between them rather
+        than a period each. Returns the new value when an observation was recorded, else None.
+        """
+        for symbol, price in prices.items():
+            index = self._position.get(symbol)
+            if index is None:
+                continue
+            self.prices[index] = price
+            if not self._fresh[index]:
+                self._fresh[index] = True
+                self._stale -= 1
+        if self._stale or not self.symbols:
+            return None
+        # O(holdings), once per completed round of prices
+        value = float(self.shares @ self.prices)
+        self._fresh[:] = False
+        self._stale = len(self.symbols)
+        self.observe_value(value)
+        return value
+
+    def observe_value(self, value):
+        if self.value is not None and self.value > 0:
+            period_return = value / self.value - 1
+            self.count += 1
+            delta = period_return - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (period_return - self.mean)
+            squared = period_return * period_return
+            if self.ewma_variance is None:
+                self.ewma_variance = squared
+            else:
+                self.ewma_variance = self.ewma_lambda * self.ewma_variance + (1 - self.ewma_lambda) * squared
+        self.value = value
+        self.peak = value if self.peak is None else max(self.peak, value)
+        self.drawdown = value / self.peak - 1 if self.peak > 0 else 0.0
+        self.max_drawdown = min(self.max_drawdown, self.drawdown)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    def snapshot(self, periods_per_year=TRADING_DAYS):
+        volatility = np.sqrt(self.variance)
+        return {
+            "name": self.name,
+            "value": self.value,
+            "observations": self.count,
+            "mean_return": self.mean if self.count else np.nan,
+            "volatility": volatility,
+            "annualized_volatility": volatility * np.sqrt(periods_per_year),
+            "ewma_volatility": np.sqrt(self.ewma_variance) if self.ewma_variance is not None else np.nan,
+            "drawdown": self.drawdown,
+            "max_drawdown": self.max_drawdown
+        }
+
+class StreamingMetrics:
+    """
+    Keeps a PortfolioMetricsState per portfolio and routes price ticks to the portfolios
+    holding the ticked symbols. attach() subscribes it to quotes fetched by stock_price.
+    """
+    def __init__(self, ewma_lambda=EWMA_LAMBDA):
+        self.ewma_lambda = ewma_lambda
+        self.portfolios = {}
+        self._holders = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def add_portfolio(self, portfolio_id, symbols, shares, name=None):
+        """Starts tracking a portfolio, replacing any state kept for it, e.g. after its holdings changed."""
+        with self._lock:
+            previous = self.portfolios.get(portfolio_id)
+            if previous is not None:
+                for symbol in previous.symbols:
+                    self._holders[symbol].discard(portfolio_id)
+            self.portfolios[portfolio_id] = PortfolioMetricsState(symbols, shares, self.ewma_lambda, name)
+            for symbol in symbols:
+                self._holders[symbol].add(portfolio_id)
+
+    def load(self, user_id=None):
+        """Creates state for every portfolio of a user (or all users) from the Stocks table."""
+        holdings = load_holdings(user_id)
+        frame = pd.DataFrame({
+            "portfolio_id": holdings["portfolio_id"],
+            "portfolio_name": holdings["portfolio_name"],
+            "symbol": holdings["symbol"],
+            "shares": holdings["shares"]
+        })
+        for portfolio_id, group in frame.groupby("portfolio_id", sort=False):
+            self.add_portfolio(portfolio_id, list(group["symbol"]), group["shares"].to_numpy(), group["portfolio_name"].iloc[0])
+        return self
+
+    def on_prices(self, prices):
+        # Split the tick by holder first, so each portfolio sees only the symbols it holds
+        ticks = defaultdict(dict)
+        with self._lock:
+            for symbol, price in prices.items():
+                for portfolio_id in self._holders.get(symbol, ()):
+                    ticks[portfolio_id][symbol] = price
+            for portfolio_id, tick in ticks.items():
+                self.portfolios[portfolio_id].update_prices(tick)
+
+    def attach(self):
+        add_price_listener(self.on_prices)
+
+    def detach(self):
+        remove_price_listener(self.on_prices)
+
+    def snapshot(self):
+        with self._lock:
+            rows = {portfolio_id: state.snapshot() for portfolio_id, state in self.portfolios.items()}
+        return pd.DataFrame.from_dict(rows, orient="index").rename_axis("portfolio_id")
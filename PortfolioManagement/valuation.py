@@ -0,0 +1,160 @@
+import time
+import numpy as np
+import pandas as pd
+from psycopg2 import Error
+from database import create_connection, close_connection
+from PortfolioManagement.stock_price import get_current_prices
+
+HOLDING_COLUMNS = ["user_id", "portfolio_id", "portfolio_name", "symbol", "shares", "avg_purchase_price"]
+
+def load_holdings(user_id=None, portfolio_id=None):
+    """
+    Loads holdings into column arrays with a single query.
+    Filters by user and/or portfolio; with neither, loads every holding in the database.
+    """
+    query = ('SELECT p."user_id", p."portfolio_id", p."name", s."symbol", s."shares", s."avg_purchase_price" '
+             'FROM "Stocks" s JOIN "Portfolios" p ON p."portfolio_id" = s."portfolio_id"')
+    conditions, params = [], []
+    if user_id is not None:
+        conditions.append('s."user_id" = %s')
+        params.append(user_id)
+    if portfolio_id is not None:
+        conditions.append('s."portfolio_id" = %s')
+        params.append(portfolio_id)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY p."portfolio_id", s."symbol"'
+
+    rows = []
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        except Error as e:
+            print(f"Database Error: {e}")
+        finally:
+            cursor.close()
+            close_connection(connection)
+
+    columns = list(zip(*rows)) if rows else [()] * len(HOLDING_COLUMNS)
+    holdings = {name: np.array(values, dtype=object) for name, values in zip(HOLDING_COLUMNS, columns)}
+    holdings["shares"] = holdings["shares"].astype(float)
+    holdings["avg_purchase_price"] = holdings["avg_purchase_price"].astype(float)
+    return holdings
+
+def portfolio_holdings(portfolio, stocks):
+    """Builds load_holdings column arrays from a get_portfolio result, so it can be valued without querying again."""
+    holdings = {name: np.array([stock[name] for stock in stocks], dtype=object) for name in ("symbol", "shares", "avg_purchase_price")}
+    holdings["user_id"] = np.full(len(stocks), None, dtype=object)
+    holdings["portfolio_id"] = np.full(len(stocks), portfolio["portfolio_id"], dtype=object)
+    holdings["portfolio_name"] = np.full(len(stocks), portfolio["name"], dtype=object)
+    holdings["shares"] = holdings["shares"].astype(float)
+    holdings["avg_purchase_price"] = holdings["avg_purchase_price"].astype(float)
+    return holdings
+
+def value_holdings(portfolio_ids, symbols, shares, avg_prices, prices):
+    """
+    Values every holding and every portfolio in one vectorized pass.
+    All arguments are equal-length arrays, one element per holding; prices may contain
+    NaN for symbols that could not be priced, which are left out of portfolio totals.
+    Returns a DataFrame with one row per holding.
+    """
+    shares = np.asarray(shares, dtype=float)
+    avg_prices = np.asarray(avg_prices, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    _, portfolio_index = np.unique(np.asarray(portfolio_ids), return_inverse=True)
+
+    market_value = shares * prices
+    cost_basis = shares * avg_prices
+    unrealized_pnl = market_value - cost_basis
+    pnl_pct = np.full_like(unrealized_pnl, np.nan)
+    np.divide(unrealized_pnl, cost_basis, out=pnl_pct, where=cost_basis != 0)
+    pnl_pct *= 100
+
+    portfolio_value = np.bincount(portfolio_index, weights=np.nan_to_num(market_value))
+    holding_portfolio_value = portfolio_value[portfolio_index]
+    weight = np.full_like(market_value, np.nan)
+    np.divide(market_value, holding_portfolio_value, out=weight, where=holding_portfolio_value != 0)
+
+    return pd.DataFrame({
+        "portfolio_id": portfolio_ids,
+        "symbol": symbols,
+        "shares": shares,
+        "avg_purchase_price": avg_prices,
+        "current_price": prices,
+        "market_value": market_value,
+        "cost_basis": cost_basis,
+        "unrealized_pnl": unrealized_pnl,
+        "pnl_pct": pnl_pct,
+        "weight": weight,
+        "portfolio_value": holding_portfolio_value
+    })
+
+def portfolio_totals(valuation):
+    """Aggregates a value_holdings DataFrame into one row per portfolio."""
+    portfolio_ids, portfolio_index = np.unique(valuation["portfolio_id"].to_numpy(), return_inverse=True)
+    priced = ~np.isnan(valuation["current_price"].to_numpy())
+    market_value = np.bincount(portfolio_index, weights=np.nan_to_num(valuation["market_value"].to_numpy()))
+    # Cost basis only counts priced holdings so that P&L compares like with like
+    cost_basis = np.bincount(portfolio_index, weights=np.where(priced, valuation["cost_basis"].to_numpy(), 0))
+    unrealized_pnl = market_value - cost_basis
+    pnl_pct = np.full_like(unrealized_pnl, np.nan)
+    np.divide(unrealized_pnl, cost_basis, out=pnl_pct, where=cost_basis != 0)
+    return pd.DataFrame({
+        "market_value": market_value,
+        "cost_basis": cost_basis,
+        "unrealized_pnl": unrealized_pnl,
+        "pnl_pct": pnl_pct * 100,
+        "holdings": np.bincount(portfolio_index),
+        "unpriced_holdings": np.bincount(portfolio_index, weights=~priced).astype(int)
+    }, index=pd.Index(portfolio_ids, name="portfolio_id"))
+
+def value_portfolios(user_id=None, portfolio_id=None, holdings=None):
+    """
+    Loads holdings, prices them with one batch quote request and returns the per-holding
+    valuation DataFrame, including the portfolio name. Holdings that were already loaded,
+    e.g. with portfolio_holdings, can be passed instead of querying them again.
+    """
+    if holdings is None:
+        holdings = load_holdings(user_id, portfolio_id)
+    prices, failures = get_current_prices(list(holdings["symbol"]))
+    for symbol, reason in failures.items():
+        print(f"Error retrieving stock price for {symbol}: {reason}")
+    valuation = value_holdings(holdings["portfolio_id"], holdings["symbol"], holdings["shares"],
+                               holdings["avg_purchase_price"], prices)
+    valuation.insert(1, "portfolio_name", holdings["portfolio_name"])
+    return valuation
+
+def benchmark(n_holdings=100_000, n_portfolios=5_000, n_symbols=3_000):
+    """Times the vectorized valuation against a row-by-row loop on synthetic holdings."""
+    rng = np.random.default_rng(0)
+    portfolio_ids = rng.integers(0, n_portfolios, n_holdings)
+    symbol_index = rng.integers(0, n_symbols, n_holdings)
+    symbols = np.array([f"S{i}" for i in range(n_symbols)], dtype=object)[symbol_index]
+    shares = rng.integers(1, 1_000, n_holdings).astype(float)
+    avg_prices = rng.uniform(5, 500, n_holdings)
+    prices = rng.uniform(5, 500, n_symbols)[symbol_index]
+
+    start = time.perf_counter()
+    totals = {}
+    rows = []
+    for pid, symbol, qty, avg, price in zip(portfolio_ids, symbols, shares, avg_prices, prices):
+        value = qty * price
+        rows.append((pid, symbol, value, value - qty * avg))
+        totals[pid] = totals.get(pid, 0.0) + value
+    rows = [(pid, symbol, value, pnl, value / totals[pid]) for pid, symbol, value, pnl in rows]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    valuation = value_holdings(portfolio_ids, symbols, shares, avg_prices, prices)
+    portfolio_totals(valuation)
+    vectorized_seconds = time.perf_counter() - start
+
+    print(f"{n_holdings} holdings across {n_portfolios} portfolios")
+    print(f"Row-by-row: {loop_seconds * 1000:.1f} ms")
+    print(f"Vectorized: {vectorized_seconds * 1000:.1f} ms ({loop_seconds / vectorized_seconds:.1f}x faster)")
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,20 +1,27 @@
 # auth.py
-import bcrypt
 from psycopg2 import Error
-from database import create_connection, close_connection
+from psycopg2.extras import execute_values
+from database import create_connection, close_connection, WriteBehindBuffer
 from datetime import datetime
+from Registration.hashing import hash_password, verify_password, needs_rehash
 
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def _write_last_logins(cursor, rows):
+    # GREATEST keeps a newer login already written by another process
+    execute_values(cursor, '''
+        UPDATE "Users" AS u SET "last_login" = GREATEST(u."last_login", v."last_login")
+        FROM (VALUES %s) AS v("user_id", "last_login")
+        WHERE u."user_id" = v."user_id"
+    ''', rows, template='(%s::int, %s::timestamp)', page_size=len(rows))
 
-def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+# last_login updates are buffered and written in batches instead of one UPDATE per login
+last_login_writes = WriteBehindBuffer("last_login", _write_last_logins, key=lambda row: row[0])
 
 def register_user(username, email, password):
+    # Hash before taking a pooled connection so it is not held during bcrypt
+    hashed_password = hash_password(password)
     connection = create_connection()
     if connection:
         cursor = connection.cursor()
-        hashed_password = hash_password(password)
         try:
             cursor.execute('SELECT "user_id" FROM "Users" WHERE "username" = %s', (username,))
             if cursor.fetchone():
@@ -45,23 +52,44 @@ def authenticate_user(username, password):
         try:
             cursor.execute('SELECT "user_id", "password_hash" FROM "Users" WHERE "username" = %s', (username,))
             record = cursor.fetchone()
-            if not record or not verify_password(password, record[1]):
-                return {"success": False, "message": "Invalid username or password."}
-            
+        except Error as e:
+            print(f"Database Error: {e}")
+            return {"success": False, "message": "An error occurred during authentication."}
+        finally:
+            cursor.close()
+            close_connection(connection)
+
+        # Release the pooled connection before bcrypt runs
+        if not record or not verify_password(password, record[1]):
+            return {"success": False, "message": "Invalid username or password."}
+
+        last_login_writes.add((record[0], datetime.now()))
+        # Upgrade hashes made with a different BCRYPT_ROUNDS while the plain password is at hand
+        if needs_rehash(record[1]):
+            _rehash_password(record[0], record[1], hash_password(password))
+        return {"success": True, "user_id": record[0]}
+
+def _rehash_password(user_id, old_hash, new_hash):
+    """Stores an upgraded hash unless the password was changed since old_hash was read."""
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
             cursor.execute(
-                'UPDATE "Users" SET "last_login" = %s WHERE "user_id" = %s',
-                (datetime.now(), record[0])
+                'UPDATE "Users" SET "password_hash" = %s WHERE "user_id" = %s AND "password_hash" = %s',
+                (new_hash, user_id, old_hash)
             )
             connection.commit()
-            return {"success": True, "user_id": record[0]}
         except Error as e:
+            # The old hash still verifies, so a failed upgrade is retried on the next login
             print(f"Database Error: {e}")
-            return {"success": False, "message": "An error occurred during authentication."}
+            connection.rollback()
         finally:
             cursor.close()
             close_connection(connection)
 
 def update_user_profile(user_id, new_username=None, new_email=None, new_password=None):
+    hashed_password = hash_password(new_password) if new_password else None
     connection = create_connection()
     if connection:
         cursor = connection.cursor()
@@ -70,8 +98,7 @@ def update_user_profile(user_id, new_username=None, new_email=None, new_password
                 cursor.execute('UPDATE "Users" SET "username" = %s WHERE "user_id" = %s', (new_username, user_id))
             if new_email:
                 cursor.execute('UPDATE "Users" SET "email" = %s WHERE "user_id" = %s', (new_email, user_id))
-            if new_password:
-                hashed_password = hash_password(new_password)
+            if hashed_password:
                 cursor.execute('UPDATE "Users" SET "password_hash" = %s WHERE "user_id" = %s', (hashed_password, user_id))
             connection.commit()
             return {"success": True, "message": "Profile updated successfully."}
@@ -83,6 +110,7 @@ def update_user_profile(user_id, new_username=None, new_email=None, new_password
             close_connection(connection)
 
 def get_user_profile(user_id):
+    last_login_writes.flush()  # Show the login that is still buffered
     connection = create_connection()
     if connection:
         cursor = connection.cursor()
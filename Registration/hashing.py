@@ -0,0 +1,124 @@
+# hashing.py
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))  # Work factor for new hashes; older hashes are upgraded on login
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', os.cpu_count() or 1))  # Processes running bcrypt; 0 hashes in the calling thread
+
+_executor = None
+_workers = HASH_WORKERS
+_lock = threading.Lock()
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check(plain_password, hashed_password):
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None and _workers > 0:
+            # Workers are spawned rather than forked: the parent already runs pool and GUI threads
+            _executor = ProcessPoolExecutor(max_workers=_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+def configure(workers):
+    """Changes the number of hashing processes, shutting down the current pool."""
+    global _workers
+    shutdown()
+    with _lock:
+        _workers = workers
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+atexit.register(shutdown)
+
+def _run(fn, *args):
+    executor = get_executor()
+    if executor is None:
+        return fn(*args)
+    return executor.submit(fn, *args).result()
+
+def hash_password(password, rounds=None):
+    return _run(_hash, password, rounds or BCRYPT_ROUNDS)
+
+def verify_password(plain_password, hashed_password):
+    return _run(_check, plain_password, hashed_password)
+
+def hash_rounds(hashed_password):
+    """Returns the work factor stored in a bcrypt hash such as $2b$12$..."""
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed_password, rounds=None):
+    return hash_rounds(hashed_password) != (rounds or BCRYPT_ROUNDS)
+
+def benchmark(threads=None, duration=10):
+    """
+    Measures authenticate_user logins per second with `threads` concurrent callers, hashing
+    in the calling threads and then in the process pool. Creates a throwaway user.
+    """
+    from database import create_connection, close_connection
+    from Registration.auth import authenticate_user
+
+    threads = threads or 4 * (os.cpu_count() or 1)
+    username, password = "hash_benchmark_user", "hash-benchmark-password"
+    connection = create_connection()
+    cursor = connection.cursor()
+    cursor.execute('DELETE FROM "Users" WHERE "username" = %s', (username,))
+    cursor.execute('INSERT INTO "Users" ("username", "email", "password_hash") VALUES (%s, %s, %s)',
+                   (username, f"{username}@example.com", _hash(password, BCRYPT_ROUNDS)))
+    connection.commit()
+
+    def run():
+        logins = []
+        deadline = time.perf_counter() + duration
+
+        def caller():
+            count = 0
+            while time.perf_counter() < deadline:
+                if authenticate_user(username, password)["success"]:
+                    count += 1
+            logins.append(count)
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=caller) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return sum(logins) / (time.perf_counter() - start)
+
+    try:
+        print(f"bcrypt cost {BCRYPT_ROUNDS}, {threads} concurrent callers, {os.cpu_count()} cores")
+        configure(0)
+        inline = run()
+        print(f"In calling threads: {inline:.1f} logins/s")
+        configure(HASH_WORKERS or os.cpu_count() or 1)
+        verify_password(password, _hash(password, 4))  # Start the worker processes before timing
+        pooled = run()
+        print(f"Process pool ({_workers} workers): {pooled:.1f} logins/s ({pooled / inline:.1f}x)")
+    finally:
+        cursor.execute('DELETE FROM "Users" WHERE "username" = %s', (username,))
+        connection.commit()
+        cursor.close()
+        close_connection(connection)
+
+if __name__ == "__main__":
+    benchmark()
@@ -22,13 +22,13 @@ def handle_login():
         print("Error:", response["message"])
         return None
 
+def format_profile(profile):
+    return f"Username: {profile['username']}\nEmail: {profile['email']}\nLast login: {profile['last_login']}"
+
 def handle_view_profile(user_id):
     response = get_user_profile(user_id)
     if response["success"]:
-        profile = response["profile"]
-        print(f"Username: {profile['username']}")
-        print(f"Email: {profile['email']}")
-        print(f"Last login: {profile['last_login']}")
+        print(format_profile(response["profile"]))
     else:
         print("Error:", response["message"])
 
@@ -1,49 +1,69 @@
 import tkinter as tk
 from tkinter import messagebox, ttk, scrolledtext
-import sys
-import io
-from functools import partial
-from contextlib import contextmanager
-from Registration.register_login import (
-    handle_registration,
-    handle_login,
-    handle_view_profile,
-    handle_update_profile,
-    handle_delete_profile
+from Registration.auth import (
+    register_user,
+    authenticate_user,
+    get_user_profile,
+    update_user_profile,
+    delete_user_profile
 )
-from PortfolioManagement.port_mgmt import (
+from Registration.register_login import format_profile
+from PortfolioManagement.portfolio_service import (
+    list_portfolios,
+    get_portfolio,
     create_portfolio,
-    edit_portfolio,
+    update_portfolio,
     delete_portfolio,
-    view_portfolio_with_stocks,
-    view_portfolios,
+    list_stocks,
     add_stock,
-    delete_stock
+    remove_stock,
+    list_user_symbols
 )
+from PortfolioManagement.port_mgmt import format_portfolio, format_prices, format_live_metrics
+from PortfolioManagement.async_prices import AsyncPriceFetcher, fetch_prices
+from PortfolioManagement.streaming_metrics import StreamingMetrics
+from task_runner import TaskRunner
+
+# Blocking calls below run on the TaskRunner's worker threads, never on the Tk thread
+def load_portfolio_names(user_id):
+    """Returns the user's portfolio names for the selection combo boxes."""
+    response = list_portfolios(user_id)
+    if not response["success"]:
+        raise RuntimeError(response["message"])
+    return [portfolio["name"] for portfolio in response["portfolios"]]
+
+def load_portfolio_details(user_id, name):
+    """Fetches a portfolio and formats it together with its current valuation."""
+    response = get_portfolio(user_id, name)
+    if response["success"]:
+        response["details"] = format_portfolio(response["portfolio"], response["stocks"])
+    return response
+
+def load_current_prices(user_id, fetcher):
+    response = list_user_symbols(user_id)
+    if response["success"] and response["symbols"]:
+        prices, failures = fetch_prices(response["symbols"], fetcher)
+        response["details"] = format_prices(response["symbols"], prices, failures)
+    return response
+
+def load_live_metrics(user_id):
+    return StreamingMetrics().load(user_id)
+
+def fill_portfolio_choices(window, combo, empty_message):
+    """Loads the user's portfolio names into `combo` in the background, closing `window` if there are none."""
+    def fill(names):
+        if not names:
+            messagebox.showinfo("Info", empty_message)
+            window.destroy()
+            return
+        combo['values'] = names
 
-# Context manager to override input and capture print output
-@contextmanager
-def capture_io(inputs):
-    """
-    Overrides the built-in input function to supply predefined inputs
-    and captures all print outputs.
-    """
-    original_input = __builtins__.input
-    original_stdout = sys.stdout
-    sys.stdout = io.StringIO()
-
-    def mock_input(prompt=""):
-        if inputs:
-            return inputs.pop(0)
-        else:
-            return original_input(prompt)
+    def failed(error):
+        messagebox.showerror("Error", f"An error occurred: {str(error)}")
+        window.destroy()
 
-    __builtins__.input = mock_input
-    try:
-        yield sys.stdout
-    finally:
-        __builtins__.input = original_input
-        sys.stdout = original_stdout
+    window.controller.tasks.submit(("portfolio_names", str(window)), load_portfolio_names, window.controller.user_id,
+                                   on_success=fill, on_error=failed, owner=window, description="Loading portfolios...")
 
 class App(tk.Tk):
     def __init__(self):
@@ -52,6 +72,18 @@ class App(tk.Tk):
         self.geometry("800x600")
         self.resizable(False, False)
 
+        # Database and quote calls run in the background; the status bar shows what is in progress
+        self.tasks = TaskRunner(self, on_busy=self.show_busy, on_error=self.show_error)
+        status_frame = tk.Frame(self)
+        status_frame.pack(side="bottom", fill="x", padx=10, pady=5)
+        self.status_label = tk.Label(status_frame, text="", font=("Helvetica", 10))
+        self.status_label.pack(side="left")
+        self.cancel_btn = tk.Button(status_frame, text="Cancel", command=self.tasks.cancel_all, width=10, state="disabled")
+        self.cancel_btn.pack(side="right")
+        self.progress = ttk.Progressbar(status_frame, mode="indeterminate", length=200)
+        self.progress.pack(side="right", padx=10)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
         # Container for all frames
         container = tk.Frame(self)
         container.pack(side="top", fill="both", expand=True)
@@ -65,12 +97,54 @@ class App(tk.Tk):
             frame.grid(row=0, column=0, sticky="nsew")
 
         self.user_id = None
+        self.live_metrics = None
         self.show_frame(StartPage)
 
     def show_frame(self, cont):
         frame = self.frames[cont]
         frame.tkraise()
 
+    def show_busy(self, descriptions, cancellable=True):
+        if descriptions:
+            self.status_label.config(text=" ".join(descriptions))
+            # Writes cannot be cancelled once started, so Cancel is only offered for reads
+            self.cancel_btn.config(state="normal" if cancellable else "disabled")
+            self.progress.start(10)
+        else:
+            self.status_label.config(text="")
+            self.cancel_btn.config(state="disabled")
+            self.progress.stop()
+
+    def show_error(self, error):
+        messagebox.showerror("Error", f"An error occurred: {str(error)}")
+
+    def start_live_metrics(self):
+        """
+        (Re)loads the user's holdings into StreamingMetrics, which is then updated by every quote
+        the app fetches. Called after login and whenever the user's holdings change.
+        """
+        user_id = self.user_id
+        if user_id is None:
+            return
+
+        def started(metrics):
+            if self.user_id == user_id:
+                self.stop_live_metrics()
+                self.live_metrics = metrics
+                metrics.attach()
+
+        self.tasks.submit("live_metrics", load_live_metrics, user_id, on_success=started, replace=True)
+
+    def stop_live_metrics(self):
+        if self.live_metrics is not None:
+            self.live_metrics.detach()
+            self.live_metrics = None
+
+    def close(self):
+        self.stop_live_metrics()
+        self.tasks.shutdown()
+        self.destroy()
+
 class StartPage(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
@@ -93,7 +167,7 @@ class StartPage(tk.Frame):
         login_btn.grid(row=0, column=1, padx=10, pady=10)
 
         exit_btn = tk.Button(button_frame, text="Exit",
-                             command=self.quit,
+                             command=controller.close,
                              width=20, height=2)
         exit_btn.grid(row=0, column=2, padx=10, pady=10)
 
@@ -139,20 +213,15 @@ class RegisterPage(tk.Frame):
             messagebox.showerror("Error", "All fields are required.")
             return
 
-        # Prepare inputs for handle_registration
-        inputs = [username, email, password]
-
-        try:
-            with capture_io(inputs) as output:
-                handle_registration()
-            result = output.getvalue()
-            if "Registration successful." in result:
-                messagebox.showinfo("Success", "Registration successful. You can now log in.")
-                self.controller.show_frame(LoginPage)
-            else:
-                messagebox.showerror("Error", result.strip())
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        self.controller.tasks.submit("register", register_user, username, email, password,
+                                     on_success=self.registered, description="Registering...", cancellable=False)
+
+    def registered(self, response):
+        if response["success"]:
+            messagebox.showinfo("Success", "Registration successful. You can now log in.")
+            self.controller.show_frame(LoginPage)
+        else:
+            messagebox.showerror("Error", response["message"])
 
 class LoginPage(tk.Frame):
     def __init__(self, parent, controller):
@@ -191,21 +260,17 @@ class LoginPage(tk.Frame):
             messagebox.showerror("Error", "All fields are required.")
             return
 
-        # Prepare inputs for handle_login
-        inputs = [username, password]
-
-        try:
-            with capture_io(inputs) as output:
-                user_id = handle_login()
-            result = output.getvalue()
-            if "Login successful." in result:
-                self.controller.user_id = user_id
-                messagebox.showinfo("Success", "Login successful.")
-                self.controller.show_frame(UserMenuPage)
-            else:
-                messagebox.showerror("Error", result.strip())
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        self.controller.tasks.submit("login", authenticate_user, username, password,
+                                     on_success=self.logged_in, description="Logging in...")
+
+    def logged_in(self, response):
+        if response["success"]:
+            self.controller.user_id = response["user_id"]
+            self.controller.start_live_metrics()
+            messagebox.showinfo("Success", "Login successful.")
+            self.controller.show_frame(UserMenuPage)
+        else:
+            messagebox.showerror("Error", response["message"])
 
 class UserMenuPage(tk.Frame):
     def __init__(self, parent, controller):
@@ -232,6 +297,8 @@ class UserMenuPage(tk.Frame):
         logout_btn.grid(row=0, column=2, padx=10, pady=10)
 
     def logout(self):
+        self.controller.tasks.cancel_all()
+        self.controller.stop_live_metrics()
         self.controller.user_id = None
         messagebox.showinfo("Logged Out", "You have been logged out successfully.")
         self.controller.show_frame(StartPage)
@@ -262,39 +329,34 @@ class ProfileManagementPage(tk.Frame):
         back_btn.pack(pady=20)
 
     def view_profile(self):
-        try:
-            with capture_io([]) as output:
-                handle_view_profile(self.controller.user_id)
-            result = output.getvalue()
-            profile_info = result.strip()
-            if profile_info:
-                # Display profile info in a scrolled text window
-                ProfileInfoWindow(self.controller, profile_info)
-            else:
-                messagebox.showerror("Error", "Unable to retrieve profile.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        self.controller.tasks.submit("view_profile", get_user_profile, self.controller.user_id,
+                                     on_success=self.show_profile, description="Loading profile...")
+
+    def show_profile(self, response):
+        if response["success"]:
+            # Display profile info in a scrolled text window
+            ProfileInfoWindow(self.controller, format_profile(response["profile"]))
+        else:
+            messagebox.showerror("Error", "Unable to retrieve profile.")
 
     def update_profile(self):
         UpdateProfileWindow(self.controller)
 
     def delete_profile(self):
-        # Prepare input for confirmation
         confirm = messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete your profile?")
         if confirm:
-            inputs = ['y']
-            try:
-                with capture_io(inputs) as output:
-                    success = handle_delete_profile(self.controller.user_id)
-                result = output.getvalue()
-                if "Profile deleted successfully." in result:
-                    messagebox.showinfo("Deleted", "Profile deleted successfully.")
-                    self.controller.user_id = None
-                    self.controller.show_frame(StartPage)
-                else:
-                    messagebox.showerror("Error", result.strip())
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            self.controller.tasks.submit("delete_profile", delete_user_profile, self.controller.user_id,
+                                         on_success=self.profile_deleted, description="Deleting profile...",
+                                         cancellable=False)
+
+    def profile_deleted(self, response):
+        if response["success"]:
+            messagebox.showinfo("Deleted", "Profile deleted successfully.")
+            self.controller.stop_live_metrics()
+            self.controller.user_id = None
+            self.controller.show_frame(StartPage)
+        else:
+            messagebox.showerror("Error", response["message"])
 
 class ProfileInfoWindow(tk.Toplevel):
     def __init__(self, controller, profile_info):
@@ -354,17 +416,18 @@ class UpdateProfileWindow(tk.Toplevel):
         new_email = self.new_email_entry.get().strip()
         new_password = self.new_password_entry.get().strip()
 
-        # Prepare inputs
-        inputs = [new_username if new_username else '', new_email if new_email else '', new_password if new_password else '']
+        self.controller.tasks.submit(("update_profile", str(self)), update_user_profile, self.controller.user_id,
+                                     new_username or None, new_email or None, new_password or None,
+                                     on_success=self.updated, description="Updating profile...", cancellable=False)
 
-        try:
-            with capture_io(inputs) as output:
-                handle_update_profile(self.controller.user_id)
-            result = output.getvalue()
-            messagebox.showinfo("Update Profile", result.strip())
-            self.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    def updated(self, response):
+        if response["success"]:
+            messagebox.showinfo("Update Profile", response["message"])
+            # The window may have been closed while the write was running
+            if self.winfo_exists():
+                self.destroy()
+        else:
+            messagebox.showerror("Error", response["message"])
 
 class PortfolioManagementPage(tk.Frame):
     def __init__(self, parent, controller):
@@ -395,6 +458,9 @@ class PortfolioManagementPage(tk.Frame):
         delete_stock_btn = tk.Button(button_frame, text="Delete Stock from Portfolio", command=self.delete_stock, width=25)
         delete_stock_btn.grid(row=1, column=2, padx=10, pady=10)
 
+        prices_btn = tk.Button(button_frame, text="View Current Prices", command=self.view_current_prices, width=25)
+        prices_btn.grid(row=2, column=1, padx=10, pady=10)
+
         back_btn = tk.Button(self, text="Back to User Menu",
                              command=lambda: controller.show_frame(UserMenuPage),
                              width=25)
@@ -410,31 +476,29 @@ class PortfolioManagementPage(tk.Frame):
         DeletePortfolioWindow(self.controller)
 
     def view_portfolio(self):
-        try:
-            # Fetch portfolio names directly from the database
-            portfolio_names = list_user_portfolios_gui(self.controller.user_id)
-            if not portfolio_names:
-                messagebox.showinfo("Info", "You have no portfolios to view.")
-                return
-
-            # Prompt user to select a portfolio
-            selected_portfolio = SelectPortfolioDialog(self.controller, portfolio_names, "Select Portfolio to View")
-            self.wait_window(selected_portfolio)
-
-            if selected_portfolio.selected_portfolio:
-                portfolio_name = selected_portfolio.selected_portfolio
-                # Prepare input for handle_view_portfolio_with_stocks
-                inputs = [portfolio_name]
-                with capture_io(inputs) as output:
-                    view_portfolio_with_stocks(self.controller.user_id)
-                result = output.getvalue()
-                if "Portfolio Details:" in result:
-                    # Display portfolio details and stocks
-                    PortfolioInfoWindow(self.controller, result.strip())
-                else:
-                    messagebox.showinfo("Info", result.strip())
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        self.controller.tasks.submit("view_portfolio", load_portfolio_names, self.controller.user_id,
+                                     on_success=self.select_portfolio_to_view, description="Loading portfolios...")
+
+    def select_portfolio_to_view(self, names):
+        if not names:
+            messagebox.showinfo("Info", "You have no portfolios to view.")
+            return
+
+        # Prompt user to select a portfolio
+        selected_portfolio = SelectPortfolioDialog(self.controller, names, "Select Portfolio to View")
+        self.wait_window(selected_portfolio)
+
+        if selected_portfolio.selected_portfolio:
+            name = selected_portfolio.selected_portfolio
+            self.controller.tasks.submit(("view_portfolio", name), load_portfolio_details, self.controller.user_id, name,
+                                         on_success=self.show_portfolio, description=f"Loading {name}...")
+
+    def show_portfolio(self, response):
+        if response["success"]:
+            # Display portfolio details and stocks
+            PortfolioInfoWindow(self.controller, response["details"])
+        else:
+            messagebox.showinfo("Info", response["message"])
 
     def add_stock(self):
         AddStockWindow(self.controller)
@@ -442,6 +506,26 @@ class PortfolioManagementPage(tk.Frame):
     def delete_stock(self):
         DeleteStockWindow(self.controller)
 
+    def view_current_prices(self):
+        # Quotes are fetched concurrently; Cancel in the status bar stops the fetcher itself
+        fetcher = AsyncPriceFetcher()
+        self.controller.tasks.submit("current_prices", load_current_prices, self.controller.user_id, fetcher,
+                                     on_success=self.show_current_prices, cancel=fetcher.cancel,
+                                     description="Fetching prices...")
+
+    def show_current_prices(self, response):
+        if not response["success"]:
+            messagebox.showerror("Error", response["message"])
+        elif not response["symbols"]:
+            messagebox.showinfo("Info", "You have no stocks to price.")
+        else:
+            details = response["details"]
+            if self.controller.live_metrics is not None:
+                # The fetch above has just fed these metrics with the new quotes
+                metrics = format_live_metrics(self.controller.live_metrics.snapshot())
+                details = "\n\n".join(section for section in (details, metrics) if section)
+            PortfolioInfoWindow(self.controller, details)
+
 class SelectPortfolioDialog(tk.Toplevel):
     def __init__(self, controller, portfolio_names, title="Select Portfolio"):
         super().__init__(controller)
@@ -535,19 +619,17 @@ class CreatePortfolioWindow(tk.Toplevel):
             messagebox.showerror("Error", "Portfolio name is required.")
             return
 
-        inputs = [name, description]
+        self.controller.tasks.submit(("create_portfolio", str(self)), create_portfolio, self.controller.user_id, name, description,
+                                     on_success=self.created, description="Creating portfolio...", cancellable=False)
 
-        try:
-            with capture_io(inputs) as output:
-                create_portfolio(self.controller.user_id)
-            result = output.getvalue()
-            if "Portfolio created successfully." in result:
-                messagebox.showinfo("Success", "Portfolio created successfully.")
+    def created(self, response):
+        if response["success"]:
+            messagebox.showinfo("Success", response["message"])
+            # The window may have been closed while the write was running
+            if self.winfo_exists():
                 self.destroy()
-            else:
-                messagebox.showerror("Error", result.strip())
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        else:
+            messagebox.showerror("Error", response["message"])
 
 class EditPortfolioWindow(tk.Toplevel):
     def __init__(self, controller):
@@ -560,23 +642,11 @@ class EditPortfolioWindow(tk.Toplevel):
         label = tk.Label(self, text="Edit Portfolio", font=("Helvetica", 14))
         label.pack(pady=10)
 
-        # Fetch portfolio names directly from the database
-        try:
-            portfolio_names = list_user_portfolios_gui(self.controller.user_id)
-            if not portfolio_names:
-                messagebox.showinfo("Info", "You have no portfolios to edit.")
-                self.destroy()
-                return
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-            self.destroy()
-            return
-
         form_frame = tk.Frame(self)
         form_frame.pack(pady=10)
 
         tk.Label(form_frame, text="Select Portfolio:", font=("Helvetica", 12)).grid(row=0, column=0, sticky="e", pady=5, padx=5)
-        self.portfolio_combo = ttk.Combobox(form_frame, values=portfolio_names, state="readonly", width=25)
+        self.portfolio_combo = ttk.Combobox(form_frame, values=[], state="readonly", width=25)
         self.portfolio_combo.grid(row=0, column=1, pady=5, padx=5)
 
         tk.Label(form_frame, text="New Name:", font=("Helvetica", 12)).grid(row=1, column=0, sticky="e", pady=5, padx=5)
@@ -596,6 +666,8 @@ class EditPortfolioWindow(tk.Toplevel):
         cancel_btn = tk.Button(button_frame, text="Cancel", command=self.destroy, width=15)
         cancel_btn.grid(row=0, column=1, padx=10)
 
+        fill_portfolio_choices(self, self.portfolio_combo, "You have no portfolios to edit.")
+
     def edit_portfolio(self):
         selected = self.portfolio_combo.get()
         new_name = self.new_name_entry.get().strip()
@@ -605,19 +677,18 @@ class EditPortfolioWindow(tk.Toplevel):
             messagebox.showerror("Error", "Please select a portfolio to edit.")
             return
 
-        inputs = [selected, new_name, new_description]
+        self.controller.tasks.submit(("edit_portfolio", str(self)), update_portfolio, self.controller.user_id, selected,
+                                     new_name or None, new_description or None,
+                                     on_success=self.edited, description="Updating portfolio...", cancellable=False)
 
-        try:
-            with capture_io(inputs) as output:
-                edit_portfolio(self.controller.user_id)
-            result = output.getvalue()
-            if "Portfolio updated successfully." in result:
-                messagebox.showinfo("Success", "Portfolio updated successfully.")
+    def edited(self, response):
+        if response["success"]:
+            messagebox.showinfo("Success", response["message"])
+            # The window may have been closed while the write was running
+            if self.winfo_exists():
                 self.destroy()
-            else:
-                messagebox.showerror("Error", result.strip())
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        else:
+            messagebox.showerror("Error", response["message"])
 
 class DeletePortfolioWindow(tk.Toplevel):
     def __init__(self, controller):
@@ -630,23 +701,11 @@ class DeletePortfolioWindow(tk.Toplevel):
         label = tk.Label(self, text="Delete Portfolio", font=("Helvetica", 14))
         label.pack(pady=10)
 
-        # Fetch portfolio names directly from the database
-        try:
-            portfolio_names = list_user_portfolios_gui(self.controller.user_id)
-            if not portfolio_names:
-                messagebox.showinfo("Info", "You have no portfolios to delete.")
-                self.destroy()
-                return
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-            self.destroy()
-            return
-
         form_frame = tk.Frame(self)
         form_frame.pack(pady=10)
 
         tk.Label(form_frame, text="Select Portfolio:", font=("Helvetica", 12)).grid(row=0, column=0, sticky="e", pady=5, padx=5)
-        self.portfolio_combo = ttk.Combobox(form_frame, values=portfolio_names, state="readonly", width=25)
+        self.portfolio_combo = ttk.Combobox(form_frame, values=[], state="readonly", width=25)
         self.portfolio_combo.grid(row=0, column=1, pady=5, padx=5)
 
         button_frame = tk.Frame(self)
@@ -658,6 +717,8 @@ class DeletePortfolioWindow(tk.Toplevel):
         cancel_btn = tk.Button(button_frame, text="Cancel", command=self.destroy, width=15)
         cancel_btn.grid(row=0, column=1, padx=10)
 
+        fill_portfolio_choices(self, self.portfolio_combo, "You have no portfolios to delete.")
+
     def delete_portfolio(self):
         selected = self.portfolio_combo.get()
 
@@ -670,19 +731,18 @@ class DeletePortfolioWindow(tk.Toplevel):
         if not confirm:
             return
 
-        inputs = [selected]
+        self.controller.tasks.submit(("delete_portfolio", str(self)), delete_portfolio, self.controller.user_id, selected,
+                                     on_success=self.deleted, description="Deleting portfolio...", cancellable=False)
 
-        try:
-            with capture_io(inputs) as output:
-                delete_portfolio(self.controller.user_id)
-            result = output.getvalue()
-            if "Portfolio deleted successfully." in result:
-                messagebox.showinfo("Deleted", "Portfolio deleted successfully.")
+    def deleted(self, response):
+        if response["success"]:
+            messagebox.showinfo("Deleted", response["message"])
+            self.controller.start_live_metrics()
+            # The window may have been closed while the write was running
+            if self.winfo_exists():
                 self.destroy()
-            else:
-                messagebox.showerror("Error", result.strip())
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        else:
+            messagebox.showerror("Error", response["message"])
 
 class AddStockWindow(tk.Toplevel):
     def __init__(self, controller):
@@ -695,23 +755,11 @@ class AddStockWindow(tk.Toplevel):
         label = tk.Label(self, text="Add Stock to Portfolio", font=("Helvetica", 14))
         label.pack(pady=10)
 
-        # Fetch portfolio names directly from the database
-        try:
-            portfolio_names = list_user_portfolios_gui(self.controller.user_id)
-            if not portfolio_names:
-                messagebox.showinfo("Info", "You have no portfolios to add stocks to.")
-                self.destroy()
-                return
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-            self.destroy()
-            return
-
         form_frame = tk.Frame(self)
         form_frame.pack(pady=10)
 
         tk.Label(form_frame, text="Select Portfolio:", font=("Helvetica", 12)).grid(row=0, column=0, sticky="e", pady=5, padx=5)
-        self.portfolio_combo = ttk.Combobox(form_frame, values=portfolio_names, state="readonly", width=25)
+        self.portfolio_combo = ttk.Combobox(form_frame, values=[], state="readonly", width=25)
         self.portfolio_combo.grid(row=0, column=1, pady=5, padx=5)
 
         tk.Label(form_frame, text="Stock Symbol:", font=("Helvetica", 12)).grid(row=1, column=0, sticky="e", pady=5, padx=5)
@@ -731,6 +779,8 @@ class AddStockWindow(tk.Toplevel):
         cancel_btn = tk.Button(button_frame, text="Cancel", command=self.destroy, width=15)
         cancel_btn.grid(row=0, column=1, padx=10)
 
+        fill_portfolio_choices(self, self.portfolio_combo, "You have no portfolios to add stocks to.")
+
     def add_stock(self):
         portfolio_name = self.portfolio_combo.get()
         symbol = self.symbol_entry.get().strip().upper()
@@ -744,19 +794,19 @@ class AddStockWindow(tk.Toplevel):
             messagebox.showerror("Error", "Number of shares must be a positive integer.")
             return
 
-        inputs = [portfolio_name, symbol, shares]
+        # Keyed on the window, so a double-click cannot buy the shares twice
+        self.controller.tasks.submit(("add_stock", str(self)), add_stock, self.controller.user_id, portfolio_name, symbol, int(shares),
+                                     on_success=self.added, description=f"Adding {symbol}...", cancellable=False)
 
-        try:
-            with capture_io(inputs) as output:
-                add_stock(self.controller.user_id)
-            result = output.getvalue()
-            if "Stock added successfully." in result or "Stock updated successfully." in result:
-                messagebox.showinfo("Success", "Stock added successfully.")
+    def added(self, response):
+        if response["success"]:
+            messagebox.showinfo("Success", "Stock added successfully.")
+            self.controller.start_live_metrics()
+            # The window may have been closed while the write was running
+            if self.winfo_exists():
                 self.destroy()
-            else:
-                messagebox.showerror("Error", result.strip())
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        else:
+            messagebox.showerror("Error", response["message"])
 
 class DeleteStockWindow(tk.Toplevel):
     def __init__(self, controller):
@@ -769,23 +819,11 @@ class DeleteStockWindow(tk.Toplevel):
         label = tk.Label(self, text="Delete Stock from Portfolio", font=("Helvetica", 14))
         label.pack(pady=10)
 
-        # Fetch portfolio names directly from the database
-        try:
-            portfolio_names = list_user_portfolios_gui(self.controller.user_id)
-            if not portfolio_names:
-                messagebox.showinfo("Info", "You have no portfolios to delete stocks from.")
-                self.destroy()
-                return
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-            self.destroy()
-            return
-
         form_frame = tk.Frame(self)
         form_frame.pack(pady=10)
 
         tk.Label(form_frame, text="Select Portfolio:", font=("Helvetica", 12)).grid(row=0, column=0, sticky="e", pady=5, padx=5)
-        self.portfolio_combo = ttk.Combobox(form_frame, values=portfolio_names, state="readonly", width=25)
+        self.portfolio_combo = ttk.Combobox(form_frame, values=[], state="readonly", width=25)
         self.portfolio_combo.grid(row=0, column=1, pady=5, padx=5)
         self.portfolio_combo.bind("<<ComboboxSelected>>", self.load_stocks)
 
@@ -806,19 +844,27 @@ class DeleteStockWindow(tk.Toplevel):
         cancel_btn = tk.Button(button_frame, text="Cancel", command=self.destroy, width=15)
         cancel_btn.grid(row=0, column=1, padx=10)
 
+        fill_portfolio_choices(self, self.portfolio_combo, "You have no portfolios to delete stocks from.")
+
     def load_stocks(self, event):
         portfolio_name = self.portfolio_combo.get()
         if not portfolio_name:
             return
 
-        try:
-            stocks = list_portfolio_stocks_gui(self.controller.user_id, portfolio_name)
-            stock_symbols = [stock[0] for stock in stocks]
-            self.stock_combo['values'] = stock_symbols
-            if not stock_symbols:
-                messagebox.showinfo("Info", "No stocks in this portfolio.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        # A newer selection replaces a load that is still running
+        self.stock_combo.set("")
+        self.stock_combo['values'] = []
+        self.controller.tasks.submit(("load_stocks", str(self)), list_stocks, self.controller.user_id, portfolio_name,
+                                     on_success=self.set_stocks, owner=self, replace=True, description="Loading stocks...")
+
+    def set_stocks(self, response):
+        if not response["success"]:
+            messagebox.showerror("Error", response["message"])
+            return
+        stock_symbols = [stock["symbol"] for stock in response["stocks"]]
+        self.stock_combo['values'] = stock_symbols
+        if not stock_symbols:
+            messagebox.showinfo("Info", "No stocks in this portfolio.")
 
     def delete_stock(self):
         portfolio_name = self.portfolio_combo.get()
@@ -833,69 +879,20 @@ class DeleteStockWindow(tk.Toplevel):
             messagebox.showerror("Error", "Number of shares to delete must be a positive integer.")
             return
 
-        inputs = [portfolio_name, stock_symbol, delete_shares]
-
-        try:
-            with capture_io(inputs) as output:
-                delete_stock(self.controller.user_id)
-            result = output.getvalue()
-            if "Stock deleted successfully." in result or "shares deleted successfully." in result:
-                messagebox.showinfo("Success", "Stock deleted successfully.")
+        self.controller.tasks.submit(("delete_stock", str(self)), remove_stock, self.controller.user_id, portfolio_name,
+                                     stock_symbol, int(delete_shares),
+                                     on_success=self.stock_deleted, description=f"Deleting {stock_symbol}...",
+                                     cancellable=False)
+
+    def stock_deleted(self, response):
+        if response["success"]:
+            messagebox.showinfo("Success", "Stock deleted successfully.")
+            self.controller.start_live_metrics()
+            # The window may have been closed while the write was running
+            if self.winfo_exists():
                 self.destroy()
-            else:
-                messagebox.showerror("Error", result.strip())
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-
-# Utility functions to interact with backend using GUI
-def list_user_portfolios_gui(user_id):
-    """
-    Fetches the list of portfolio names for the given user_id.
-    Returns a list of portfolio names.
-    """
-    connection = None
-    try:
-        # Use the same create_connection and close_connection functions as in port_mgmt.py
-        from database import create_connection, close_connection
-        connection = create_connection()
-        portfolios = []
-        if connection:
-            cursor = connection.cursor()
-            cursor.execute('SELECT "name" FROM "Portfolios" WHERE "user_id" = %s', (user_id,))
-            portfolios = cursor.fetchall()
-            cursor.close()
-            close_connection(connection)
-        portfolio_names = [portfolio[0] for portfolio in portfolios]
-        return portfolio_names
-    except Exception as e:
-        raise e
-
-def list_portfolio_stocks_gui(user_id, portfolio_name):
-    """
-    Fetches the list of stocks for the given user_id and portfolio_name.
-    Returns a list of tuples containing stock symbols and other details.
-    """
-    connection = None
-    try:
-        from database import create_connection, close_connection
-        connection = create_connection()
-        stocks = []
-        if connection:
-            cursor = connection.cursor()
-            cursor.execute('SELECT "portfolio_id" FROM "Portfolios" WHERE "user_id" = %s AND "name" = %s', (user_id, portfolio_name))
-            portfolio = cursor.fetchone()
-            if not portfolio:
-                cursor.close()
-                close_connection(connection)
-                return []
-            portfolio_id = portfolio[0]
-            cursor.execute('SELECT "symbol", "shares", "purchase_price", "avg_purchase_price" FROM "Stocks" WHERE "portfolio_id" = %s', (portfolio_id,))
-            stocks = cursor.fetchall()
-            cursor.close()
-            close_connection(connection)
-        return stocks
-    except Exception as e:
-        raise e
+        else:
+            messagebox.showerror("Error", response["message"])
 
 # Initialize and run the application
 def main():
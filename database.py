@@ -1,18 +1,340 @@
 import psycopg2
+from psycopg2 import pool
 from dotenv import load_dotenv
+from contextlib import contextmanager
+import atexit
+import itertools
 import os
+import threading
+import time
+import weakref
+from collections import Counter
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Pool sizing and health-check settings
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))  # Idle connections kept open between checkouts
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_HEALTH_CHECK_INTERVAL', 30))  # Ping connections idle longer than this
+
+# Write-behind settings for buffered, non-critical writes
+WRITE_BEHIND_INTERVAL = float(os.getenv('WRITE_BEHIND_INTERVAL', 0.5))  # Seconds a buffered row may wait before it is written
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500))  # Rows per batch; a full batch is written at once
+WRITE_BEHIND_RETRIES = int(os.getenv('WRITE_BEHIND_RETRIES', 3))  # Times a failed batch is retried before its rows are dropped
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_last_used = weakref.WeakKeyDictionary()  # Keyed by the connection itself; id()s are reused once a connection is freed
+_local = threading.local()
+
+def connection_params():
+    return {
+        "host": os.getenv('DB_HOST'),
+        "user": os.getenv('DB_USER'),
+        "password": os.getenv('DB_PASSWORD'),
+        "database": os.getenv('DB_NAME')
+    }
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **connection_params())
+    return _pool
+
+def _is_healthy(connection):
+    """Checks that a pooled connection is still usable, pinging it if it has been idle for a while."""
+    if connection.closed:
+        return False
+    if time.monotonic() - _last_used.get(connection, 0) < DB_HEALTH_CHECK_INTERVAL:
+        return True
+    try:
+        cursor = connection.cursor()
+        cursor.execute('SELECT 1')
+        cursor.close()
+        connection.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def _checkout():
+    if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise pool.PoolError(f"No database connection available after {DB_POOL_TIMEOUT} seconds")
+    try:
+        connection_pool = get_pool()
+        connection = connection_pool.getconn()
+        while not _is_healthy(connection):
+            connection_pool.putconn(connection, close=True)
+            connection = connection_pool.getconn()
+        return connection
+    except Exception:
+        _pool_slots.release()
+        raise
+
+def _checkin(connection):
+    _last_used[connection] = time.monotonic()
+    try:
+        get_pool().putconn(connection, close=bool(connection.closed))
+    finally:
+        _pool_slots.release()
+
 def create_connection():
-    return psycopg2.connect(
-        host=os.getenv('DB_HOST'),
-        user=os.getenv('DB_USER'),
-        password=os.getenv('DB_PASSWORD'),
-        database=os.getenv('DB_NAME')
-    )
+    """
+    Checks out a connection from the pool.
+    Nested checkouts on the same thread share one connection, so helpers called
+    while a connection is held do not take a second one from the pool. They also share
+    its transaction: a commit() or rollback() in an inner helper ends the outer caller's
+    transaction too, so a multi-step write that must be atomic should not call helpers
+    that commit on their own.
+    """
+    held = getattr(_local, "connection", None)
+    if held is not None and not held.closed:
+        _local.depth += 1
+        return held
+    connection = _checkout()
+    _local.connection = connection
+    _local.depth = 1
+    return connection
 
 def close_connection(connection):
-    if connection:
-        connection.close()
\ No newline at end of file
+    """Returns a connection obtained from create_connection to the pool."""
+    if not connection:
+        return
+    if connection is getattr(_local, "connection", None):
+        _local.depth -= 1
+        if _local.depth > 0:
+            return
+        _local.connection = None
+    _checkin(connection)
+
+@contextmanager
+def get_connection():
+    """Context manager that checks out a pooled connection and always returns it."""
+    connection = create_connection()
+    try:
+        yield connection
+    finally:
+        close_connection(connection)
+
+class WriteBehindBuffer:
+    """
+    Collects rows in memory and writes them in batches from a background thread, every
+    `interval` seconds or as soon as `batch_size` rows are waiting. `write_batch(cursor, rows)`
+    performs the write and is committed once per batch. With `key`, a row replaces any
+    pending row with the same key, so only the latest value per key is written. With
+    `max_pending`, add() blocks while that many rows are waiting, bounding memory when the
+    database falls behind. Buffers are drained when the process exits. The rows of a batch
+    that fails are queued again and retried after `interval`, up to `retries` times; after
+    that, or when the failure happens while draining at exit, they are dropped and counted
+    in stats()["dropped_rows"]. A row that was re-added with the same key in the meantime
+    replaces the failed one.
+    """
+    def __init__(self, name, write_batch, key=None, interval=WRITE_BEHIND_INTERVAL, batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 max_pending=None, retries=WRITE_BEHIND_RETRIES):
+        self.name = name
+        self.write_batch = write_batch
+        self.key = key
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.retries = retries
+        self._pending = {}
+        self._attempts = {}  # Failed writes so far for re-queued rows, by key
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._flush_requested = 0
+        self._flushed = 0
+        self._stats = {"batches": 0, "rows": 0, "max_batch": 0, "last_batch": 0,
+                       "errors": 0, "retried_rows": 0, "dropped_rows": 0, "write_seconds": 0.0}
+        self._batch_sizes = Counter()
+        with _write_buffers_lock:
+            _write_buffers.append(self)
+
+    def add(self, row):
+        with self._cond:
+            if self.max_pending and self._thread is not None:
+                self._cond.wait_for(lambda: self._closed or len(self._pending) < self.max_pending)
+            if self._closed:
+                items = [(None, row, 0)]
+            else:
+                self._pending[self.key(row) if self.key else next(self._sequence)] = row
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+                    self._thread.start()
+                if len(self._pending) >= self.batch_size:
+                    self._cond.notify_all()
+                return
+        self._write(items, retry=False)  # Added after close(), e.g. during shutdown: write straight away
+
+    def _take(self):
+        """Removes and returns the pending rows as (key, row, failed attempts) items."""
+        items = [(key, row, self._attempts.get(key, 0)) for key, row in self._pending.items()]
+        self._pending.clear()
+        self._attempts.clear()
+        self._cond.notify_all()  # Wake producers waiting for room
+        return items
+
+    def _requeue(self, items):
+        with self._cond:
+            for key, row, attempts in items:
+                if key not in self._pending:
+                    self._pending[key] = row
+                    self._attempts[key] = attempts
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or len(self._pending) >= self.batch_size
+                                    or self._flush_requested > self._flushed, timeout=self.interval)
+                items = self._take()
+                requested = self._flush_requested
+                closed = self._closed
+            failed = self._write(items) if items else []
+            if failed:
+                # Pending flushes keep waiting until the rows are written or dropped
+                self._requeue(failed)
+                time.sleep(self.interval)
+                continue
+            with self._cond:
+                self._flushed = requested
+                self._cond.notify_all()
+            if closed:
+                return
+
+    def flush(self, timeout=None):
+        """Blocks until every row added so far has been written or dropped."""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                items = self._take()
+            else:
+                self._flush_requested += 1
+                requested = self._flush_requested
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._flushed >= requested, timeout=timeout)
+                return
+        if items:
+            self._write(items, retry=False)
+
+    def close(self):
+        """Stops the background thread after writing everything still buffered."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        with self._cond:
+            items = self._take()
+        if items:
+            self._write(items, retry=False)
+
+    def _write(self, items, retry=True):
+        """
+        Writes (key, row, failed attempts) items in batches and returns the items of failed
+        batches that should be retried, with their attempts counted. The rest are dropped.
+        """
+        failed = []
+        for start in range(0, len(items), self.batch_size):
+            batch_items = items[start:start + self.batch_size]
+            batch = [row for _, row, _ in batch_items]
+            started = time.perf_counter()
+            connection = None
+            try:
+                connection = create_connection()
+                cursor = connection.cursor()
+                try:
+                    self.write_batch(cursor, batch)
+                    connection.commit()
+                finally:
+                    cursor.close()
+            except (psycopg2.Error, pool.PoolError) as e:
+                print(f"Database Error: {e}")
+                if connection is not None and not connection.closed:
+                    connection.rollback()
+                retried = [(key, row, attempts + 1) for key, row, attempts in batch_items
+                           if retry and attempts < self.retries]
+                failed.extend(retried)
+                dropped = len(batch) - len(retried)
+                if dropped:
+                    print(f"Write-behind buffer {self.name}: dropped {dropped} rows after a failed write")
+                with self._cond:
+                    self._stats["errors"] += 1
+                    self._stats["retried_rows"] += len(retried)
+                    self._stats["dropped_rows"] += dropped
+                continue
+            finally:
+                close_connection(connection)
+            with self._cond:
+                self._stats["batches"] += 1
+                self._stats["rows"] += len(batch)
+                self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+                self._stats["last_batch"] = len(batch)
+                self._stats["write_seconds"] += time.perf_counter() - started
+                # Histogram of batch sizes in power-of-two buckets: 1, 2, 4, 8, ...
+                self._batch_sizes[1 << (len(batch) - 1).bit_length()] += 1
+        return failed
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+            stats["mean_batch"] = stats["rows"] / stats["batches"] if stats["batches"] else 0.0
+            stats["batch_sizes"] = dict(sorted(self._batch_sizes.items()))
+        return stats
+
+_write_buffers = []
+_write_buffers_lock = threading.Lock()
+
+def close_write_buffers():
+    """Drains every WriteBehindBuffer; runs at exit before the pool is closed."""
+    with _write_buffers_lock:
+        buffers = list(_write_buffers)
+    for buffer in buffers:
+        buffer.close()
+
+def close_all_connections():
+    global _pool
+    close_write_buffers()
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+        _last_used.clear()
+
+atexit.register(close_all_connections)
+
+def benchmark(iterations=200):
+    """Compares per-query latency of a fresh connection per operation against the pool."""
+    query = 'SELECT 1'
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        connection = psycopg2.connect(**connection_params())
+        cursor = connection.cursor()
+        cursor.execute(query)
+        cursor.fetchone()
+        cursor.close()
+        connection.close()
+    unpooled = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with get_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(query)
+            cursor.fetchone()
+            cursor.close()
+    pooled = (time.perf_counter() - start) / iterations
+
+    print(f"Unpooled: {unpooled * 1000:.3f} ms/op")
+    print(f"Pooled:   {pooled * 1000:.3f} ms/op ({unpooled / pooled:.1f}x faster)")
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,5 +1,5 @@
 from Registration.register_login import handle_registration, handle_login, handle_view_profile, handle_update_profile, handle_delete_profile
-from PortfolioManagement.port_mgmt import create_portfolio, edit_portfolio, delete_portfolio, view_portfolio_with_stocks, view_portfolios, add_stock, delete_stock
+from PortfolioManagement.port_mgmt import create_portfolio, edit_portfolio, delete_portfolio, view_portfolio_with_stocks, view_portfolios, add_stock, delete_stock, view_current_prices
 
 def profile_menu(user_id):
     while True:
@@ -33,7 +33,8 @@ def portfolio_management_menu(user_id):
         print("4. View Portfolio")
         print("5. Add Stock to Portfolio")
         print("6. Delete Stock from Portfolio")
-        print("7. Back to User Menu")
+        print("7. View Current Prices")
+        print("8. Back to User Menu")
         user_choice = input("Enter your choice: ").strip()
         
         if user_choice == '1':
@@ -49,6 +50,8 @@ def portfolio_management_menu(user_id):
         elif user_choice == '6':
             delete_stock(user_id)
         elif user_choice == '7':
+            view_current_prices(user_id)
+        elif user_choice == '8':
             break
         else:
             print("Invalid choice. Please try again.")
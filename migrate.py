@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import re
+import sys
+from psycopg2 import Error
+from database import create_connection, close_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.(up|down)\.sql$')
+MIGRATION_LOCK_ID = 716_001  # pg_advisory_xact_lock key so two runners never migrate at once
+
+# Queries on the hot paths, with the tables that must be reached through an index
+HOT_QUERIES = {
+    "get_portfolio": (
+        'SELECT "symbol", "shares", "purchase_price", "avg_purchase_price" FROM "Stocks" WHERE "portfolio_id" = %s',
+        ("000001",)
+    ),
+    "add_stock / remove_stock": (
+        'SELECT "shares" FROM "Stocks" WHERE "portfolio_id" = %s AND "symbol" = %s',
+        ("000001", "S1")
+    ),
+    "user holdings": (
+        'SELECT "symbol", "shares" FROM "Stocks" WHERE "user_id" = %s',
+        (1,)
+    ),
+    "load_history": (
+        'SELECT "role", "content", "response" FROM "ChatHistory" WHERE "session_id" = %s ORDER BY "timestamp"',
+        ("00000000-0000-0000-0000-000000000001",)
+    ),
+    "load_history_page": (
+        'SELECT "id", "timestamp", "role", "content", "response" FROM "ChatHistory" WHERE "session_id" = %s'
+        ' AND ("timestamp", "id") < (%s, %s) ORDER BY "timestamp" DESC, "id" DESC LIMIT 50',
+        ("00000000-0000-0000-0000-000000000001", "2030-01-01", 1)
+    )
+}
+
+def discover_migrations():
+    """Returns {version: {"name": ..., "up": path, "down": path}} for the files in migrations/."""
+    migrations = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        migrations.setdefault(version, {"name": name})[direction] = os.path.join(MIGRATIONS_DIR, filename)
+    return migrations
+
+def _ensure_version_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS "SchemaVersion" (
+            "version" INT PRIMARY KEY,
+            "name" VARCHAR(255) NOT NULL,
+            "applied_at" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def applied_versions(cursor):
+    _ensure_version_table(cursor)
+    cursor.execute('SELECT "version" FROM "SchemaVersion" ORDER BY "version"')
+    return [row[0] for row in cursor.fetchall()]
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+def apply(target=None):
+    """Applies pending migrations up to `target` (or all), each in its own transaction."""
+    migrations = discover_migrations()
+    connection = create_connection()
+    if not connection:
+        return {"success": False, "message": "Could not connect to the database."}
+    cursor = connection.cursor()
+    applied = []
+    try:
+        for version in sorted(migrations):
+            if target is not None and version > target:
+                break
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
+            if version in applied_versions(cursor):
+                connection.commit()
+                continue
+            migration = migrations[version]
+            cursor.execute(_read(migration["up"]))
+            cursor.execute('INSERT INTO "SchemaVersion" ("version", "name") VALUES (%s, %s)', (version, migration["name"]))
+            connection.commit()
+            applied.append(version)
+            print(f"Applied {version:04d}_{migration['name']}")
+        return {"success": True, "applied": applied}
+    except Error as e:
+        connection.rollback()
+        print(f"Database Error: {e}")
+        return {"success": False, "applied": applied, "message": str(e)}
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+def rollback(steps=1):
+    """Reverts the most recently applied `steps` migrations, newest first."""
+    migrations = discover_migrations()
+    connection = create_connection()
+    if not connection:
+        return {"success": False, "message": "Could not connect to the database."}
+    cursor = connection.cursor()
+    reverted = []
+    try:
+        for _ in range(steps):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
+            versions = applied_versions(cursor)
+            if not versions:
+                break
+            version = versions[-1]
+            migration = migrations.get(version)
+            if not migration or "down" not in migration:
+                raise Error(f"No down migration found for version {version:04d}")
+            cursor.execute(_read(migration["down"]))
+            cursor.execute('DELETE FROM "SchemaVersion" WHERE "version" = %s', (version,))
+            connection.commit()
+            reverted.append(version)
+            print(f"Rolled back {version:04d}_{migration['name']}")
+        return {"success": True, "reverted": reverted}
+    except Error as e:
+        connection.rollback()
+        print(f"Database Error: {e}")
+        return {"success": False, "reverted": reverted, "message": str(e)}
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+def status():
+    migrations = discover_migrations()
+    connection = create_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            versions = set(applied_versions(cursor))
+            connection.commit()
+            for version, migration in sorted(migrations.items()):
+                state = "applied" if version in versions else "pending"
+                print(f"{version:04d}_{migration['name']}: {state}")
+        except Error as e:
+            print(f"Database Error: {e}")
+        finally:
+            cursor.close()
+            close_connection(connection)
+
+def _seed(cursor, rows):
+    """Fills the hot tables with `rows` synthetic rows each; callers roll the transaction back afterwards."""
+    portfolios = max(rows // 20, 1)
+    cursor.execute('''
+        INSERT INTO "Users" ("user_id", "username", "email", "password_hash")
+        SELECT g, 'plan_check_' || g, 'plan_check_' || g || '@example.com', ''
+        FROM generate_series(1, 1000) g
+        ON CONFLICT DO NOTHING
+    ''')
+    cursor.execute('''
+        INSERT INTO "Portfolios" ("portfolio_id", "user_id", "name")
+        SELECT lpad(to_hex(g), 6, '0'), 1 + g %% 1000, 'plan_check_' || g
+        FROM generate_series(1, %s) g
+        ON CONFLICT DO NOTHING
+    ''', (portfolios,))
+    cursor.execute('''
+        INSERT INTO "Stocks" ("stock_id", "user_id", "portfolio_id", "symbol", "shares", "purchase_price", "avg_purchase_price")
+        SELECT lpad(to_hex(g), 6, '0'), 1 + (g / 20 + 1) %% 1000, lpad(to_hex(g / 20 + 1), 6, '0'), 'S' || (g %% 20), 10, 100, 100
+        FROM generate_series(0, %s - 1) g
+        ON CONFLICT DO NOTHING
+    ''', (rows,))
+    cursor.execute('''
+        INSERT INTO "ChatHistory" ("session_id", "role", "content")
+        SELECT md5((g / 50)::text)::uuid, 'user', 'plan check'
+        FROM generate_series(0, %s - 1) g
+    ''', (rows,))
+    cursor.execute('ANALYZE "Users", "Portfolios", "Stocks", "ChatHistory"')
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+def check_query_plans(seed_rows=0):
+    """
+    Runs EXPLAIN on the hot queries and fails if any of them scans "Stocks" or
+    "ChatHistory" sequentially. With seed_rows, the tables are first filled with that many
+    synthetic rows inside a transaction that is rolled back afterwards.
+    """
+    connection = create_connection()
+    if not connection:
+        return {"success": False, "message": "Could not connect to the database."}
+    cursor = connection.cursor()
+    failures = {}
+    try:
+        if seed_rows:
+            print(f"Seeding {seed_rows} rows (rolled back afterwards)...")
+            _seed(cursor, seed_rows)
+        for name, (query, params) in HOT_QUERIES.items():
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + query, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = list(_plan_nodes(plan[0]["Plan"]))
+            scans = [f'{node["Node Type"]} on {node.get("Relation Name", "?")}'
+                     + (f' using {node["Index Name"]}' if "Index Name" in node else '')
+                     for node in nodes if "Relation Name" in node]
+            sequential = [node for node in nodes if node["Node Type"] == "Seq Scan"
+                          and node.get("Relation Name") in ("Stocks", "ChatHistory")]
+            print(f"{name}: {'; '.join(scans)}")
+            if sequential:
+                failures[name] = scans
+        return {"success": not failures, "failures": failures}
+    except Error as e:
+        print(f"Database Error: {e}")
+        return {"success": False, "message": str(e)}
+    finally:
+        connection.rollback()
+        cursor.close()
+        close_connection(connection)
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply or roll back database schema migrations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="List migrations and whether they are applied")
+    apply_parser = commands.add_parser("apply", help="Apply pending migrations")
+    apply_parser.add_argument("--target", type=int, help="Stop after this version")
+    rollback_parser = commands.add_parser("rollback", help="Revert the latest migrations")
+    rollback_parser.add_argument("--steps", type=int, default=1)
+    check_parser = commands.add_parser("check-plans", help="Fail if a hot query uses a sequential scan")
+    check_parser.add_argument("--seed-rows", type=int, default=0,
+                              help="Temporarily fill the tables with this many rows first, e.g. 10000000")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        status()
+    elif args.command == "apply":
+        sys.exit(0 if apply(args.target)["success"] else 1)
+    elif args.command == "rollback":
+        sys.exit(0 if rollback(args.steps)["success"] else 1)
+    elif args.command == "check-plans":
+        result = check_query_plans(args.seed_rows)
+        if result.get("failures"):
+            print("Sequential scans found in: " + ", ".join(result["failures"]))
+        sys.exit(0 if result["success"] else 1)
+
+if __name__ == "__main__":
+    main()
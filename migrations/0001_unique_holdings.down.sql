@@ -0,0 +1,3 @@
+-- Back to the plain constraint from DB.sql; add_stock's ON CONFLICT ("portfolio_id", "symbol") depends on it
+ALTER TABLE "Stocks" DROP CONSTRAINT IF EXISTS "Stocks_portfolio_id_symbol_key";
+ALTER TABLE "Stocks" ADD CONSTRAINT "Stocks_portfolio_id_symbol_key" UNIQUE ("portfolio_id", "symbol");
@@ -0,0 +1,21 @@
+-- Merge holdings duplicated before "Stocks" had a unique ("portfolio_id", "symbol") constraint
+WITH "merged" AS (
+    SELECT "portfolio_id", "symbol", MIN("stock_id") AS "keep_id", SUM("shares") AS "shares",
+           SUM("avg_purchase_price" * "shares") / NULLIF(SUM("shares"), 0) AS "avg_purchase_price"
+    FROM "Stocks"
+    GROUP BY "portfolio_id", "symbol"
+    HAVING COUNT(*) > 1
+)
+UPDATE "Stocks" s
+SET "shares" = m."shares", "avg_purchase_price" = COALESCE(m."avg_purchase_price", s."avg_purchase_price")
+FROM "merged" m
+WHERE s."stock_id" = m."keep_id";
+
+DELETE FROM "Stocks" s
+USING "Stocks" k
+WHERE s."portfolio_id" = k."portfolio_id" AND s."symbol" = k."symbol" AND s."stock_id" > k."stock_id";
+
+-- The unique index also covers the columns list_portfolio_stocks reads, allowing index-only scans
+ALTER TABLE "Stocks" DROP CONSTRAINT IF EXISTS "Stocks_portfolio_id_symbol_key";
+ALTER TABLE "Stocks" ADD CONSTRAINT "Stocks_portfolio_id_symbol_key"
+    UNIQUE ("portfolio_id", "symbol") INCLUDE ("shares", "purchase_price", "avg_purchase_price");
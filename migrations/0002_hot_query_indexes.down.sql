@@ -0,0 +1,2 @@
+DROP INDEX IF EXISTS "ChatHistory_session_id_timestamp_idx";
+DROP INDEX IF EXISTS "Stocks_user_id_idx";
@@ -0,0 +1,5 @@
+-- load_history: WHERE "session_id" = %s ORDER BY "timestamp"
+CREATE INDEX IF NOT EXISTS "ChatHistory_session_id_timestamp_idx" ON "ChatHistory" ("session_id", "timestamp");
+
+-- Per-user holdings (valuation, analytics, current prices) and ON DELETE CASCADE from "Users"
+CREATE INDEX IF NOT EXISTS "Stocks_user_id_idx" ON "Stocks" ("user_id");
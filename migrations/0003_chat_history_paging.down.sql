@@ -0,0 +1,3 @@
+DROP TABLE IF EXISTS "ChatSummaries";
+CREATE INDEX IF NOT EXISTS "ChatHistory_session_id_timestamp_idx" ON "ChatHistory" ("session_id", "timestamp");
+DROP INDEX IF EXISTS "ChatHistory_session_id_timestamp_id_idx";
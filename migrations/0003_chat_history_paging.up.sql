@@ -0,0 +1,12 @@
+-- load_history_page: WHERE "session_id" = %s AND ("timestamp", "id") < (%s, %s) ORDER BY "timestamp" DESC, "id" DESC
+-- The new index also covers the plain (session_id, timestamp) lookups, so the 0002 index is dropped
+CREATE INDEX IF NOT EXISTS "ChatHistory_session_id_timestamp_id_idx" ON "ChatHistory" ("session_id", "timestamp", "id");
+DROP INDEX IF EXISTS "ChatHistory_session_id_timestamp_idx";
+
+-- Rolling summary of the turns that no longer fit the chatbot's context budget
+CREATE TABLE IF NOT EXISTS "ChatSummaries" (
+    "session_id" UUID PRIMARY KEY,
+    "summary" TEXT NOT NULL,
+    "summarized_through" TIMESTAMP NOT NULL,
+    "updated_at" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
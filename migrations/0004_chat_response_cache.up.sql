@@ -0,0 +1,8 @@
+-- Persistent tier of the chatbot response cache, keyed by a hash of the normalized message window
+CREATE TABLE IF NOT EXISTS "ChatResponseCache" (
+    "key" CHAR(64) PRIMARY KEY,
+    "response" TEXT NOT NULL,
+    "created_at" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    "expires_at" TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS "ChatResponseCache_expires_at_idx" ON "ChatResponseCache" ("expires_at");
@@ -0,0 +1,130 @@
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GUI_WORKERS = int(os.getenv('GUI_WORKERS', 4))  # Threads running database and quote calls for the GUI
+GUI_POLL_INTERVAL = 50  # Milliseconds between checks for finished tasks
+
+class Task:
+    def __init__(self, key, description, on_success, on_error, owner, cancel_hook, cancellable=True):
+        self.key = key
+        self.description = description
+        self.on_success = on_success
+        self.on_error = on_error
+        self.owner = owner
+        self.cancel_hook = cancel_hook
+        self.cancellable = cancellable
+        self.cancelled = False
+        self.future = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+        if self.cancel_hook is not None:
+            self.cancel_hook()
+
+class TaskRunner:
+    """
+    Runs blocking calls for a Tk application on a thread pool and hands the results back to
+    callbacks on the Tk thread, by polling a queue with after(). Tasks are keyed: submitting a
+    key that is already running returns the running task instead of doing the work twice, or
+    with replace=True cancels it and starts over. Callbacks are dropped for cancelled tasks
+    and for tasks whose `owner` widget has been destroyed in the meantime. Writes are submitted
+    with cancellable=False: once started they may already have committed, so they are never
+    cancelled and their result is always delivered, even if their `owner` is gone.
+    """
+    def __init__(self, root, max_workers=GUI_WORKERS, on_busy=None, on_error=None, poll_interval=GUI_POLL_INTERVAL):
+        self.root = root
+        self.on_busy = on_busy
+        self.on_error = on_error
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-worker")
+        self._results = queue.Queue()
+        self._tasks = {}  # Running tasks by key; only touched from the Tk thread
+        self._polling = False
+
+    def submit(self, key, fn, *args, on_success=None, on_error=None, owner=None, description=None,
+               cancel=None, replace=False, cancellable=True):
+        """
+        Runs fn(*args) on a worker thread. on_success(result) or on_error(exception) is then
+        called on the Tk thread. `cancel` is an optional callable that interrupts fn itself.
+        With cancellable=False, cancel(), cancel_all() and replace leave the task running.
+        """
+        running = self._tasks.get(key)
+        if running is not None:
+            if not replace or not running.cancellable:
+                return running
+            self.cancel(key)
+        task = Task(key, description, on_success, on_error or self.on_error, owner, cancel, cancellable)
+        self._tasks[key] = task
+        task.future = self._executor.submit(fn, *args)
+        task.future.add_done_callback(lambda future: self._results.put(task))
+        self._notify()
+        self._schedule_poll()
+        return task
+
+    def is_running(self, key):
+        return key in self._tasks
+
+    def cancel(self, key):
+        task = self._tasks.get(key)
+        if task is not None and task.cancellable:
+            del self._tasks[key]
+            task.cancel()
+            self._notify()
+
+    def cancel_all(self):
+        for key in list(self._tasks):
+            self.cancel(key)
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                task = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if self._tasks.get(task.key) is task:
+                del self._tasks[task.key]
+                self._notify()
+            self._deliver(task)
+        if self._tasks:
+            self._schedule_poll()
+
+    def _deliver(self, task):
+        if task.cancelled or task.future.cancelled():
+            return
+        # Writes are reported even when their window is gone, since they may have committed
+        if task.cancellable and task.owner is not None and not task.owner.winfo_exists():
+            return
+        try:
+            result = task.future.result()
+        except BaseException as e:  # Includes asyncio.CancelledError raised inside the worker
+            if task.on_error is not None:
+                task.on_error(e)
+            return
+        try:
+            if task.on_success is not None:
+                task.on_success(result)
+        except Exception as e:
+            if task.on_error is not None:
+                task.on_error(e)
+
+    def _notify(self):
+        """Calls on_busy(descriptions, cancellable) with whether any running task can be cancelled."""
+        if self.on_busy is not None:
+            self.on_busy([task.description for task in self._tasks.values() if task.description],
+                         any(task.cancellable for task in self._tasks.values()))
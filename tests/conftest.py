@@ -0,0 +1,69 @@
+import os
+import sys
+import uuid
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import close_all_connections, connection_params
+from PortfolioManagement import stock_price
+from PortfolioManagement.price_cache import QuoteCache
+
+@pytest.fixture(scope="session")
+def database():
+    """
+    Direct connection to the database configured by DB_HOST/DB_USER/DB_PASSWORD/DB_NAME, with
+    DB.sql loaded and migrations applied. Tests using it are skipped when none is reachable.
+    """
+    try:
+        connection = psycopg2.connect(connect_timeout=3, **connection_params())
+    except psycopg2.Error as e:
+        pytest.skip(f"PostgreSQL test database not available: {e}")
+    connection.autocommit = True
+    cursor = connection.cursor()
+    cursor.execute("SELECT to_regclass('\"Stocks\"'), to_regclass('\"SchemaVersion\"')")
+    if None in cursor.fetchone():
+        connection.close()
+        pytest.skip("Test database has no schema; load DB.sql and run python migrate.py apply")
+    cursor.close()
+    yield connection
+    connection.close()
+    close_all_connections()
+
+@pytest.fixture
+def throwaway_database(database):
+    """
+    The test database, for tests that drop tables and their rows. Only used when TEST_THROWAWAY_DB
+    names the configured DB_NAME, confirming that the database holds nothing worth keeping.
+    """
+    name = connection_params()["database"]
+    if not name or os.getenv("TEST_THROWAWAY_DB") != name:
+        pytest.skip("Set TEST_THROWAWAY_DB to DB_NAME to run tests that drop tables")
+    return database
+
+@pytest.fixture
+def user(database):
+    """A throwaway user with an empty "Main" portfolio; deleting the user cascades to its data."""
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    cursor = database.cursor()
+    cursor.execute('INSERT INTO "Users" ("username", "email", "password_hash") VALUES (%s, %s, %s) RETURNING "user_id"',
+                   (name, f"{name}@example.com", "x"))
+    user_id = cursor.fetchone()[0]
+    cursor.execute('INSERT INTO "Portfolios" ("user_id", "name") VALUES (%s, %s)', (user_id, "Main"))
+    yield user_id
+    cursor.execute('DELETE FROM "Users" WHERE "user_id" = %s', (user_id,))
+    cursor.close()
+
+@pytest.fixture
+def quotes():
+    """Serves quotes from a fresh in-memory cache, so no test reaches the network for a known symbol."""
+    previous = stock_price.get_quote_cache()
+    cache = QuoteCache(ttl=3600, path=None)
+
+    def set_prices(prices):
+        for symbol, price in prices.items():
+            cache.set(symbol, price)
+    stock_price.set_quote_cache(cache)
+    yield set_prices
+    stock_price.set_quote_cache(previous)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+from PortfolioManagement import analytics
+from PortfolioManagement.analytics import METRICS, compute_metrics, simple_returns
+
+def test_metrics_match_pandas():
+    rng = np.random.default_rng(0)
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 3)), axis=0))
+    metrics = compute_metrics(values, risk_free_rate=0.0)
+
+    returns = pd.DataFrame(values).pct_change().iloc[1:]
+    np.testing.assert_allclose(metrics["twr"], values[-1] / values[0] - 1)
+    np.testing.assert_allclose(metrics["annualized_volatility"], returns.std() * np.sqrt(analytics.TRADING_DAYS))
+    np.testing.assert_allclose(metrics["sharpe"], returns.mean() / returns.std() * np.sqrt(analytics.TRADING_DAYS))
+    drawdowns = (pd.DataFrame(values) / pd.DataFrame(values).cummax() - 1).min()
+    np.testing.assert_allclose(metrics["max_drawdown"], drawdowns)
+    np.testing.assert_allclose(metrics["return_1m"], values[-1] / values[-22] - 1)
+
+@pytest.mark.parametrize("rows", [0, 1])
+def test_too_few_dates_give_nan_metrics(rows):
+    values = np.full((rows, 2), 100.0)
+    assert simple_returns(values).shape == (0, 2)
+    metrics = compute_metrics(values)
+    assert set(metrics) == set(METRICS)
+    for name in METRICS:
+        assert metrics[name].shape == (2,) and np.isnan(metrics[name]).all()
+
+def test_analyze_portfolios_with_empty_price_store(monkeypatch):
+    holdings = {"user_id": np.array([1, 1]), "portfolio_id": np.array(["p1", "p1"]),
+                "portfolio_name": np.array(["Main", "Main"]), "symbol": np.array(["AAPL", "MSFT"]),
+                "shares": np.array([10.0, 5.0])}
+    monkeypatch.setattr(analytics, "load_holdings", lambda user_id: holdings)
+    monkeypatch.setattr(analytics, "get_price_matrix",
+                        lambda symbols, start, end, field: pd.DataFrame({symbol: pd.Series(dtype=float) for symbol in symbols}))
+
+    metrics = analytics.analyze_portfolios(1)
+    assert list(metrics.index) == ["p1"]
+    assert metrics.loc["p1", list(METRICS)].isna().all()
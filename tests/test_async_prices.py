@@ -0,0 +1,157 @@
+import asyncio
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pytest
+from PortfolioManagement.async_prices import AsyncPriceFetcher, fetch_prices
+
+class FakeQuoteServer:
+    """
+    Local quote server: GET /quote/<symbol> answers {"price": ...} after `delay` seconds,
+    404 for unknown symbols, and 503 for the first `failures[symbol]` requests of a symbol.
+    Tracks how many requests are in flight at once.
+    """
+    def __init__(self, prices, failures=None, delay=0.0):
+        self.prices = prices
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                symbol = self.path.rsplit("/", 1)[-1]
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    failing = server.failures.get(symbol, 0) > 0
+                    if failing:
+                        server.failures[symbol] -= 1
+                try:
+                    time.sleep(server.delay)
+                    if failing:
+                        self._send(503, {"error": "try again"})
+                    elif symbol in server.prices:
+                        self._send(200, {"price": server.prices[symbol]})
+                    else:
+                        self._send(404, {"error": "unknown symbol"})
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fetch_quote(self):
+        """Returns a quote-source coroutine function for AsyncPriceFetcher that reads from this server."""
+        def get(symbol):
+            try:
+                with urllib.request.urlopen(f"{self.url}/quote/{symbol}", timeout=5) as response:
+                    return json.loads(response.read())["price"]
+            except urllib.error.HTTPError as e:
+                raise LookupError(f"HTTP {e.code} for {symbol}") from None
+
+        async def fetch_quote(symbol):
+            return await asyncio.get_running_loop().run_in_executor(None, get, symbol)
+        return fetch_quote
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+@pytest.fixture
+def quote_server():
+    servers = []
+
+    def start(prices, failures=None, delay=0.0):
+        servers.append(FakeQuoteServer(prices, failures, delay))
+        return servers[-1]
+    yield start
+    for server in servers:
+        server.stop()
+
+def make_fetcher(server, **kwargs):
+    options = dict(concurrency=4, rate=1000, burst=1000, retries=2, backoff=0.01, use_cache=False)
+    options.update(kwargs)
+    return AsyncPriceFetcher(server.fetch_quote(), **options)
+
+def test_prices_align_with_input_and_failures_are_reported(quote_server):
+    server = quote_server({"AAPL": 190.5, "MSFT": 410.0, "FLAKY": 12.25}, failures={"FLAKY": 2})
+    prices, failures = fetch_prices(["aapl", " MSFT", "NOPE", "FLAKY", "AAPL"], make_fetcher(server))
+
+    np.testing.assert_array_equal(prices, [190.5, 410.0, np.nan, 12.25, 190.5])
+    assert list(failures) == ["NOPE"]
+    # FLAKY succeeds on its third attempt; NOPE is tried once plus two retries
+    assert server.requests == 2 + 3 + 3
+
+def test_concurrency_is_bounded(quote_server):
+    prices = {f"S{i}": float(i) for i in range(40)}
+    server = quote_server(prices, delay=0.02)
+    result, failures = fetch_prices(list(prices), make_fetcher(server, concurrency=3))
+
+    assert not failures
+    np.testing.assert_array_equal(result, list(prices.values()))
+    assert server.max_in_flight == 3
+
+def test_rate_limit(quote_server):
+    prices = {f"S{i}": float(i) for i in range(12)}
+    server = quote_server(prices)
+    started = time.perf_counter()
+    fetch_prices(list(prices), make_fetcher(server, rate=20, burst=2))
+
+    # Two requests go out at once, the other ten wait for tokens at 20 per second
+    assert time.perf_counter() - started >= 10 / 20 * 0.9
+
+def test_cancel_from_another_thread_and_reuse(quote_server):
+    prices = {f"S{i}": float(i) for i in range(20)}
+    server = quote_server(prices, delay=0.1)
+    fetcher = make_fetcher(server, concurrency=2)
+    threading.Timer(0.15, fetcher.cancel).start()
+
+    started = time.perf_counter()
+    with pytest.raises(asyncio.CancelledError):
+        fetch_prices(list(prices), fetcher)
+    assert time.perf_counter() - started < 1.0
+    assert server.requests < len(prices)
+
+    server.delay = 0.0
+    result, failures = fetch_prices(["S1", "S2"], fetcher)
+    assert not failures
+    np.testing.assert_array_equal(result, [1.0, 2.0])
+
+def test_cancel_before_the_fetch_starts(quote_server):
+    server = quote_server({"AAPL": 190.5})
+    fetcher = make_fetcher(server)
+    fetcher.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        fetch_prices(["AAPL"], fetcher)
+    assert server.requests == 0
+
+    result, failures = fetch_prices(["AAPL"], fetcher)
+    assert not failures and result[0] == 190.5
@@ -0,0 +1,24 @@
+import database as db
+from Registration import auth, hashing
+
+def test_login_upgrades_hash_without_holding_a_connection(database, user, monkeypatch):
+    monkeypatch.setattr(hashing, "BCRYPT_ROUNDS", 5)
+    cursor = database.cursor()
+    cursor.execute('UPDATE "Users" SET "password_hash" = %s WHERE "user_id" = %s RETURNING "username"',
+                   (hashing._hash("secret", 4), user))
+    username = cursor.fetchone()[0]
+
+    # Hash in the calling thread and record whether it holds a pooled connection meanwhile
+    held = []
+    def run(fn, *args):
+        held.append(getattr(db._local, "connection", None))
+        return fn(*args)
+    monkeypatch.setattr(hashing, "_run", run)
+
+    assert auth.authenticate_user(username, "wrong")["success"] is False
+    assert auth.authenticate_user(username, "secret") == {"success": True, "user_id": user}
+    assert held == [None] * 3
+
+    cursor.execute('SELECT "password_hash" FROM "Users" WHERE "user_id" = %s', (user,))
+    assert hashing.hash_rounds(cursor.fetchone()[0]) == 5
+    cursor.close()
@@ -0,0 +1,43 @@
+from decimal import Decimal
+from PortfolioManagement.bulk_import import import_holdings
+
+def holdings(database, user_id):
+    cursor = database.cursor()
+    cursor.execute('SELECT "symbol", "shares", "avg_purchase_price" FROM "Stocks" WHERE "user_id" = %s', (user_id,))
+    rows = {symbol: (shares, avg) for symbol, shares, avg in cursor.fetchall()}
+    cursor.close()
+    return rows
+
+def test_import_merges_into_existing_holdings(database, user, quotes, tmp_path):
+    quotes({"AAPL": 130.0, "MSFT": 50.0})
+    cursor = database.cursor()
+    cursor.execute('''
+        INSERT INTO "Stocks" ("user_id", "portfolio_id", "symbol", "shares", "purchase_price", "avg_purchase_price")
+        SELECT %s, "portfolio_id", 'AAPL', 10, 100, 100 FROM "Portfolios" WHERE "user_id" = %s
+    ''', (user, user))
+    cursor.close()
+    path = tmp_path / "trades.csv"
+    path.write_text("Account,Ticker,Quantity,Price\n"
+                    "Main,AAPL,4,$120\n"
+                    "Main,aapl,6,120\n"
+                    "Main,MSFT,5,\n"
+                    "Other,XOM,1,90\n"
+                    "Main,MSFT,-3,10\n")
+
+    report = import_holdings(user, str(path))
+
+    assert report["success"], report
+    assert (report["imported_rows"], report["rejected_rows"]) == (3, 2)
+    assert (report["holdings_added"], report["holdings_updated"]) == (1, 1)
+    assert report["unknown_portfolios"] == ["Other"]
+    assert holdings(database, user) == {"AAPL": (20, Decimal("110.00")), "MSFT": (5, Decimal("50.00"))}
+
+def test_malformed_csv_is_reported_and_rolled_back(database, user, quotes, tmp_path):
+    path = tmp_path / "trades.csv"
+    path.write_text('portfolio,"' + "x" * 200_000 + '",shares\nMain,AAPL,5\n')
+
+    report = import_holdings(user, str(path))
+
+    assert not report["success"]
+    assert "field larger than field limit" in report["errors"][0]
+    assert holdings(database, user) == {}
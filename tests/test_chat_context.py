@@ -0,0 +1,43 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from psycopg2.extras import execute_values
+from Chatbot.chat_context import ChatContext, estimate_tokens
+
+@pytest.fixture
+def session(database):
+    """Seeds a session of 40 alternating turns of about 100 tokens each into "ChatHistory"."""
+    session_id = str(uuid.uuid4())
+    start = datetime.now() - timedelta(minutes=5)
+    rows = [(session_id, "user", f"question {i} " + "x" * 400, None, start + timedelta(seconds=i)) if i % 2 == 0
+            else (session_id, "assistant", "", f"answer {i} " + "y" * 400, start + timedelta(seconds=i))
+            for i in range(40)]
+    cursor = database.cursor()
+    execute_values(cursor, 'INSERT INTO "ChatHistory" ("session_id", "role", "content", "response", "timestamp") VALUES %s', rows)
+    yield session_id
+    cursor.execute('DELETE FROM "ChatHistory" WHERE "session_id" = %s', (session_id,))
+    cursor.execute('DELETE FROM "ChatSummaries" WHERE "session_id" = %s', (session_id,))
+    cursor.close()
+
+def test_resumed_session_folds_older_turns_into_the_summary(session):
+    folded = []
+
+    def summarize(summary, messages):
+        folded.extend(message["content"].split()[1] for message in messages)
+        return f"{summary or ''} {len(messages)} turns".strip()
+
+    context = ChatContext(session, "system", summarize=summarize, budget=1000)
+    kept = [message["content"].split()[1] for message in context.turns]
+    # Every turn is either folded into the summary or sent verbatim, in order
+    assert folded + kept == [str(i) for i in range(40)]
+    assert sum(estimate_tokens(message) for message in context.messages()) <= 1000
+
+    resumed = ChatContext(session, "system", summarize=summarize, budget=1000)
+    assert resumed.summary == context.summary
+    assert [message["content"] for message in resumed.turns] == [message["content"] for message in context.turns]
+
+def test_without_summarize_older_turns_are_dropped(session):
+    context = ChatContext(session, "system", budget=1000)
+    assert context.summary is None
+    assert context.turns[-1]["content"].startswith("answer 39")
+    assert sum(estimate_tokens(message) for message in context.turns) <= 1000 - estimate_tokens(context.system)
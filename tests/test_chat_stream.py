@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+import pytest
+from openai import OpenAI
+from Chatbot.chat_stream import ChatStream, FakeStreamingServer
+from Chatbot.portfolio_tools import PortfolioChat
+from Chatbot.response_cache import ResponseCache
+
+MESSAGES = [{"role": "system", "content": "You are a financial assistant."},
+            {"role": "user", "content": "What is the Sharpe ratio?"}]
+
+@pytest.fixture
+def server():
+    with FakeStreamingServer(tokens=20, token_delay=0.005, tool="get_portfolio_summary") as server:
+        yield server
+
+def client_for(server):
+    return OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+
+def test_stream_yields_text_then_caches_and_saves(server):
+    cache = ResponseCache(persist=False)
+    saved = []
+    parts = list(ChatStream(client_for(server), MESSAGES, cache=cache, on_complete=saved.append))
+
+    expected = "".join(f"token{i} " for i in range(20))
+    assert len(parts) == 20 and "".join(parts) == expected
+    assert saved == [expected.strip()]
+
+    # The repeated question is answered from the cache without another request
+    again = ChatStream(client_for(server), MESSAGES, cache=cache, on_complete=saved.append)
+    assert list(again) == [expected.strip()]
+    assert server.requests == 1 and len(saved) == 2
+
+def test_cancel_mid_stream_saves_nothing(server):
+    server.tokens, server.token_delay = 200, 0.01
+    cache = ResponseCache(persist=False)
+    saved = []
+    stream = ChatStream(client_for(server), MESSAGES, cache=cache, on_complete=saved.append)
+
+    received = 0
+    for _ in stream:
+        received += 1
+        if received == 5:
+            threading.Thread(target=stream.cancel).start()
+    assert 5 <= received < 200
+    assert stream.cancelled and not stream.completed
+    assert saved == [] and cache.memory.stats()["size"] == 0
+
+    deadline = time.monotonic() + 2
+    while server.disconnects == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.disconnects == 1
+
+class FakeSnapshots:
+    def get(self, user_id):
+        return {"version": 1, "as_of": "2026-01-02T10:00:00", "total": {"market_value": 1234.5}, "sectors": {},
+                "portfolios": []}
+
+def test_portfolio_chat_streams_after_tool_calls(server):
+    chat = PortfolioChat(7, snapshots=FakeSnapshots(), cache=ResponseCache(persist=False))
+    saved = []
+    parts = list(chat.stream(client_for(server), MESSAGES, on_complete=saved.append))
+
+    assert len(parts) == 20 and saved == ["".join(parts).strip()]
+    assert chat.tool_calls == 1 and server.requests == 2
+    tool_message = server.messages[-1]
+    assert tool_message["role"] == "tool"
+    assert json.loads(tool_message["content"])["total"] == {"market_value": 1234.5}
@@ -0,0 +1,27 @@
+import migrate
+
+def unique_holdings_constraint(database):
+    cursor = database.cursor()
+    cursor.execute('''
+        SELECT pg_get_constraintdef(c.oid) FROM pg_constraint c
+        WHERE c.conrelid = '"Stocks"'::regclass AND c.conname = 'Stocks_portfolio_id_symbol_key'
+    ''')
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+def test_hot_queries_use_indexes(database):
+    result = migrate.check_query_plans(seed_rows=20_000)
+    assert result["success"], result
+
+def test_rollback_and_reapply(throwaway_database):
+    versions = sorted(migrate.discover_migrations())
+    assert "INCLUDE" in unique_holdings_constraint(throwaway_database)
+    try:
+        assert migrate.rollback(steps=len(versions))["reverted"] == versions[::-1]
+        # The base schema's constraint is back, so add_stock's upsert still has its arbiter
+        assert unique_holdings_constraint(throwaway_database) == "UNIQUE (portfolio_id, symbol)"
+    finally:
+        result = migrate.apply()
+    assert result["applied"] == versions
+    assert "INCLUDE" in unique_holdings_constraint(throwaway_database)
@@ -0,0 +1,61 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PortfolioManagement import portfolio_service, valuation
+from PortfolioManagement.port_mgmt import format_portfolio
+
+def test_concurrent_add_stock_keeps_every_purchase(database, user, monkeypatch):
+    # Each purchase gets its own price, so a lost update would show in the average as well as the shares
+    prices = itertools.count(100)
+    purchases = []
+    lock = threading.Lock()
+
+    def next_price(symbol):
+        with lock:
+            price = float(next(prices))
+            purchases.append(price)
+            return price
+    monkeypatch.setattr(portfolio_service, "get_current_stock_price", next_price)
+
+    threads, buys, shares = 8, 5, 3
+    barrier = threading.Barrier(threads)
+
+    def buy(_):
+        barrier.wait()
+        return [portfolio_service.add_stock(user, "Main", "AAPL", shares) for _ in range(buys)]
+
+    with ThreadPoolExecutor(threads) as executor:
+        results = [result for batch in executor.map(buy, range(threads)) for result in batch]
+
+    assert all(result["success"] for result in results), results
+    assert sum(not result["updated"] for result in results) == 1
+    cursor = database.cursor()
+    cursor.execute('SELECT COUNT(*), SUM("shares"), SUM("avg_purchase_price") FROM "Stocks" WHERE "user_id" = %s', (user,))
+    rows, total_shares, average = cursor.fetchone()
+    cursor.close()
+    assert rows == 1
+    assert total_shares == threads * buys * shares
+    # avg_purchase_price is rounded to cents after every purchase
+    assert abs(float(average) - sum(purchases) / len(purchases)) < 0.05
+
+def test_rename_to_a_taken_name_is_rejected(database, user):
+    assert portfolio_service.create_portfolio(user, "Income")["success"]
+
+    response = portfolio_service.update_portfolio(user, "Main", "Income", "renamed")
+
+    assert response == {"success": False, "message": "New portfolio name must be unique within the same user."}
+    names = [portfolio["name"] for portfolio in portfolio_service.list_portfolios(user)["portfolios"]]
+    assert sorted(names) == ["Income", "Main"]
+    assert portfolio_service.update_portfolio(user, "Main", "Growth")["success"]
+
+def test_viewing_a_portfolio_values_the_loaded_stocks(database, user, quotes, monkeypatch):
+    quotes({"AAPL": 150.0})
+    assert portfolio_service.add_stock(user, "Main", "AAPL", 4)["success"]
+    response = portfolio_service.get_portfolio(user, "Main")
+
+    def load_holdings(*args):
+        raise AssertionError("holdings were queried again")
+    monkeypatch.setattr(valuation, "load_holdings", load_holdings)
+    text = format_portfolio(response["portfolio"], response["stocks"])
+    assert "AAPL: Current Price: $150.00, Market Value: $600.00" in text
+    assert "Total Market Value: $600.00" in text
@@ -0,0 +1,26 @@
+from PortfolioManagement.portfolio_snapshot import SNAPSHOT_LOCK_STRIPES, PortfolioSnapshots
+
+def test_build_overtaken_by_invalidate_is_not_cached():
+    holdings = {"shares": 10}
+    snapshots = None
+
+    def build(user_id):
+        snapshot = {"user_id": user_id, "shares": holdings["shares"]}
+        if snapshots.builds == 0:
+            # A write lands while the first build is running
+            holdings["shares"] = 20
+            snapshots.invalidate(user_id)
+        return snapshot
+    snapshots = PortfolioSnapshots(build=build)
+
+    assert snapshots.get(1)["shares"] == 10
+    assert snapshots.get(1)["shares"] == 20
+    assert snapshots.get(1)["shares"] == 20
+    assert snapshots.builds == 2
+
+def test_locks_do_not_grow_with_users():
+    snapshots = PortfolioSnapshots(build=lambda user_id: {"user_id": user_id})
+    for user_id in range(1000):
+        snapshots.get(user_id)
+        snapshots.invalidate(user_id)
+    assert len(snapshots._locks) == len(snapshots._generations) == SNAPSHOT_LOCK_STRIPES
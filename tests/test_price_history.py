@@ -0,0 +1,53 @@
+from datetime import date
+import pandas as pd
+import pytest
+from PortfolioManagement import price_history
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    """Points the store at a temporary directory and serves one row per weekday instead of yfinance."""
+    requests = []
+
+    def download(symbols, start, end):
+        requests.append((tuple(symbols), start, end))
+        index = pd.bdate_range(start, end, inclusive="left")
+        frame = pd.DataFrame({"Close": 100.0, "Adj Close": 99.0, "Volume": 1000.0}, index=index)
+        return {symbol: frame for symbol in symbols}
+
+    monkeypatch.setattr(price_history, "PRICE_HISTORY_DIR", str(tmp_path))
+    monkeypatch.setattr(price_history, "_download", download)
+    return requests
+
+def test_only_missing_ranges_are_downloaded(downloads):
+    price_history.update_history(["AAPL", "MSFT"], "2024-01-01", "2024-02-01")
+    price_history.update_history(["AAPL", "MSFT"], "2024-01-01", "2024-03-01")
+    price_history.update_history(["AAPL"], "2024-01-15", "2024-02-15")
+
+    assert downloads == [(("AAPL", "MSFT"), date(2024, 1, 1), date(2024, 2, 1)),
+                         (("AAPL", "MSFT"), date(2024, 2, 1), date(2024, 3, 1))]
+    history = price_history.load_history("AAPL", "2024-01-01", "2024-03-01", update=False)
+    assert len(history) == len(pd.bdate_range("2024-01-01", "2024-03-01", inclusive="left"))
+    assert history.index.is_unique and history.index.is_monotonic_increasing
+
+def test_range_without_trading_days_is_not_downloaded_again(downloads):
+    price_history.update_history(["AAPL"], "2024-01-01", "2024-01-06")
+    # 2024-01-06 and 2024-01-07 are a weekend
+    price_history.update_history(["AAPL"], "2024-01-01", "2024-01-08")
+    price_history.update_history(["AAPL"], "2024-01-01", "2024-01-08")
+
+    assert downloads == [(("AAPL",), date(2024, 1, 1), date(2024, 1, 6)),
+                         (("AAPL",), date(2024, 1, 6), date(2024, 1, 8))]
+    assert price_history._read_meta("AAPL") == (date(2024, 1, 1), date(2024, 1, 8))
+
+def test_failed_download_is_retried(downloads, monkeypatch):
+    price_history.update_history(["AAPL"], "2024-01-01", "2024-01-08")
+    working = price_history._download
+    # yfinance returns an empty frame when a request fails
+    monkeypatch.setattr(price_history, "_download", lambda symbols, start, end: {symbol: pd.DataFrame() for symbol in symbols})
+    price_history.update_history(["AAPL"], "2024-01-01", "2024-01-10")
+    assert price_history._read_meta("AAPL") == (date(2024, 1, 1), date(2024, 1, 8))
+
+    monkeypatch.setattr(price_history, "_download", working)
+    price_history.update_history(["AAPL"], "2024-01-01", "2024-01-10")
+    assert price_history._read_meta("AAPL") == (date(2024, 1, 1), date(2024, 1, 10))
+    assert len(price_history.load_history("AAPL", "2024-01-01", "2024-01-10", update=False)) == 7
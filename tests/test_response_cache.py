@@ -0,0 +1,43 @@
+import uuid
+from types import SimpleNamespace
+from Chatbot.response_cache import PostgresResponseStore, ResponseCache, StubClient, cache_key
+
+SYSTEM = {"role": "system", "content": "You are a financial assistant."}
+
+def conversation(*turns):
+    roles = ["user", "assistant"]
+    return [SYSTEM] + [{"role": roles[i % 2], "content": content} for i, content in enumerate(turns)]
+
+def test_follow_ups_are_keyed_on_the_whole_conversation():
+    cache = ResponseCache(persist=False)
+    stub = StubClient(latency=0)
+
+    apple = cache.complete(stub, conversation("Tell me about AAPL", "Apple makes phones.", "And its dividend?"))
+    exxon = cache.complete(stub, conversation("Tell me about XOM", "Exxon sells oil.", "And its dividend?"))
+    assert stub.calls == 2 and apple == exxon == "Answer to: And its dividend?"
+
+    # Normalized repeats of the same conversation still hit
+    cache.complete(stub, conversation("what is beta"))
+    cache.complete(stub, conversation("What is  BETA?"))
+    assert stub.calls == 3
+    assert cache_key(conversation("What is beta?")) != cache_key(conversation("What is beta?"), scope="portfolio:1")
+
+def test_delete_removes_a_response_from_both_tiers(database):
+    cache = ResponseCache(persist=True)
+    key = cache_key(conversation("What is an ETF?"), scope=f"test:{uuid.uuid4()}")
+    cache.set(key, "A fund traded on an exchange.")
+    assert PostgresResponseStore().get(key) is not None
+
+    cache.delete(key)
+    assert cache.get(key) is None
+    assert PostgresResponseStore().get(key) is None
+
+def test_clear_empties_the_persistent_tier():
+    # clear() deletes every row in "ChatResponseCache", so a stand-in store is used here
+    cleared = []
+    cache = ResponseCache(persist=False)
+    cache.disk = SimpleNamespace(clear=lambda: cleared.append(True))
+    cache.memory.set("key", "response")
+
+    cache.clear()
+    assert cleared == [True] and cache.memory.get("key") is None
@@ -0,0 +1,12 @@
+import torch
+from Models.scheduler import run_jobs
+
+def test_serial_jobs_keep_this_process_thread_count():
+    threads = torch.get_num_threads()
+    try:
+        torch.set_num_threads(3)
+        results = dict(run_jobs(torch.get_num_threads, [(), ()], workers=1, threads_per_worker=1))
+        assert results == {0: 3, 1: 3}
+        assert torch.get_num_threads() == 3
+    finally:
+        torch.set_num_threads(threads)
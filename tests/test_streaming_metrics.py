@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from PortfolioManagement.analytics import compute_metrics
+from PortfolioManagement.stock_price import publish_prices
+from PortfolioManagement.streaming_metrics import EWMA_LAMBDA, PortfolioMetricsState, StreamingMetrics
+
+def test_streamed_metrics_match_full_recompute():
+    rng = np.random.default_rng(0)
+    values = 100 * np.cumprod(1 + rng.normal(0.0005, 0.01, size=(2_000, 50)), axis=0)
+    states = [PortfolioMetricsState([], []) for _ in range(values.shape[1])]
+    for row in values:
+        for state, value in zip(states, row):
+            state.observe_value(value)
+
+    full = compute_metrics(values)
+    returns = values[1:] / values[:-1] - 1
+    ewma = pd.DataFrame(returns ** 2).ewm(alpha=1 - EWMA_LAMBDA, adjust=False).mean().to_numpy()[-1]
+    streamed = pd.DataFrame([state.snapshot() for state in states])
+    np.testing.assert_allclose(streamed["annualized_volatility"], full["annualized_volatility"])
+    np.testing.assert_allclose(streamed["max_drawdown"], full["max_drawdown"])
+    np.testing.assert_allclose(streamed["mean_return"], returns.mean(axis=0))
+    np.testing.assert_allclose(streamed["ewma_volatility"], np.sqrt(ewma))
+
+def test_ticks_are_routed_only_to_holders():
+    metrics = StreamingMetrics()
+    metrics.add_portfolio("p1", ["AAPL", "MSFT"], [10, 5], name="Growth")
+    metrics.add_portfolio("p2", ["XOM"], [100], name="Energy")
+
+    metrics.on_prices({"AAPL": 100.0, "MSFT": 200.0, "TSLA": 50.0})
+    snapshot = metrics.snapshot()
+    assert snapshot.loc["p1", "value"] == 10 * 100.0 + 5 * 200.0
+    assert snapshot.loc["p1", "name"] == "Growth"
+    assert pd.isna(snapshot.loc["p2", "value"])
+
+def test_single_symbol_quotes_make_one_observation_per_round():
+    state = PortfolioMetricsState(["AAPL", "MSFT", "XOM"], [1, 1, 1])
+    assert state.update_prices({"AAPL": 100.0, "MSFT": 100.0, "XOM": 100.0}) == 300.0
+
+    # Quotes arrive one symbol at a time; only a full round of fresh prices is a period
+    assert state.update_prices({"AAPL": 110.0}) is None
+    assert state.update_prices({"AAPL": 120.0}) is None
+    assert state.update_prices({"MSFT": 90.0}) is None
+    assert state.update_prices({"XOM": 100.0}) == 310.0
+    assert state.count == 1
+    assert np.isclose(state.mean, 310.0 / 300.0 - 1)
+
+def test_replacing_a_portfolio_drops_its_old_symbols():
+    metrics = StreamingMetrics()
+    metrics.add_portfolio("p1", ["AAPL", "MSFT"], [1, 1])
+    metrics.add_portfolio("p1", ["MSFT"], [2])
+    metrics.on_prices({"AAPL": 100.0})
+    metrics.on_prices({"MSFT": 50.0})
+    assert metrics.snapshot().loc["p1", "value"] == 100.0
+
+def test_attach_receives_published_quotes():
+    metrics = StreamingMetrics()
+    metrics.add_portfolio("p1", ["AAPL"], [3])
+    metrics.attach()
+    try:
+        publish_prices({"AAPL": 10.0})
+    finally:
+        metrics.detach()
+    publish_prices({"AAPL": 20.0})
+    assert metrics.snapshot().loc["p1", "value"] == 30.0
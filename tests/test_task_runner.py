@@ -0,0 +1,60 @@
+import threading
+from task_runner import TaskRunner
+
+class FakeRoot:
+    """Stands in for the Tk root: after() callbacks are queued and run by pump()."""
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def pump(self):
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+def run_blocked(runner, key, **kwargs):
+    release = threading.Event()
+    results = []
+    runner.submit(key, lambda: release.wait(5) and key, on_success=results.append, **kwargs)
+    return release, results
+
+def test_cancel_all_leaves_writes_running_and_reports_them():
+    root = FakeRoot()
+    busy = []
+    runner = TaskRunner(root, on_busy=lambda descriptions, cancellable: busy.append((descriptions, cancellable)))
+    release_read, read_results = run_blocked(runner, "read", description="Loading...")
+    release_write, write_results = run_blocked(runner, "write", description="Saving...", cancellable=False)
+    assert busy[-1] == (["Loading...", "Saving..."], True)
+
+    runner.cancel_all()
+    assert busy[-1] == (["Saving..."], False)
+    assert runner.submit("write", lambda: "again", replace=True).cancellable is False
+
+    release_read.set()
+    release_write.set()
+    runner._executor.shutdown(wait=True)
+    root.pump()
+    assert read_results == []
+    assert write_results == ["write"]
+    assert busy[-1] == ([], False)
+
+class DestroyedWidget:
+    def winfo_exists(self):
+        return False
+
+def test_writes_are_reported_after_their_window_is_destroyed():
+    root = FakeRoot()
+    runner = TaskRunner(root)
+    results, errors = [], []
+
+    def fail():
+        raise ValueError("constraint violated")
+    runner.submit("read", lambda: "read", on_success=results.append, owner=DestroyedWidget())
+    runner.submit("write", lambda: "written", on_success=results.append, owner=DestroyedWidget(), cancellable=False)
+    runner.submit("failed write", fail, on_error=errors.append, owner=DestroyedWidget(), cancellable=False)
+    runner._executor.shutdown(wait=True)
+    root.pump()
+
+    assert results == ["written"]
+    assert [str(error) for error in errors] == ["constraint violated"]
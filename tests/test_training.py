@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from Models.training import fit
+from Models.windowing import make_loader, sliding_windows
+
+@pytest.mark.parametrize("epochs", [0, 2])
+def test_fit_returns_the_epochs_run(epochs):
+    series = np.sin(np.arange(60, dtype=np.float32) / 5)
+    X, y = sliding_windows(series, 5)
+    loader = make_loader(X, y, np.arange(len(X)), batch_size=16)
+    torch.manual_seed(0)
+    model = nn.Sequential(nn.Flatten(), nn.Linear(5, 1))
+    optimizer = optim.SGD(model.parameters(), lr=0.01)
+
+    assert fit(model, loader, nn.MSELoss(), optimizer, torch.device("cpu"), epochs) == epochs
@@ -0,0 +1,36 @@
+import psycopg2
+from database import WriteBehindBuffer
+
+def failing_writer(failures):
+    written = []
+    def write_batch(cursor, rows):
+        if failures:
+            failures.pop()
+            raise psycopg2.OperationalError("connection lost")
+        written.extend(rows)
+    return written, write_batch
+
+def test_failed_batch_is_retried(database):
+    written, write_batch = failing_writer([1, 1])
+    buffer = WriteBehindBuffer("test_retry", write_batch, key=lambda row: row[0], interval=0.01, retries=3)
+    try:
+        buffer.add((1, "a"))
+        buffer.add((2, "b"))
+        buffer.flush(timeout=5)
+        assert sorted(written) == [(1, "a"), (2, "b")]
+        stats = buffer.stats()
+        assert (stats["errors"], stats["retried_rows"], stats["dropped_rows"], stats["rows"]) == (2, 4, 0, 2)
+    finally:
+        buffer.close()
+
+def test_rows_are_dropped_and_counted_after_the_last_retry(database):
+    written, write_batch = failing_writer([1] * 10)
+    buffer = WriteBehindBuffer("test_drop", write_batch, interval=0.01, retries=2)
+    try:
+        buffer.add("a")
+        buffer.flush(timeout=5)
+        stats = buffer.stats()
+        assert written == []
+        assert (stats["errors"], stats["retried_rows"], stats["dropped_rows"], stats["pending"]) == (3, 2, 1, 0)
+    finally:
+        buffer.close()